@@ -0,0 +1,221 @@
+"""
+Test de charge de la boucle principale sur des calendriers denses.
+
+Pour chaque densité (news par jour), génère un calendrier synthétique sur toutes les
+devises de SymbolSelector.symbol_priority (impacts High / Medium / Low mélangés, news
+groupées sur les quarts d'heure comme sur ForexFactory) et des bougies M1 pour tous les
+symboles, puis fait tourner main() contre le broker simulé (core/simulation.py) sur le
+dimanche + 'days' jours de trading. Chaque densité tourne dans un process neuf.
+
+Mesures :
+    - retard des ordres : temps réel entre le début du cycle et le retour de chaque order_send
+      d'ouverture (sélection du symbole et envoi compris ; les news d'un même cycle sont
+      traitées l'une après l'autre)
+    - ordres par stratégie : un run où multi_timeframe est activée sans avoir envoyé d'ordre
+      échoue, sans quoi les mesures ne couvriraient que la branche d'échec de sa sélection
+    - CPU par news : temps CPU du process / nombre de news du calendrier
+    - croissance mémoire : mémoire Python allouée (tracemalloc) en fin de run et pic
+
+Usage :
+    python benchmarks/bench_load.py [--densities 12,50,100,200,400] [--days 1] [--strategies multi_timeframe,sandwich]
+"""
+import argparse
+import collections
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.clock import VirtualClock, get_clock  # noqa: E402
+from core.market_utils import pip_size_for_symbol  # noqa: E402
+from core.mt5_backend import install_backend  # noqa: E402
+from core.simulation import SimulatedBroker, run_week  # noqa: E402
+
+# Dimanche de la semaine simulée
+WEEK_START = datetime(2025, 3, 2, tzinfo=timezone.utc)
+IMPACTS = ("High", "Medium", "Low")
+
+
+def candidate_symbols():
+    """Devises et symboles de SymbolSelector.symbol_priority (importé derrière un broker vide)."""
+    install_backend(SimulatedBroker({}, VirtualClock(0)))
+    from core.symbol_selector import SymbolSelector
+
+    priority = SymbolSelector().symbol_priority
+    return sorted(priority), sorted({symbol for symbols in priority.values() for symbol in symbols})
+
+
+def write_synthetic_bars(bars_dir, symbols, days, seed=0):
+    """Marche aléatoire M1 par symbole, du samedi précédent à la fin de la période simulée."""
+    rng = np.random.default_rng(seed)
+    start = int((WEEK_START - timedelta(days=1)).timestamp())
+    count = (days + 2) * 24 * 60
+    times = start + 60 * np.arange(count)
+    for symbol in symbols:
+        pip = pip_size_for_symbol(symbol)
+        base = 150.0 if pip == 0.01 else 1.0
+        close = base + np.cumsum(rng.normal(0, 1.5 * pip, count))
+        open_ = np.concatenate(([close[0]], close[:-1]))
+        high = np.maximum(open_, close) + rng.uniform(0, 2 * pip, count)
+        low = np.minimum(open_, close) - rng.uniform(0, 2 * pip, count)
+        np.save(os.path.join(bars_dir, f"{symbol}_M1.npy"), np.column_stack([times, open_, high, low, close]))
+
+
+def write_synthetic_calendar(path, currencies, events_per_day, days, seed=0):
+    """Calendrier hebdo au format de process_news : 'events_per_day' news par jour de trading."""
+    rng = np.random.default_rng(seed)
+    news = []
+    for day in range(1, days + 1):
+        date = WEEK_START + timedelta(days=day)
+        # Horaires sur les quarts d'heure : plusieurs news tombent dans le même cycle
+        slots = rng.integers(0, 24 * 4, events_per_day)
+        for index, slot in enumerate(sorted(slots)):
+            news_time = date + timedelta(minutes=15 * int(slot))
+            news.append({
+                "title": f"Synthetic {day}-{index}",
+                "country": str(rng.choice(currencies)),
+                "date": news_time.isoformat(),
+                "impact": IMPACTS[index % len(IMPACTS)],
+                "forecast": "",
+                "previous": "",
+                "date_utc": news_time.isoformat(),
+            })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(news, f, indent=4, ensure_ascii=False)
+    return news
+
+
+class TriggerProbe(logging.Filter):
+    """Compte les déclenchements et leur retard en temps simulé (filtre du root logger, conservé par setup_logging)."""
+
+    def __init__(self):
+        super().__init__()
+        self.virtual_lags = []
+
+    def filter(self, record):
+        if getattr(record, "event", None) == "news_trigger":
+            news_time = datetime.fromisoformat(record.date_utc).timestamp()
+            self.virtual_lags.append(get_clock().time() - (news_time + 300))
+        return True
+
+
+class OrderProbe:
+    """Relève chaque order_send d'ouverture du broker simulé : retard depuis le début du cycle et stratégie."""
+
+    def __init__(self):
+        self.real_lags = []
+        self.by_strategy = collections.Counter()
+
+    def install(self):
+        send = SimulatedBroker.order_send
+        probe = self
+
+        def order_send(broker, request):
+            result = send(broker, request)
+            if not request.get("position"):
+                probe.real_lags.append(time.time() - get_clock().advanced_at)
+                comment = request.get("comment", "")
+                # Commentaires : '<titre>_MTF' (multi_timeframe), 'sandwich-High' / 'sandwich-Low'
+                probe.by_strategy["multi_timeframe" if comment.endswith("_MTF") else comment.split("-")[0]] += 1
+            return result
+
+        SimulatedBroker.order_send = order_send
+
+
+def run_level(events_per_day, days, strategies, memory):
+    """Un niveau de densité, dans le process courant. Retourne les mesures (dict)."""
+    workdir = tempfile.mkdtemp(prefix="zenlion_load_")
+    bars_dir = os.path.join(workdir, "bars")
+    os.makedirs(bars_dir)
+    currencies, symbols = candidate_symbols()
+    write_synthetic_bars(bars_dir, symbols, days)
+    week_file = os.path.join(workdir, f"forex_{WEEK_START.strftime('%Y-%m-%d')}.json")
+    news = write_synthetic_calendar(week_file, currencies, events_per_day, days)
+
+    probe = TriggerProbe()
+    logging.getLogger().addFilter(probe)
+    orders = OrderProbe()
+    orders.install()
+    if memory:
+        tracemalloc.start()
+    cpu_start = time.process_time()
+    report = run_week(week_file, bars_dir, strategies, fast_forward=True, workdir=os.path.join(workdir, "run"), days=days + 1)
+    cpu = time.process_time() - cpu_start
+    current, peak = tracemalloc.get_traced_memory() if memory else (0, 0)
+
+    if "multi_timeframe" in strategies and not orders.by_strategy["multi_timeframe"]:
+        raise RuntimeError(f"Aucun ordre multi-timeframe à {events_per_day} news/jour : "
+                           f"seule la branche d'échec de la sélection a été mesurée ({dict(orders.by_strategy)})")
+
+    real_lags = np.array(orders.real_lags or [0.0]) * 1000
+    return {
+        "events_per_day": events_per_day,
+        "events": len(news),
+        "triggers": len(probe.virtual_lags),
+        "orders": dict(orders.by_strategy),
+        "trades": len(report["trades"]),
+        "cycles": report["cycles"],
+        "elapsed_s": report["elapsed"],
+        "lag_p50_ms": float(np.percentile(real_lags, 50)),
+        "lag_p95_ms": float(np.percentile(real_lags, 95)),
+        "lag_max_ms": float(real_lags.max()),
+        "virtual_lag_max_s": float(max(probe.virtual_lags, default=0.0)),
+        "cpu_ms_per_event": cpu * 1000 / max(len(news), 1),
+        "memory_mb": current / 1e6,
+        "memory_peak_mb": peak / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge sur calendriers denses")
+    parser.add_argument("--densities", default="12,50,100,200,400", help="News par jour, séparées par des virgules")
+    parser.add_argument("--days", type=int, default=1, help="Jours de trading simulés")
+    parser.add_argument("--strategies", default="multi_timeframe,sandwich")
+    parser.add_argument("--no-memory", action="store_true", help="Sans tracemalloc (CPU et retards sans surcoût)")
+    parser.add_argument("--level", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    strategies = [name for name in args.strategies.split(",") if name]
+
+    if args.level is not None:
+        # Process enfant : un seul niveau, résultat en JSON sur la dernière ligne de stdout
+        print(json.dumps(run_level(args.level, args.days, strategies, not args.no_memory)))
+        return
+
+    rows = []
+    for density in (int(value) for value in args.densities.split(",") if value):
+        command = [sys.executable, os.path.abspath(__file__), "--level", str(density), "--days", str(args.days),
+                   "--strategies", args.strategies] + (["--no-memory"] if args.no_memory else [])
+        process = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        if process.returncode != 0:
+            sys.exit(f"Échec à {density} news/jour :\n{process.stderr.strip().splitlines()[-1]}")
+        rows.append(json.loads(process.stdout.strip().splitlines()[-1]))
+
+    from tabulate import tabulate
+
+    headers = ["News/jour", "Déclench.", "Ordres", "Trades", "Cycles", "Durée (s)", "Retard ordre p50 (ms)",
+               "p95 (ms)", "max (ms)", "CPU/news (ms)", "Mémoire (Mo)", "Pic (Mo)"]
+    table = [
+        [row["events_per_day"], row["triggers"], ", ".join(f"{name} {count}" for name, count in sorted(row["orders"].items())),
+         row["trades"], row["cycles"], round(row["elapsed_s"], 1),
+         round(row["lag_p50_ms"], 1), round(row["lag_p95_ms"], 1), round(row["lag_max_ms"], 1),
+         round(row["cpu_ms_per_event"], 2), round(row["memory_mb"], 1), round(row["memory_peak_mb"], 1)]
+        for row in rows
+    ]
+    print(f"Stratégies : {', '.join(strategies)} - {args.days} jour(s) de trading par densité")
+    print(tabulate(table, headers=headers, tablefmt="pretty"))
+    late = [row for row in rows if row["virtual_lag_max_s"] >= 60]
+    if late:
+        print(f"ATTENTION - déclenchements hors de leur fenêtre d'une minute à {late[0]['events_per_day']} news/jour")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark du démarrage à froid du bot.
+
+Mesure, dans un interpréteur neuf à chaque fois, le temps entre le lancement et le
+moment où le bot est prêt à trader (imports + chargement des stratégies activées +
+création des composants), sans la connexion MT5.
+
+Usage :
+    python benchmarks/bench_startup.py [--runs 10] [--strategies multi_timeframe,sandwich] [--target 0.5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Objectif : prêt à trader en moins d'une demi-seconde
+STARTUP_TARGET_SECONDS = 0.5
+
+_SNIPPET = """
+import time
+start = time.perf_counter()
+import main
+from core.position_snapshot import PositionSnapshot
+from core.strategy_runtime import StrategyRuntime
+snapshot = PositionSnapshot()
+selector = main.SymbolSelector(snapshot)
+engine = main.TradingEngine(snapshot)
+runtime = StrategyRuntime(engine)
+for strategy_cls, phase, comment in main.load_strategies({strategies!r}):
+    runtime.register(strategy_cls, comment)
+print(time.perf_counter() - start)
+"""
+
+
+def measure_once(strategies):
+    """Retourne (temps jusqu'à 'prêt' dans le process, temps total du process) en secondes."""
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", _SNIPPET.format(strategies=tuple(strategies))],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    total = time.perf_counter() - start
+    return float(output.strip().splitlines()[-1]), total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage à froid")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--strategies", default="multi_timeframe,sandwich")
+    parser.add_argument("--target", type=float, default=STARTUP_TARGET_SECONDS)
+    args = parser.parse_args()
+
+    strategies = [name for name in args.strategies.split(",") if name]
+    measures = [measure_once(strategies) for _ in range(args.runs)]
+    ready = [m[0] for m in measures]
+    total = [m[1] for m in measures]
+
+    print(f"Stratégies        : {', '.join(strategies)}")
+    print(f"Prêt (médiane)    : {statistics.median(ready) * 1000:.0f} ms (max {max(ready) * 1000:.0f} ms)")
+    print(f"Process (médiane) : {statistics.median(total) * 1000:.0f} ms, interpréteur compris")
+    print(f"Objectif          : {args.target * 1000:.0f} ms")
+
+    if statistics.median(ready) > args.target:
+        print("FAIL - démarrage au-dessus de l'objectif")
+        sys.exit(1)
+    print("OK - démarrage sous l'objectif")
+
+
+if __name__ == "__main__":
+    main()
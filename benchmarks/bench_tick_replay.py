@@ -0,0 +1,86 @@
+"""
+Benchmark du replay tick par tick (core/tick_replay.py).
+
+Génère une archive de ticks synthétique (marche aléatoire, un tick toutes les 100 ms),
+la relit en memory-map puis rejoue le sandwich sur une news par heure, d'abord dans un
+seul process puis en parallèle. Affiche le débit en millions de ticks parcourus par seconde.
+
+Usage :
+    python benchmarks/bench_tick_replay.py [--ticks 20000000] [--workers 4] [--target 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.tick_replay import TICK_DTYPE, TickReplayEngine, open_ticks, replay_news_windows  # noqa: E402
+from core.market_utils import pip_size_for_symbol  # noqa: E402
+
+SYMBOL = "EURUSD"
+
+# Objectif : plusieurs millions de ticks parcourus par seconde et par process
+THROUGHPUT_TARGET_MTICKS = 5
+
+
+def write_synthetic_ticks(path, count, start_msc=1_700_000_000_000, step_msc=100, seed=0):
+    """Écrit 'count' ticks EURUSD synthétiques dans un .npy, par morceaux."""
+    rng = np.random.default_rng(seed)
+    ticks = np.lib.format.open_memmap(path, mode="w+", dtype=TICK_DTYPE, shape=(count,))
+    chunk = 5_000_000
+    last = 1.1
+    for offset in range(0, count, chunk):
+        n = min(chunk, count - offset)
+        bid = last + np.cumsum(rng.normal(0, 0.00002, n))
+        last = bid[-1]
+        ticks["time_msc"][offset:offset + n] = start_msc + (offset + np.arange(n)) * step_msc
+        ticks["bid"][offset:offset + n] = bid
+        ticks["ask"][offset:offset + n] = bid + 0.00008
+    ticks.flush()
+    return start_msc, start_msc + count * step_msc
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du replay tick par tick")
+    parser.add_argument("--ticks", type=int, default=20_000_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--target", type=float, default=THROUGHPUT_TARGET_MTICKS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as ticks_dir:
+        start = time.perf_counter()
+        first_msc, last_msc = write_synthetic_ticks(os.path.join(ticks_dir, f"{SYMBOL}.npy"), args.ticks)
+        print(f"Archive           : {args.ticks} ticks générés en {time.perf_counter() - start:.2f}s")
+
+        # Une news par heure, en laissant la place du lookback et du délai de fermeture
+        events = [(msc // 1000, SYMBOL) for msc in range(first_msc + 3_600_000, last_msc - 3_600_000, 3_600_000)]
+
+        engine = TickReplayEngine(open_ticks(SYMBOL, ticks_dir))
+        pip_size = pip_size_for_symbol(SYMBOL)
+        start = time.perf_counter()
+        for news_ts, _ in events:
+            for order in engine.sandwich_orders(news_ts * 1000, pip_size):
+                engine.replay_order(order)
+        single = time.perf_counter() - start
+        single_rate = engine.ticks_scanned / single / 1e6
+
+        _, scanned, parallel = replay_news_windows(events, ticks_dir, workers=args.workers)
+        parallel_rate = scanned / parallel / 1e6
+
+    print(f"News rejouées     : {len(events)}")
+    print(f"1 process         : {engine.ticks_scanned} ticks en {single:.2f}s ({single_rate:.1f} M ticks/s)")
+    print(f"{args.workers} process         : {scanned} ticks en {parallel:.2f}s ({parallel_rate:.1f} M ticks/s, démarrage des process compris)")
+    print(f"Objectif          : {args.target:.0f} M ticks/s par process")
+
+    if single_rate < args.target:
+        print("FAIL - débit sous l'objectif")
+        sys.exit(1)
+    print("OK - débit au-dessus de l'objectif")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import hashlib
+import logging
+import os
+import tempfile
+import numpy as np
+
+
+class BacktestCache:
+    """
+    Cache disque des résultats de simulation (un tableau de P&L par trade et par cellule).
+
+    La clé est un hash de tout ce qui détermine le résultat : version du code de la
+    stratégie, paramètres, contenu du calendrier et bougies de la période. Au-delà de
+    'max_bytes', les entrées les moins récemment utilisées sont supprimées.
+
+    Attributes:
+        cache_dir (str): Dossier des entrées (<clé>.npy)
+        max_bytes (int): Taille maximale du cache sur disque
+        hits (int): Nombre de lectures trouvées dans le cache
+        misses (int): Nombre de lectures absentes du cache
+    """
+
+    def __init__(self, cache_dir=".backtest_cache", max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Hash SHA-256 d'une suite de parties (str ou bytes)."""
+        digest = hashlib.sha256()
+        for part in parts:
+            data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+            # Longueur préfixée : ('ab', 'c') et ('a', 'bc') donnent des clés différentes
+            digest.update(len(data).to_bytes(8, "little"))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get(self, key):
+        """
+        Returns:
+            np.ndarray: Le résultat en cache, ou None
+        """
+        path = self._path(key)
+        try:
+            value = np.load(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        # Date de modification = dernière utilisation, pour l'éviction LRU
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Écrit une entrée (écriture atomique : un lecteur ne voit jamais de fichier partiel)."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.asarray(value))
+        os.replace(tmp_path, self._path(key))
+
+    def evict(self):
+        """
+        Supprime les entrées les moins récemment utilisées jusqu'à repasser sous max_bytes.
+
+        Returns:
+            int: Nombre d'entrées supprimées
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npy"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        if removed:
+            logging.info("Cache backtest : %s entrées supprimées (LRU)", removed)
+        return removed
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
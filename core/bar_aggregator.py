@@ -0,0 +1,81 @@
+import MetaTrader5 as mt5
+import numpy as np
+import logging
+import threading
+from core.market_utils import aggregate_rates
+from core.volatility_service import TIMEFRAME_SECONDS
+
+
+class BarAggregator:
+    """
+    Construit les bougies M5 / M15 / H1 localement à partir d'une seule série M1 du terminal.
+
+    À la première utilisation d'un (symbole, timeframe), la dernière bougie clôturée
+    calculée localement est comparée à celle du broker. Si elles diffèrent (broker
+    aligné autrement, bougies M1 manquantes), ce timeframe est ensuite toujours
+    demandé directement au terminal.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._aligned = {}
+
+    def _check_alignment(self, symbol, timeframe, aggregated) -> bool:
+        key = (symbol, timeframe)
+        with self._lock:
+            if key in self._aligned:
+                return self._aligned[key]
+
+        broker = mt5.copy_rates_from_pos(symbol, timeframe, 1, 1)
+        if broker is None or not len(broker):
+            # Pas de verdict sans bougie de référence : on réessaiera au prochain appel
+            return True
+
+        local = aggregated[aggregated['time'] == broker['time'][0]]
+        aligned = len(local) == 1 and all(
+            np.isclose(local[field][0], broker[field][0], rtol=0, atol=1e-8) for field in ('open', 'high', 'low', 'close')
+        )
+        if not aligned:
+            logging.warning("Bougies %ss de %s non alignées avec le broker, récupération directe sur MT5",
+                            TIMEFRAME_SECONDS[timeframe], symbol)
+        with self._lock:
+            self._aligned[key] = aligned
+        return aligned
+
+    def get_rates(self, symbol, counts) -> dict:
+        """
+        Récupère les bougies de plusieurs timeframes avec un seul appel M1 au terminal.
+
+        Args:
+            symbol: Symbole du trading
+            counts: Nombre de bougies voulues par timeframe MT5, ex: {TIMEFRAME_M1: 50, TIMEFRAME_M5: 50}
+
+        Returns:
+            dict: Bougies (dernière = en formation) par timeframe, None si indisponibles
+        """
+        m1_seconds = TIMEFRAME_SECONDS[mt5.TIMEFRAME_M1]
+        # Un bucket de plus que demandé : le premier peut être incomplet et ignoré
+        m1_count = max(
+            count if timeframe == mt5.TIMEFRAME_M1 else (count + 1) * (TIMEFRAME_SECONDS[timeframe] // m1_seconds)
+            for timeframe, count in counts.items()
+        )
+        m1 = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M1, 0, m1_count)
+        if m1 is None or not len(m1):
+            logging.error("Erreur : pas de bougies M1 pour %s", symbol)
+            return {timeframe: None for timeframe in counts}
+
+        rates = {}
+        for timeframe, count in counts.items():
+            if timeframe == mt5.TIMEFRAME_M1:
+                rates[timeframe] = m1[-count:]
+                continue
+            aggregated = aggregate_rates(m1, TIMEFRAME_SECONDS[timeframe])
+            if self._check_alignment(symbol, timeframe, aggregated) and len(aggregated) >= count:
+                rates[timeframe] = aggregated[-count:]
+            else:
+                rates[timeframe] = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+        return rates
+
+
+# Agrégateur partagé par défaut (les verdicts d'alignement sont valables pour tout le process)
+default_bar_aggregator = BarAggregator()
@@ -0,0 +1,116 @@
+import bisect
+import threading
+import time
+from datetime import datetime
+
+
+class Clock:
+    """
+    Horloge du bot : heure courante et attentes.
+
+    Tout le code qui dépend de l'heure (déclenchements, fermetures à +45min, expiration
+    des caches) passe par get_clock(), ce qui permet de le faire tourner sur une
+    VirtualClock en simulation.
+    """
+
+    def time(self) -> float:
+        """Timestamp Unix (équivalent de time.time())."""
+        return time.time()
+
+    def now(self, tz=None) -> datetime:
+        """Équivalent de datetime.now(tz)."""
+        return datetime.fromtimestamp(self.time(), tz)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """
+    Horloge simulée : le temps n'avance que par sleep().
+
+    Le thread qui a créé l'horloge (la boucle principale) fait avancer le temps ; les
+    autres threads qui appellent sleep() attendent que la boucle principale ait atteint
+    leur heure de réveil.
+
+    En mode 'fast_forward', une attente de la boucle principale saute directement au
+    prochain réveil programmé (add_wakeup), tant que 'is_busy' ne signale pas une
+    activité à suivre minute par minute (positions ouvertes, ordres en attente...).
+
+    Attributes:
+        fast_forward (bool): Saut direct au prochain réveil quand rien n'est en cours
+        end (float): Fin de la simulation, cible du saut quand plus aucun réveil n'est programmé
+        is_busy (callable): Retourne True tant que le temps doit avancer sans saut (optionnel)
+        steps (int): Nombre d'attentes de la boucle principale (cycles simulés)
+        advanced_at (float): Heure réelle (time.time()) du dernier avancement du temps
+    """
+
+    def __init__(self, start, fast_forward=True, end=None):
+        self._now = float(start)
+        self.fast_forward = fast_forward
+        self.end = end
+        self.is_busy = None
+        self.steps = 0
+        self.advanced_at = time.time()
+        self._wakeups = []
+        self._driver = threading.current_thread()
+        self._condition = threading.Condition()
+
+    def time(self) -> float:
+        return self._now
+
+    def add_wakeup(self, timestamp):
+        """Programme un réveil de la boucle principale à 'timestamp'."""
+        with self._condition:
+            index = bisect.bisect_left(self._wakeups, timestamp)
+            if index == len(self._wakeups) or self._wakeups[index] != timestamp:
+                self._wakeups.insert(index, timestamp)
+
+    def _next_wakeup(self, after):
+        index = bisect.bisect_left(self._wakeups, after)
+        # Réveils déjà dépassés : plus utiles
+        del self._wakeups[:index]
+        return self._wakeups[0] if self._wakeups else self.end
+
+    def advance_to(self, timestamp):
+        """Avance le temps (jamais en arrière) et réveille les threads en attente."""
+        with self._condition:
+            self._now = max(self._now, float(timestamp))
+            self.advanced_at = time.time()
+            self._condition.notify_all()
+
+    def sleep(self, seconds):
+        target = self._now + seconds
+        if threading.current_thread() is not self._driver:
+            with self._condition:
+                self._condition.wait_for(lambda: self._now >= target)
+            return
+
+        self.steps += 1
+        if self.fast_forward and not (self.is_busy is not None and self.is_busy()):
+            with self._condition:
+                upcoming = self._next_wakeup(target)
+            if upcoming is not None:
+                target = max(target, upcoming)
+        self.advance_to(target)
+
+
+_clock = Clock()
+
+
+def get_clock() -> Clock:
+    """Horloge utilisée par le bot (horloge système par défaut)."""
+    return _clock
+
+
+def set_clock(clock):
+    """
+    Remplace l'horloge du bot (ex: VirtualClock pour une simulation).
+
+    Returns:
+        L'ancienne horloge, pour pouvoir la réinstaller
+    """
+    global _clock
+    previous = _clock
+    _clock = clock
+    return previous
@@ -0,0 +1,239 @@
+import MetaTrader5 as mt5
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from core.clock import get_clock
+
+
+def strategy_from_comment(comment) -> str:
+    """
+    Stratégie d'origine d'après le commentaire d'ordre (cf STRATEGIES dans main.py).
+
+    Returns:
+        str: 'multi_timeframe', 'sandwich', 'grid', 'hedge' ou 'other'
+    """
+    comment = comment or ""
+    if comment.endswith("_MTF"):
+        return "multi_timeframe"
+    if comment.startswith("sandwich"):
+        return "sandwich"
+    if comment.startswith("grid_"):
+        return "grid"
+    if comment.startswith("hedge"):
+        return "hedge"
+    return "other"
+
+
+_CREATE_TABLES = """
+CREATE TABLE IF NOT EXISTS deals (
+    ticket INTEGER PRIMARY KEY,
+    "order" INTEGER,
+    time INTEGER,
+    time_msc INTEGER,
+    type INTEGER,
+    entry INTEGER,
+    magic INTEGER,
+    position_id INTEGER,
+    reason INTEGER,
+    volume REAL,
+    price REAL,
+    commission REAL,
+    swap REAL,
+    profit REAL,
+    fee REAL,
+    symbol TEXT,
+    comment TEXT,
+    strategy TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_deals_time ON deals (time);
+CREATE INDEX IF NOT EXISTS idx_deals_magic ON deals (magic);
+CREATE INDEX IF NOT EXISTS idx_deals_strategy ON deals (strategy);
+CREATE INDEX IF NOT EXISTS idx_deals_position ON deals (position_id);
+CREATE TABLE IF NOT EXISTS orders (
+    ticket INTEGER PRIMARY KEY,
+    time_setup INTEGER,
+    time_setup_msc INTEGER,
+    time_done INTEGER,
+    time_done_msc INTEGER,
+    type INTEGER,
+    state INTEGER,
+    magic INTEGER,
+    position_id INTEGER,
+    volume_initial REAL,
+    price_open REAL,
+    sl REAL,
+    tp REAL,
+    symbol TEXT,
+    comment TEXT,
+    strategy TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_time_setup ON orders (time_setup);
+CREATE INDEX IF NOT EXISTS idx_orders_position ON orders (position_id);
+CREATE TABLE IF NOT EXISTS sync_cursor (
+    name TEXT PRIMARY KEY,
+    time INTEGER NOT NULL
+);
+"""
+
+_INSERT_DEAL = """
+INSERT OR IGNORE INTO deals (
+    ticket, "order", time, time_msc, type, entry, magic, position_id, reason, volume, price,
+    commission, swap, profit, fee, symbol, comment, strategy
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_ORDER = """
+INSERT OR IGNORE INTO orders (
+    ticket, time_setup, time_setup_msc, time_done, time_done_msc, type, state, magic, position_id,
+    volume_initial, price_open, sl, tp, symbol, comment, strategy
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Les deals de sortie (commentaire '[sl ...]', '+45min', ...) héritent de la stratégie du deal d'entrée
+_RESOLVE_EXIT_STRATEGY = """
+UPDATE deals SET strategy = COALESCE(
+    (SELECT entry_deal.strategy FROM deals AS entry_deal
+     WHERE entry_deal.position_id = deals.position_id AND entry_deal.entry = 0 AND entry_deal.strategy IS NOT NULL),
+    'other'
+) WHERE strategy IS NULL
+"""
+
+# DEAL_ENTRY_IN
+_DEAL_ENTRY_IN = 0
+
+
+class DealHistory:
+    """
+    Copie locale (SQLite) de l'historique des deals et ordres du compte, synchronisée
+    de façon incrémentale depuis un curseur sauvegardé dans la base.
+
+    Chaque sync ne demande à MT5 que la période depuis le dernier deal connu : son coût
+    dépend du nombre de nouveaux deals, pas de l'âge du compte.
+
+    Attributes:
+        db_path (str): Chemin de la base SQLite
+        start_from (datetime): Début de l'historique lors de la première synchronisation
+        lookahead_hours (int): Marge ajoutée à la borne de fin (heure serveur en avance sur UTC)
+        order_overlap_seconds (int): Fenêtre relue pour les ordres, un ordre pending n'entre dans
+            l'historique qu'à son exécution ou expiration, après son heure de création
+    """
+
+    def __init__(self, db_path="data/deal_history.db", start_from=datetime(2020, 1, 1, tzinfo=timezone.utc),
+                 lookahead_hours=24, order_overlap_seconds=3600):
+        self.db_path = db_path
+        self.start_from = start_from
+        self.lookahead_hours = lookahead_hours
+        self.order_overlap_seconds = order_overlap_seconds
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(_CREATE_TABLES)
+        self.connection.commit()
+
+    def _get_cursor(self, name) -> int:
+        row = self.connection.execute("SELECT time FROM sync_cursor WHERE name = ?", (name,)).fetchone()
+        return row[0] if row is not None else int(self.start_from.timestamp())
+
+    def _set_cursor(self, name, value):
+        self.connection.execute(
+            "INSERT INTO sync_cursor (name, time) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET time = excluded.time",
+            (name, value),
+        )
+
+    @staticmethod
+    def _deal_row(deal):
+        # Stratégie résolue plus tard pour les deals de sortie (cf _RESOLVE_EXIT_STRATEGY)
+        strategy = strategy_from_comment(deal.comment) if deal.entry == _DEAL_ENTRY_IN else None
+        return (
+            deal.ticket, deal.order, deal.time, deal.time_msc, deal.type, deal.entry, deal.magic,
+            deal.position_id, deal.reason, deal.volume, deal.price, deal.commission, deal.swap,
+            deal.profit, deal.fee, deal.symbol, deal.comment, strategy,
+        )
+
+    @staticmethod
+    def _order_row(order):
+        return (
+            order.ticket, order.time_setup, order.time_setup_msc, order.time_done, order.time_done_msc,
+            order.type, order.state, order.magic, order.position_id, order.volume_initial,
+            order.price_open, order.sl, order.tp, order.symbol, order.comment,
+            strategy_from_comment(order.comment),
+        )
+
+    def sync(self) -> dict:
+        """
+        Récupère les deals et ordres apparus depuis le dernier curseur et les ajoute à la base.
+
+        La borne de début est incluse (plusieurs deals peuvent partager la même seconde) :
+        les tickets déjà connus sont ignorés par la clé primaire.
+
+        Returns:
+            dict: Nombre de nouveaux deals et ordres, durée en ms
+        """
+        start = time.perf_counter()
+        date_to = datetime.fromtimestamp(get_clock().time() + self.lookahead_hours * 3600, timezone.utc)
+        deals_from = self._get_cursor("deals")
+        orders_from = max(self._get_cursor("orders") - self.order_overlap_seconds, int(self.start_from.timestamp()))
+
+        deals = mt5.history_deals_get(datetime.fromtimestamp(deals_from, timezone.utc), date_to)
+        orders = mt5.history_orders_get(datetime.fromtimestamp(orders_from, timezone.utc), date_to)
+        if deals is None or orders is None:
+            logging.error("Erreur lors de la synchronisation de l'historique : %s", mt5.last_error())
+            return {"deals": 0, "orders": 0, "elapsed_ms": (time.perf_counter() - start) * 1000}
+
+        changes = self.connection.total_changes
+        self.connection.executemany(_INSERT_DEAL, [self._deal_row(deal) for deal in deals])
+        new_deals = self.connection.total_changes - changes
+        if new_deals:
+            self.connection.execute(_RESOLVE_EXIT_STRATEGY)
+
+        changes = self.connection.total_changes
+        self.connection.executemany(_INSERT_ORDER, [self._order_row(order) for order in orders])
+        new_orders = self.connection.total_changes - changes
+
+        if deals:
+            self._set_cursor("deals", max(deal.time for deal in deals))
+        if orders:
+            self._set_cursor("orders", max(order.time_setup for order in orders))
+        self.connection.commit()
+
+        stats = {"deals": new_deals, "orders": new_orders, "elapsed_ms": (time.perf_counter() - start) * 1000}
+        if new_deals or new_orders:
+            logging.info("Historique synchronisé : %s nouveaux deals, %s nouveaux ordres (%.1f ms)",
+                         new_deals, new_orders, stats["elapsed_ms"], extra={"event": "history_sync", **stats})
+        return stats
+
+    def get_deals(self, strategy=None, magic=None, since=None) -> list:
+        """
+        Deals de la base, filtrés par stratégie, magic number et date.
+
+        Args:
+            strategy: Stratégie d'origine ('multi_timeframe', 'sandwich', 'grid', 'hedge', 'other')
+            magic: Magic number des ordres
+            since: Timestamp (heure serveur) minimum du deal
+
+        Returns:
+            list: Lignes sqlite3.Row, triées par heure
+        """
+        conditions, params = [], []
+        for column, value in (("strategy", strategy), ("magic", magic)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("time >= ?")
+            params.append(since)
+
+        query = "SELECT * FROM deals"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        self.connection.row_factory = sqlite3.Row
+        try:
+            return self.connection.execute(query + " ORDER BY time_msc", params).fetchall()
+        finally:
+            self.connection.row_factory = None
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,101 @@
+import logging
+
+
+class ExposureIndex:
+    """
+    Exposition nette par devise (en lots), tenue à jour à chaque fill et fermeture.
+
+    Acheter 0.01 EURUSD ajoute +0.01 à EUR et -0.01 à USD. EURUSD, GBPUSD et AUDUSD
+    achetés ensemble donnent donc -0.03 sur USD. `would_exceed` répond en O(1) sans
+    relire les positions.
+
+    Attributes:
+        caps (dict): Exposition maximale absolue (en lots) par devise
+        default_cap (float): Plafond des devises absentes de 'caps' (None = pas de limite)
+        net (dict): Exposition nette courante par devise
+    """
+
+    def __init__(self, default_cap=None, caps=None):
+        self.caps = caps or {}
+        self.default_cap = default_cap
+        self.net = {}
+        self._tickets = {}
+        self._legs = {}
+
+    def _currencies(self, symbol):
+        # 'EURUSD', 'EURUSD.m', 'EURUSD-pro' -> ('EUR', 'USD')
+        legs = self._legs.get(symbol)
+        if legs is None:
+            letters = "".join(c for c in symbol.upper() if c.isalpha())
+            legs = (letters[:3], letters[3:6])
+            self._legs[symbol] = legs
+        return legs
+
+    def _apply(self, symbol, signed_volume):
+        base, quote = self._currencies(symbol)
+        self.net[base] = self.net.get(base, 0.0) + signed_volume
+        self.net[quote] = self.net.get(quote, 0.0) - signed_volume
+
+    def on_fill(self, ticket, symbol, direction, volume):
+        """
+        Ajoute une position ouverte (ignoré si le ticket est déjà suivi).
+
+        Args:
+            ticket: Ticket de la position
+            symbol: Symbole du trading
+            direction: 'buy' ou 'sell'
+            volume: Volume en lots
+        """
+        if ticket in self._tickets:
+            return
+        signed_volume = volume if direction == "buy" else -volume
+        self._tickets[ticket] = (symbol, signed_volume)
+        self._apply(symbol, signed_volume)
+
+    def on_close(self, ticket):
+        """Retire une position fermée (ignoré si le ticket n'est pas suivi)."""
+        entry = self._tickets.pop(ticket, None)
+        if entry is not None:
+            symbol, signed_volume = entry
+            self._apply(symbol, -signed_volume)
+
+    def on_snapshot(self, snapshot):
+        """
+        Listener de PositionSnapshot : applique seulement le delta de tickets depuis le snapshot précédent.
+
+        Capte les ordres pending exécutés et les fermetures par SL/TP, que le moteur ne voit pas passer.
+        """
+        if not snapshot.valid:
+            return
+        current = {position.ticket: position for position in snapshot.positions}
+        for ticket in [t for t in self._tickets if t not in current]:
+            self.on_close(ticket)
+        for ticket, position in current.items():
+            if ticket not in self._tickets:
+                # position.type : 0 = POSITION_TYPE_BUY, 1 = POSITION_TYPE_SELL
+                self.on_fill(ticket, position.symbol, "buy" if position.type == 0 else "sell", position.volume)
+
+    def get_cap(self, currency):
+        return self.caps.get(currency, self.default_cap)
+
+    def would_exceed(self, symbol, direction, volume) -> bool:
+        """
+        Vérifie en O(1) si un trade ferait dépasser le plafond d'une des deux devises du symbole.
+
+        Returns:
+            bool: True si le plafond serait dépassé
+        """
+        base, quote = self._currencies(symbol)
+        signed_volume = volume if direction == "buy" else -volume
+
+        for currency, delta in ((base, signed_volume), (quote, -signed_volume)):
+            cap = self.get_cap(currency)
+            if cap is None:
+                continue
+            exposure = self.net.get(currency, 0.0) + delta
+            # Un trade qui réduit l'exposition est toujours accepté
+            if abs(exposure) > cap + 1e-9 and abs(exposure) > abs(self.net.get(currency, 0.0)):
+                logging.debug("Plafond %s dépassé par %s %s %s : %.2f > %.2f",
+                              currency, direction, volume, symbol, exposure, cap)
+                return True
+        return False
@@ -1,11 +1,8 @@
-import requests
 import json
 from datetime import datetime, timedelta
-from tabulate import tabulate
-import schedule
-import time
 import pytz
 import logging
+from core.clock import get_clock
 
 
 # Configuration
@@ -13,6 +10,9 @@ DATA_DIR = "weekly_news_json"
 TIMEZONE_UTC = pytz.utc
 
 def get_forex_calendar():
+    # Import local : requests n'est utile qu'au téléchargement hebdo
+    import requests
+
     url = "https://nfs.faireconomy.media/ff_calendar_thisweek.json"
     
     try:
@@ -39,7 +39,7 @@ def get_forex_calendar():
 
 def get_forex_week_filename():
     """Retourne le nom du fichier pour la semaine Forex actuelle"""
-    today = datetime.now()
+    today = get_clock().now()
     
     # Trouver le dimanche de la semaine courante (0=lundi en Python, donc ajustement)
     sunday = today - timedelta(days=(today.weekday() + 1) % 7)
@@ -176,6 +176,8 @@ def process_news(filename):
 
 
 def save_pretty_news_table(filename_json):
+    from tabulate import tabulate
+
     # Charger les données JSON
 
     output_txt = filename_json.replace(".json", ".txt")
@@ -0,0 +1,89 @@
+import atexit
+import json
+import logging
+import os
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+# Attributs standards d'un LogRecord : tout le reste vient de `extra=` et est exporté tel quel
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Formate chaque record en une ligne JSON (horodatage UTC, niveau, message et champs `extra`)."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler qui ne formate rien dans le thread appelant.
+
+    La queue reste dans le même processus : le record est mis en file tel quel et
+    le message (args, exception) n'est construit que par le thread du listener.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def _stop_listener(listener):
+    # Vide la queue avant la sortie, sans erreur si le listener a déjà été arrêté
+    if listener._thread is not None:
+        listener.stop()
+
+
+def setup_logging(log_dir="logs", level=logging.INFO, max_bytes=10 * 1024 * 1024, backup_count=10):
+    """
+    Configure le root logger : les appels de log ne font qu'une mise en file, un thread
+    listener écrit la console (texte) et un fichier JSON lines avec rotation par taille.
+
+    Args:
+        log_dir: Dossier des logs
+        level: Niveau minimum
+        max_bytes: Taille maximale d'un fichier avant rotation
+        backup_count: Nombre de fichiers de rotation conservés
+
+    Returns:
+        QueueListener: Le listener démarré (arrêté automatiquement à la sortie du programme)
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    log_queue = queue.SimpleQueue()
+
+    file_handler = RotatingFileHandler(
+        os.path.join(log_dir, "zenlion_news.jsonl"),
+        maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    file_handler.setLevel(level)
+    file_handler.setFormatter(JsonLineFormatter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(level)
+    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(level)
+
+    return listener
@@ -0,0 +1,280 @@
+import MetaTrader5 as mt5
+import argparse
+import collections
+import logging
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from core.mt5_backend import MT5Proxy
+
+
+# Configuration
+BLOCK_PREFIX = "zenlion_feed_"
+RING_CAPACITY = 1024  # bougies M1 gardées par symbole
+POLL_INTERVAL = 0.25  # secondes entre deux lectures du terminal
+MAX_AGE_SECONDS = 2.0  # au-delà, les lecteurs repassent par le terminal
+
+BAR_DTYPE = np.dtype([
+    ("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8"),
+])
+HEADER_DTYPE = np.dtype([
+    ("seq", "<u8"), ("head", "<i8"), ("capacity", "<i8"), ("updated_ns", "<i8"),
+    ("time", "<i8"), ("bid", "<f8"), ("ask", "<f8"), ("last", "<f8"), ("volume", "<u8"),
+    ("time_msc", "<i8"), ("flags", "<u4"), ("volume_real", "<f8"),
+])
+
+# Mêmes champs que le Tick renvoyé par symbol_info_tick
+FeedTick = collections.namedtuple("FeedTick", "time bid ask last volume time_msc flags volume_real")
+
+
+def _block_views(buf, capacity):
+    header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=buf)
+    bars = np.ndarray((capacity,), dtype=BAR_DTYPE, buffer=buf, offset=HEADER_DTYPE.itemsize)
+    return header, bars
+
+
+class FeedWriter:
+    """
+    Bloc de mémoire partagée d'un symbole : dernier tick + ring buffer de bougies M1.
+
+    Chaque publication est encadrée par un seqlock : 'seq' est impair pendant
+    l'écriture et pair une fois terminée, les lecteurs relisent tant qu'il a bougé.
+    """
+
+    def __init__(self, symbol, capacity=RING_CAPACITY):
+        self.symbol = symbol
+        size = HEADER_DTYPE.itemsize + capacity * BAR_DTYPE.itemsize
+        try:
+            self.shm = shared_memory.SharedMemory(name=BLOCK_PREFIX + symbol, create=True, size=size)
+        except FileExistsError:
+            # Bloc laissé par un feed arrêté brutalement : on le remplace
+            stale = shared_memory.SharedMemory(name=BLOCK_PREFIX + symbol)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=BLOCK_PREFIX + symbol, create=True, size=size)
+        self.header, self.bars = _block_views(self.shm.buf, capacity)
+        self.header[:] = np.zeros(1, dtype=HEADER_DTYPE)
+        self.header["capacity"] = capacity
+
+    def publish(self, rates=None, tick=None):
+        """Ajoute/met à jour les bougies reçues (la dernière est en formation) et le dernier tick."""
+        header = self.header
+        capacity = int(header["capacity"][0])
+        header["seq"] += 1
+        try:
+            if rates is not None and len(rates):
+                head = int(header["head"][0])
+                last_time = self.bars[(head - 1) % capacity]["time"] if head else -1
+                if head and rates["time"][0] > last_time:
+                    # Trou depuis la dernière publication : on repart de zéro plutôt que de mélanger
+                    head = 0
+                if head:
+                    current = rates[rates["time"] == last_time]
+                    if len(current):
+                        self.bars[(head - 1) % capacity] = current.astype(BAR_DTYPE)[-1]
+                new = rates[rates["time"] > last_time][-capacity:]
+                self.bars[(head + np.arange(len(new))) % capacity] = new.astype(BAR_DTYPE)
+                header["head"] = head + len(new)
+            if tick is not None:
+                for field in FeedTick._fields:
+                    header[field] = getattr(tick, field)
+            header["updated_ns"] = time.time_ns()
+        finally:
+            header["seq"] += 1
+
+    @property
+    def last_bar_time(self):
+        head = int(self.header["head"][0])
+        return int(self.bars[(head - 1) % len(self.bars)]["time"]) if head else None
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class FeedReader:
+    """
+    Lecture d'un bloc publié par le feed, depuis n'importe quel process de la machine.
+
+    Seules les bougies demandées sont copiées hors de la mémoire partagée, sans appel
+    au terminal ni sérialisation.
+    """
+
+    def __init__(self, symbol, max_age=MAX_AGE_SECONDS, max_retries=1000):
+        self.symbol = symbol
+        self.max_age = max_age
+        self.max_retries = max_retries
+        self.shm = shared_memory.SharedMemory(name=BLOCK_PREFIX + symbol)
+        # Le bloc appartient au feed : ce process ne doit pas le supprimer à sa sortie
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+        capacity = (self.shm.size - HEADER_DTYPE.itemsize) // BAR_DTYPE.itemsize
+        self.header, self.bars = _block_views(self.shm.buf, capacity)
+
+    def _read(self, reader):
+        for _ in range(self.max_retries):
+            seq = int(self.header["seq"][0])
+            if seq % 2:
+                # Écriture en cours (quelques µs) : on laisse la main au lieu de tourner à vide
+                time.sleep(0)
+                continue
+            value = reader()
+            if int(self.header["seq"][0]) == seq:
+                return value
+        logging.warning("Lecture du feed %s abandonnée (écriture en cours)", self.symbol)
+        return None
+
+    def is_fresh(self) -> bool:
+        return (time.time_ns() - int(self.header["updated_ns"][0])) / 1e9 <= self.max_age
+
+    def get_bars(self, start, count):
+        """
+        Bougies comme copy_rates_from_pos(symbol, TIMEFRAME_M1, start, count).
+
+        Returns:
+            np.ndarray: Les bougies (moins que 'count' si le ring n'en a pas assez), None si illisible
+        """
+        def read():
+            head = int(self.header["head"][0])
+            capacity = len(self.bars)
+            available = max(min(head, capacity) - start, 0)
+            n = min(count, available)
+            indices = (np.arange(head - start - n, head - start)) % capacity
+            return self.bars[indices]
+
+        return self._read(read)
+
+    def get_tick(self):
+        def read():
+            row = self.header[0]
+            return FeedTick(*(row[field].item() for field in FeedTick._fields))
+
+        tick = self._read(read)
+        return tick if tick is not None and tick.time_msc else None
+
+    def close(self):
+        self.shm.close()
+
+
+class FeedBackend(MT5Proxy):
+    """
+    Backend MT5 (cf install_backend) qui sert symbol_info_tick et les bougies M1 depuis le feed
+    partagé quand il est disponible et à jour, et passe par le terminal sinon.
+
+    Un bloc resté périmé plus de retry_after secondes est refermé puis rouvert par son nom,
+    pour suivre un feed relancé (ancien bloc supprimé, nouveau bloc créé).
+    """
+
+    def __init__(self, backend=None, max_age=MAX_AGE_SECONDS, retry_after=30):
+        super().__init__(backend)
+        self.max_age = max_age
+        self.retry_after = retry_after
+        self._readers = {}
+        self._missing = {}
+        self._stale = {}
+
+    def _reader(self, symbol):
+        reader = self._readers.get(symbol)
+        if reader is not None:
+            if reader.is_fresh():
+                self._stale.pop(symbol, None)
+                return reader
+            if time.monotonic() - self._stale.setdefault(symbol, time.monotonic()) < self.retry_after:
+                return None
+            reader.close()
+            del self._readers[symbol]
+            del self._stale[symbol]
+        elif time.monotonic() - self._missing.get(symbol, -self.retry_after) < self.retry_after:
+            return None
+        try:
+            reader = FeedReader(symbol, self.max_age)
+        except FileNotFoundError:
+            self._missing[symbol] = time.monotonic()
+            return None
+        self._readers[symbol] = reader
+        return reader if reader.is_fresh() else None
+
+    def copy_rates_from_pos(self, symbol, timeframe, start, count):
+        if timeframe == self.backend.TIMEFRAME_M1:
+            reader = self._reader(symbol)
+            if reader is not None:
+                rates = reader.get_bars(start, count)
+                if rates is not None and len(rates) == count:
+                    return rates
+        return self.backend.copy_rates_from_pos(symbol, timeframe, start, count)
+
+    def symbol_info_tick(self, symbol):
+        reader = self._reader(symbol)
+        if reader is not None:
+            tick = reader.get_tick()
+            if tick is not None:
+                return tick
+        return self.backend.symbol_info_tick(symbol)
+
+
+class MarketFeed:
+    """
+    Process unique qui interroge le terminal et publie ticks et bougies M1 de plusieurs symboles.
+
+    Attributes:
+        symbols (list): Symboles publiés
+        interval (float): Délai entre deux lectures du terminal (secondes)
+    """
+
+    def __init__(self, symbols, capacity=RING_CAPACITY, interval=POLL_INTERVAL):
+        self.symbols = list(symbols)
+        self.capacity = capacity
+        self.interval = interval
+        self.writers = {symbol: FeedWriter(symbol, capacity) for symbol in self.symbols}
+
+    def poll(self, symbol):
+        writer = self.writers[symbol]
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is None:
+            logging.error("Feed : pas de tick pour %s (%s)", symbol, mt5.last_error())
+            return
+
+        last_time = writer.last_bar_time
+        if last_time is None:
+            count = self.capacity
+        else:
+            # Bougies apparues depuis la dernière publication + celle qui était en formation, comptées
+            # à l'heure serveur du tick (les bougies sont horodatées à l'heure du broker, pas en UTC)
+            count = min(self.capacity, max(2, int(tick.time - last_time) // 60 + 2))
+
+        rates = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M1, 0, count)
+        if rates is None:
+            logging.error("Feed : pas de données pour %s (%s)", symbol, mt5.last_error())
+            return
+        writer.publish(rates, tick)
+
+    def run(self):
+        logging.info("Feed démarré pour %s", ", ".join(self.symbols))
+        try:
+            while True:
+                start = time.perf_counter()
+                for symbol in self.symbols:
+                    self.poll(symbol)
+                time.sleep(max(0.0, self.interval - (time.perf_counter() - start)))
+        finally:
+            self.close()
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+
+if __name__ == "__main__":
+    from core.mt5_client import MT5Client
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Feed de marché partagé entre les bots de la machine")
+    parser.add_argument("--symbols", default="EURUSD,GBPUSD,USDJPY")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument("--capacity", type=int, default=RING_CAPACITY)
+    args = parser.parse_args()
+
+    client = MT5Client()
+    client.initialize_mt5()
+    MarketFeed([s for s in args.symbols.split(",") if s], args.capacity, args.interval).run()
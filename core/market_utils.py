@@ -0,0 +1,96 @@
+import numpy as np
+
+
+# Décalage de l'heure serveur MT5 par rapport à UTC : heure serveur du broker = UTC+2
+# (cf close_positions_after_45min)
+SERVER_OFFSET_HOURS = 2
+
+# Symbole principal tradé pour chaque devise de news
+NEWS_CURRENCY_SYMBOLS = {
+    'USD': 'EURUSD',
+    'EUR': 'EURUSD',
+    'GBP': 'GBPUSD',
+    'JPY': 'USDJPY',
+    'CHF': 'USDCHF',
+    'AUD': 'AUDUSD',
+    'CAD': 'USDCAD',
+    'NZD': 'NZDUSD',
+    'CNY': 'USDCNH',  # souvent nommée comme ça chez les brokers
+}
+
+
+def pip_size_for_symbol(symbol: str) -> float:
+    """Taille du pip déduite du nom du symbole (paires JPY à 2/3 décimales), sans appel MT5."""
+    return 0.01 if 'JPY' in symbol.upper() else 0.0001
+
+
+def pip_size_from_info(info) -> float:
+    """Taille du pip à partir du symbol_info (0.0001 par défaut si info absente)."""
+    if info is None:
+        return 0.0001
+    return 0.01 if info.digits == 3 or info.digits == 2 else 0.0001
+
+
+def volatility_from_rates(rates, lookback=3) -> float:
+    """Amplitude plus haut / plus bas sur les 'lookback' dernières bougies (0 si données insuffisantes)."""
+    if rates is None or len(rates) < lookback:
+        return 0
+    window = rates[-lookback:]
+    return float(np.max(window['high']) - np.min(window['low']))
+
+
+def sl_tp_from_price(direction, entry_price, volatility, pip_size, volatility_multiplier=1, tp_ratio=1.2):
+    """
+    Calcule SL/TP autour d'un prix d'entrée à partir d'une volatilité déjà connue.
+
+    Returns:
+        tuple: (sl_price, tp_price)
+    """
+    volatility_in_pips = volatility / pip_size
+    sl_pips = volatility_in_pips * volatility_multiplier
+    tp_pips = sl_pips * tp_ratio
+
+    if direction == "buy":
+        sl_price = entry_price - (sl_pips * pip_size)
+        tp_price = entry_price + (tp_pips * pip_size)
+    else:
+        sl_price = entry_price + (sl_pips * pip_size)
+        tp_price = entry_price - (tp_pips * pip_size)
+
+    return (sl_price, tp_price)
+
+
+def aggregate_rates(rates, period_seconds):
+    """
+    Agrège des bougies MT5 (tableau structuré time/open/high/low/close/...) en bougies de
+    'period_seconds', alignées comme celles du broker (début = time - time % période).
+
+    Le premier bucket est ignoré s'il ne commence pas sur sa borne (bougies manquantes
+    avant le début de la série) ; le dernier est la bougie en formation.
+
+    Returns:
+        np.ndarray: Tableau structuré de même dtype que 'rates'
+    """
+    if rates is None or not len(rates):
+        return rates
+
+    buckets = rates['time'] - rates['time'] % period_seconds
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    if rates['time'][0] != buckets[0]:
+        starts = starts[1:]
+        if not len(starts):
+            return rates[:0]
+    ends = np.append(starts[1:], len(rates))
+
+    aggregated = np.zeros(len(starts), dtype=rates.dtype)
+    aggregated['time'] = buckets[starts]
+    aggregated['open'] = rates['open'][starts]
+    aggregated['high'] = np.maximum.reduceat(rates['high'][starts[0]:], starts - starts[0])
+    aggregated['low'] = np.minimum.reduceat(rates['low'][starts[0]:], starts - starts[0])
+    aggregated['close'] = rates['close'][ends - 1]
+    for name in ('tick_volume', 'real_volume'):
+        if name in rates.dtype.names:
+            aggregated[name] = np.add.reduceat(rates[name][starts[0]:], starts - starts[0])
+    if 'spread' in rates.dtype.names:
+        aggregated['spread'] = rates['spread'][ends - 1]
+    return aggregated
@@ -0,0 +1,40 @@
+import importlib
+import sys
+
+
+class MT5Proxy:
+    """
+    Remplaçant du module MetaTrader5 : tout ce qui n'est pas redéfini par une sous-classe
+    (constantes, order_send, positions_get, ...) est délégué au module d'origine.
+
+    Attributes:
+        backend: Module (ou proxy) auquel les appels sont délégués
+    """
+
+    def __init__(self, backend=None):
+        # Par défaut, le backend actuellement installé (module MetaTrader5 ou autre proxy)
+        self.backend = backend if backend is not None else importlib.import_module("MetaTrader5")
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+def install_backend(backend):
+    """
+    Fait utiliser 'backend' à la place de MetaTrader5 par tous les modules du bot.
+
+    Les modules déjà importés qui référencent MetaTrader5 (`import MetaTrader5 as mt5`)
+    sont mis à jour, et les imports suivants reçoivent directement le backend. Installé avant
+    l'import des modules du bot, il permet de les faire tourner sans le package MetaTrader5.
+
+    Returns:
+        L'ancien backend, pour pouvoir le réinstaller
+    """
+    previous = sys.modules.get("MetaTrader5")
+    sys.modules["MetaTrader5"] = backend
+    if previous is None:
+        return None
+    for name, module in list(sys.modules.items()):
+        if (name in ("main", "__main__") or name.startswith("core.")) and getattr(module, "mt5", None) is previous:
+            module.mt5 = backend
+    return previous
@@ -0,0 +1,335 @@
+import argparse
+import collections
+import gzip
+import logging
+import pickle
+import threading
+import time
+from datetime import datetime
+from tabulate import tabulate
+from core.mt5_backend import MT5Proxy, install_backend
+
+
+# Configuration
+CAPTURE_MAGIC = b"ZLCAP1\n"
+FLUSH_INTERVAL = 1.0  # secondes : au pire, la dernière seconde d'appels est perdue si le bot est tué
+
+
+class _Struct(collections.namedtuple("_Struct", "typename fields values")):
+    """Résultat MT5 (TradePosition, SymbolInfo, Tick, ...) sous une forme qui se relit sans le package MetaTrader5."""
+
+
+_struct_types = {}
+
+
+def _encode(value):
+    if hasattr(value, "_asdict") and not isinstance(value, _Struct):
+        data = value._asdict()
+        return _Struct(type(value).__name__, tuple(data), tuple(_encode(item) for item in data.values()))
+    if type(value) in (tuple, list):
+        return type(value)(_encode(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    return value
+
+
+def _decode(value):
+    if isinstance(value, _Struct):
+        key = (value.typename, value.fields)
+        struct_type = _struct_types.get(key)
+        if struct_type is None:
+            struct_type = _struct_types[key] = collections.namedtuple(value.typename, value.fields)
+        return struct_type(*(_decode(item) for item in value.values))
+    if type(value) in (tuple, list):
+        return type(value)(_decode(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _decode(item) for key, item in value.items()}
+    return value
+
+
+# Un appel enregistré : heure (time.time()), durée (s), thread, fonction, arguments, résultat, exception
+CaptureRecord = collections.namedtuple("CaptureRecord", "time duration thread name args kwargs result error")
+
+
+def read_capture(path):
+    """
+    Lit un fichier de capture.
+
+    Returns:
+        tuple: (en-tête {started, constants}, générateur de CaptureRecord)
+    """
+    f = gzip.open(path, "rb")
+    if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+        f.close()
+        raise ValueError(f"{path} n'est pas un fichier de capture MT5")
+    header = pickle.load(f)
+
+    def records():
+        with f:
+            while True:
+                try:
+                    record = pickle.load(f)
+                except EOFError:
+                    return
+                except (gzip.BadGzipFile, pickle.UnpicklingError, ValueError):
+                    # Fin tronquée (bot tué pendant une écriture)
+                    logging.warning("Capture %s tronquée, lecture arrêtée", path)
+                    return
+                yield CaptureRecord(*record)
+
+    return header, records()
+
+
+class RecordingBackend(MT5Proxy):
+    """
+    Backend MT5 (cf install_backend) qui enregistre chaque appel de fonction mt5.* du bot :
+    arguments, résultat (ou exception), heure, durée et thread, dans un fichier binaire compressé.
+
+    Les constantes (TIMEFRAME_*, ORDER_TYPE_*, ...) sont sauvegardées une fois dans l'en-tête,
+    pour que ReplayBackend puisse tourner sans le package MetaTrader5.
+    """
+
+    def __init__(self, path, backend=None):
+        super().__init__(backend)
+        self.path = path
+        self.records = 0
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._file = gzip.open(path, "wb", compresslevel=6)
+        self._file.write(CAPTURE_MAGIC)
+        constants = {
+            name: getattr(self.backend, name) for name in dir(self.backend)
+            if name.isupper() and isinstance(getattr(self.backend, name), (int, float, str))
+        }
+        pickle.dump({"started": time.time(), "constants": constants}, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        logging.info("Capture des appels MT5 dans %s", path)
+
+    def __getattr__(self, name):
+        attribute = getattr(self.backend, name)
+        if not callable(attribute) or isinstance(attribute, type):
+            return attribute
+
+        def recorded(*args, **kwargs):
+            started = time.time()
+            start = time.perf_counter()
+            try:
+                result = attribute(*args, **kwargs)
+            except Exception as e:
+                self._write((started, time.perf_counter() - start, threading.current_thread().name,
+                             name, _encode(args), _encode(kwargs), None, repr(e)))
+                raise
+            self._write((started, time.perf_counter() - start, threading.current_thread().name,
+                         name, _encode(args), _encode(kwargs), _encode(result), None))
+            return result
+
+        return recorded
+
+    def _write(self, record):
+        data = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(data)
+            self.records += 1
+            if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                self._file.flush()
+                self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        logging.info("Capture MT5 fermée : %s appels enregistrés dans %s", self.records, self.path)
+
+
+class ReplayBackend:
+    """
+    Backend MT5 qui rejoue une capture : chaque appel reçoit le résultat enregistré.
+
+    Les résultats sont rendus dans l'ordre d'enregistrement, par (fonction, arguments) :
+    l'ordre entre threads (watchdog, évaluation spéculative) n'a donc pas besoin d'être
+    identique. Un appel sans équivalent exact reçoit le prochain résultat de la même fonction.
+
+    Attributes:
+        realtime (bool): Si True, chaque appel dure autant que pendant la capture
+        mismatches (int): Appels rejoués sans correspondance exacte des arguments
+        missing (collections.Counter): Appels sans aucun résultat enregistré, par fonction
+    """
+
+    def __init__(self, path, since=None, until=None, realtime=False):
+        header, records = read_capture(path)
+        self.constants = header["constants"]
+        self.realtime = realtime
+        self.mismatches = 0
+        self.missing = collections.Counter()
+        self._lock = threading.Lock()
+        self._by_call = collections.defaultdict(collections.deque)
+        self._by_name = collections.defaultdict(collections.deque)
+        self._consumed = set()
+        self._total = 0
+        for index, record in enumerate(records):
+            if (since is not None and record.time < since) or (until is not None and record.time > until):
+                continue
+            self._total += 1
+            entry = (index, record)
+            self._by_call[self._call_key(record.name, record.args, record.kwargs)].append(entry)
+            self._by_name[record.name].append(entry)
+
+    @staticmethod
+    def _call_key(name, args, kwargs):
+        return name, repr(args), repr(sorted(kwargs.items()))
+
+    def _next(self, name, args, kwargs):
+        key = self._call_key(name, _encode(args), _encode(kwargs))
+        with self._lock:
+            for queue, exact in ((self._by_call.get(key), True), (self._by_name.get(name), False)):
+                while queue:
+                    index, record = queue.popleft()
+                    if index in self._consumed:
+                        continue
+                    self._consumed.add(index)
+                    if not exact:
+                        self.mismatches += 1
+                    return record
+            self.missing[name] += 1
+            return None
+
+    def __getattr__(self, name):
+        if name in self.constants:
+            return self.constants[name]
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        def replayed(*args, **kwargs):
+            record = self._next(name, args, kwargs)
+            if record is None:
+                logging.warning("Replay MT5 : pas de résultat enregistré pour %s%s", name, args)
+                return None
+            if self.realtime:
+                time.sleep(record.duration)
+            if record.error is not None:
+                raise RuntimeError(f"{name} (capturé) : {record.error}")
+            return _decode(record.result)
+
+        return replayed
+
+    @property
+    def remaining(self) -> int:
+        """Nombre d'appels enregistrés pas encore rejoués."""
+        with self._lock:
+            return self._total - len(self._consumed)
+
+
+def summarize_capture(path):
+    """
+    Returns:
+        str: Tableau du nombre d'appels et des latences (ms) par fonction
+    """
+    header, records = read_capture(path)
+    durations = collections.defaultdict(list)
+    first = last = None
+    for record in records:
+        durations[record.name].append(record.duration * 1000)
+        first = record.time if first is None else first
+        last = record.time
+
+    table = [
+        [name, len(values), round(sum(values) / len(values), 2), round(max(values), 2), round(sum(values), 1)]
+        for name, values in sorted(durations.items(), key=lambda item: -sum(item[1]))
+    ]
+    headers = ["Fonction", "Appels", "Moy. (ms)", "Max (ms)", "Total (ms)"]
+    period = ""
+    if first is not None:
+        period = f"{datetime.fromtimestamp(first).isoformat(timespec='seconds')} -> " \
+                 f"{datetime.fromtimestamp(last).isoformat(timespec='seconds')}\n"
+    return period + tabulate(table, headers=headers, tablefmt="pretty")
+
+
+def replay_trigger(backend, country, title, enabled_strategies=("multi_timeframe",), reactions_path=None):
+    """
+    Rejoue hors ligne un déclenchement post-news (sélection du symbole puis stratégies).
+
+    Args:
+        backend: ReplayBackend chargé sur la fenêtre du déclenchement
+        country: Devise de la news
+        title: Titre exact de la news (ordre des candidats et commentaires d'ordres, comme en production)
+        enabled_strategies: Stratégies post-news à exécuter (cf main.STRATEGIES)
+        reactions_path: Table de réactions utilisée en production (REACTIONS_PATH par défaut)
+
+    Returns:
+        tuple: (sélection (symbol, trend) ou None, résultats des stratégies)
+    """
+    # Avant tout import des modules du bot : ils reçoivent directement le backend de replay
+    install_backend(backend)
+
+    from main import SYMBOL_RANKING, load_strategies
+    from core.reaction_table import REACTIONS_PATH, NewsReactionTable
+    from core.exposure_index import ExposureIndex
+    from core.position_snapshot import PositionSnapshot
+    from core.strategy_runtime import StrategyRuntime
+    from core.symbol_selector import SymbolSelector
+    from core.trading_engine import TradingEngine
+
+    snapshot = PositionSnapshot()
+    exposure = ExposureIndex()
+    snapshot.add_listener(exposure.on_snapshot)
+    snapshot.refresh()
+    # Même sélecteur qu'en production : mode de classement et table de réactions
+    reactions = NewsReactionTable.load(reactions_path or REACTIONS_PATH)
+    selector = SymbolSelector(snapshot, exposure, ranking=SYMBOL_RANKING, reactions=reactions)
+    runtime = StrategyRuntime(TradingEngine(snapshot, None, exposure))
+    for strategy_cls, phase, comment in load_strategies(enabled_strategies):
+        runtime.register(strategy_cls, comment)
+
+    selection = selector.get_best_symbol_multi_timeframe(country, title)
+    results = {}
+    if selection:
+        symbol, trend = selection
+        results = runtime.run_event(symbol, title, trend)
+    return selection, results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Capture / replay des appels MT5 du bot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    info_parser = subparsers.add_parser("info", help="Appels et latences par fonction")
+    info_parser.add_argument("path")
+
+    replay_parser = subparsers.add_parser("replay", help="Rejoue un déclenchement post-news")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--country", required=True)
+    replay_parser.add_argument("--title", required=True, help="Titre exact de la news (ordre des candidats)")
+    replay_parser.add_argument("--reactions", help="Table de réactions (data/news_reactions.json par défaut)")
+    replay_parser.add_argument("--since", required=True, help="Début de la fenêtre (ISO, ex: 2025-03-07T13:35:00+00:00)")
+    replay_parser.add_argument("--until", help="Fin de la fenêtre (ISO)")
+    replay_parser.add_argument("--strategies", default="multi_timeframe")
+    replay_parser.add_argument("--realtime", action="store_true", help="Reproduit les latences enregistrées")
+    replay_parser.add_argument("--profile", action="store_true", help="Profil cProfile du déclenchement")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        print(summarize_capture(args.path))
+    else:
+        since = datetime.fromisoformat(args.since).timestamp()
+        until = datetime.fromisoformat(args.until).timestamp() if args.until else None
+        strategies = tuple(name.strip() for name in args.strategies.split(",") if name.strip())
+        replay_backend = ReplayBackend(args.path, since, until, args.realtime)
+        logging.info("%s appels MT5 chargés", replay_backend.remaining)
+
+        start = time.perf_counter()
+        if args.profile:
+            import cProfile
+            import pstats
+            profiler = cProfile.Profile()
+            selection, results = profiler.runcall(replay_trigger, replay_backend, args.country, args.title, strategies,
+                                                  args.reactions)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
+        else:
+            selection, results = replay_trigger(replay_backend, args.country, args.title, strategies, args.reactions)
+        logging.info("Replay terminé en %.1f ms : sélection=%s, résultats=%s",
+                     (time.perf_counter() - start) * 1000, selection, results)
+        logging.info("Appels sans correspondance exacte : %s, sans résultat : %s",
+                     replay_backend.mismatches, dict(replay_backend.missing))
@@ -1,8 +1,52 @@
 import MetaTrader5 as mt5
+import contextlib
 import logging
 from config import ACCOUNT_NUMBER, PASSWORD, SERVER
+import threading
 import time
-import pandas as pd
+
+
+class SessionLock:
+    """
+    Shared/exclusive lock around the terminal session.
+    
+    Trading calls (order_send) hold it shared and still run in parallel; a reconnect holds it
+    exclusively, so the session is never torn down under an in-flight request. A waiting
+    reconnect blocks new shared holders so it cannot be starved.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+        self._exclusive_waiting = 0
+
+    @contextlib.contextmanager
+    def shared(self):
+        with self._condition:
+            self._condition.wait_for(lambda: not self._exclusive and not self._exclusive_waiting)
+            self._shared += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._shared -= 1
+                if not self._shared:
+                    self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def exclusive(self):
+        with self._condition:
+            self._exclusive_waiting += 1
+            self._condition.wait_for(lambda: not self._exclusive and not self._shared)
+            self._exclusive_waiting -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._exclusive = False
+                self._condition.notify_all()
 
 
 class MT5Client:
@@ -14,6 +58,10 @@ class MT5Client:
         password (str): MT5 account password
         server (str): MT5 server name
         connected (bool): Connection status flag
+        ready (threading.Event): Set while the watchdog heartbeat succeeds
+        session_lock (SessionLock): Held shared by the trading path, exclusively while reconnecting
+        last_latency_ms (float): Round-trip time of the last heartbeat
+        avg_latency_ms (float): Moving average of heartbeat round-trip times
     """
     
     def __init__(self, account_number=ACCOUNT_NUMBER, password=PASSWORD, server=SERVER):
@@ -29,6 +77,12 @@ class MT5Client:
         self.password = password
         self.server = server
         self.connected = False
+        self.ready = threading.Event()
+        self.session_lock = SessionLock()
+        self.last_latency_ms = None
+        self.avg_latency_ms = None
+        self._watchdog = None
+        self._watchdog_stop = threading.Event()
         
     def initialize_mt5(self):
         """
@@ -59,11 +113,120 @@ class MT5Client:
             bool: True if reconnection was successful, False otherwise
         """
         logging.info("Attempting to reconnect to MetaTrader 5...")
-        mt5.shutdown()  # Close existing session
-        time.sleep(5)  # Wait 5 seconds before reconnecting
-        self.connected = False
-        return self.initialize_mt5()
+        self.ready.clear()
+        with self.session_lock.exclusive():
+            mt5.shutdown()  # Close existing session
+            time.sleep(5)  # Wait 5 seconds before reconnecting
+            self.connected = False
+            return self.initialize_mt5()
+        
+    def heartbeat(self, symbol="EURUSD"):
+        """
+        Cheap liveness check: terminal_info plus one tick, timed as a round trip.
         
+        Args:
+            symbol (str): Symbol whose tick is requested
+            
+        Returns:
+            bool: True if the terminal is connected and answered
+        """
+        start = time.perf_counter()
+        info = mt5.terminal_info()
+        tick = mt5.symbol_info_tick(symbol)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        if info is None or not info.connected or tick is None:
+            return False
+
+        self.last_latency_ms = latency_ms
+        self.avg_latency_ms = latency_ms if self.avg_latency_ms is None else 0.8 * self.avg_latency_ms + 0.2 * latency_ms
+        return True
+
+    def _watchdog_loop(self, interval, symbol, max_backoff, max_failures):
+        backoff = 1
+        failures = 0
+        while not self._watchdog_stop.is_set():
+            if self.connected and self.heartbeat(symbol):
+                if not self.ready.is_set():
+                    logging.info("MT5 ready (heartbeat %.1f ms)", self.last_latency_ms)
+                self.ready.set()
+                backoff = 1
+                failures = 0
+                self._watchdog_stop.wait(interval)
+                continue
+
+            # A single missed heartbeat is retried before the session is considered lost
+            failures += 1
+            if self.connected and failures < max_failures:
+                logging.warning("MT5 heartbeat failed (%s/%s): %s", failures, max_failures, mt5.last_error())
+                self._watchdog_stop.wait(1)
+                continue
+
+            # Session lost: mark not ready, wait for in-flight orders, then reconnect with exponential backoff
+            if self.ready.is_set():
+                logging.warning("MT5 session lost after %s failed heartbeats: %s", failures, mt5.last_error())
+            self.ready.clear()
+            with self.session_lock.exclusive():
+                mt5.shutdown()
+                self.connected = False
+                reconnected = self.initialize_mt5() and self.heartbeat(symbol)
+            if reconnected:
+                logging.info("MT5 reconnected by watchdog")
+                failures = 0
+                continue
+
+            logging.warning("MT5 reconnect failed, next attempt in %ss", backoff)
+            self._watchdog_stop.wait(backoff)
+            backoff = min(backoff * 2, max_backoff)
+
+    def start_watchdog(self, interval=5, symbol="EURUSD", max_backoff=60, max_failures=3):
+        """
+        Start a background thread that heartbeats the terminal and reconnects proactively.
+        
+        Args:
+            interval (float): Seconds between heartbeats while connected
+            symbol (str): Symbol used for the tick heartbeat
+            max_backoff (float): Maximum delay between reconnect attempts
+            max_failures (int): Consecutive failed heartbeats before the session is torn down
+        """
+        if self._watchdog is not None and self._watchdog.is_alive():
+            return
+        self._watchdog_stop.clear()
+        self._watchdog = threading.Thread(
+            target=self._watchdog_loop, args=(interval, symbol, max_backoff, max_failures),
+            name="mt5-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    def stop_watchdog(self):
+        """Stop the watchdog thread."""
+        self._watchdog_stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def is_ready(self):
+        """
+        Readiness flag maintained by the watchdog (falls back to `connected` without watchdog).
+        
+        Returns:
+            bool: True if the terminal can be used right now
+        """
+        if self._watchdog is None:
+            return self.connected
+        return self.ready.is_set()
+
+    def wait_ready(self, timeout=None):
+        """
+        Block until the terminal is ready or the timeout expires.
+        
+        Returns:
+            bool: True if ready
+        """
+        if self._watchdog is None:
+            return self.connected
+        return self.ready.wait(timeout)
+
     def fetch_data(self, symbol, timeframe, count=100):
         """
         Fetch market data (candles) for the specified symbol and timeframe.
@@ -85,16 +248,19 @@ class MT5Client:
             logging.warning(f"Failed to fetch data for {symbol}")
             return None
             
+        import pandas as pd
+
         data = pd.DataFrame(rates)
         data['time'] = pd.to_datetime(data['time'], unit='s')
         return data
         
-    def check_existing_position(self, symbol):
+    def check_existing_position(self, symbol, snapshot=None):
         """
         Check if there's an existing position for the specified symbol.
         
         Args:
             symbol (str): Trading symbol to check
+            snapshot (PositionSnapshot): Cycle snapshot to query instead of calling MT5 (optional)
             
         Returns:
             bool: True if position exists, False otherwise
@@ -102,6 +268,9 @@ class MT5Client:
         if not self.connected:
             if not self.initialize_mt5():
                 return False
+
+        if snapshot is not None:
+            return snapshot.has_position(symbol)
                 
         positions = mt5.positions_get(symbol=symbol)
         if positions is None:
@@ -114,6 +283,8 @@ class MT5Client:
         """
         Shutdown the MT5 connection.
         """
+        self._watchdog_stop.set()
+        self.ready.clear()
         mt5.shutdown()
         self.connected = False
         logging.info("MT5 connection closed")
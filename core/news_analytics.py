@@ -0,0 +1,223 @@
+import argparse
+import logging
+import os
+import sqlite3
+import time
+import numpy as np
+from core.market_utils import SERVER_OFFSET_HOURS
+from core.optimizer import load_archived_events, load_bars, DATA_DIR, BARS_DIR
+
+
+# Configuration
+REPORT_FILE = "weekly_news_pretty/performance_report.txt"
+
+# Un trade est rattaché à la dernière news de l'une de ses devises ouverte dans cette fenêtre
+# (le sandwich est posé à T-1, le multi-timeframe à T+5)
+PRE_NEWS_SECONDS = 120
+POST_NEWS_SECONDS = 45 * 60
+
+# DEAL_ENTRY_IN / DEAL_ENTRY_OUT, DEAL_TYPE_BUY / DEAL_TYPE_SELL
+_ENTRY_IN, _ENTRY_OUT = 0, 1
+_DEAL_BUY, _DEAL_SELL = 0, 1
+
+
+def load_trades(db_path="data/deal_history.db", server_offset_hours=SERVER_OFFSET_HOURS):
+    """
+    Reconstruit les trades (une ligne par position) depuis la base DealHistory.
+
+    Returns:
+        pd.DataFrame: position_id, symbol, strategy, direction, open_time / close_time (UTC, secondes),
+            entry_price, exit_price, volume, profit, requested_price, order_setup_msc, open_msc
+    """
+    import pandas as pd
+
+    with sqlite3.connect(db_path) as connection:
+        deals = pd.read_sql_query(
+            "SELECT * FROM deals WHERE type IN (?, ?)", connection, params=(_DEAL_BUY, _DEAL_SELL)
+        )
+        orders = pd.read_sql_query(
+            "SELECT ticket AS order_ticket, price_open AS requested_price, time_setup_msc AS order_setup_msc FROM orders",
+            connection,
+        )
+
+    offset_msc = server_offset_hours * 3600 * 1000
+    deals["time_msc"] = deals["time_msc"] - offset_msc
+    deals["net"] = deals["profit"] + deals["commission"] + deals["swap"] + deals["fee"]
+    deals["notional"] = deals["price"] * deals["volume"]
+
+    entries = deals[deals["entry"] == _ENTRY_IN].rename(columns={"order": "order_ticket"})
+    exits = deals[deals["entry"] != _ENTRY_IN].groupby("position_id").agg(
+        close_msc=("time_msc", "max"), exit_notional=("notional", "sum"), exit_volume=("volume", "sum")
+    )
+    net = deals.groupby("position_id")["net"].sum()
+
+    trades = entries[["position_id", "order_ticket", "symbol", "strategy", "type", "time_msc", "price", "volume"]].rename(
+        columns={"time_msc": "open_msc", "price": "entry_price"}
+    )
+    trades = trades.join(exits, on="position_id").join(net.rename("profit"), on="position_id")
+    trades = trades.merge(orders, on="order_ticket", how="left")
+
+    trades["direction"] = np.where(trades["type"] == _DEAL_BUY, "buy", "sell")
+    trades["exit_price"] = trades["exit_notional"] / trades["exit_volume"]
+    trades["open_time"] = trades["open_msc"] // 1000
+    trades["close_time"] = trades["close_msc"] // 1000
+    trades["order_setup_msc"] = trades["order_setup_msc"] - offset_msc
+    return trades.drop(columns=["type", "exit_notional", "exit_volume"]).reset_index(drop=True)
+
+
+def attach_events(trades, events, pre_seconds=PRE_NEWS_SECONDS, post_seconds=POST_NEWS_SECONDS):
+    """
+    Rattache chaque trade à la news la plus proche avant son ouverture, sur l'une des deux devises du symbole.
+
+    Args:
+        trades: DataFrame de load_trades
+        events: Tuples (timestamp_utc, symbol, title, country) de load_archived_events
+
+    Returns:
+        pd.DataFrame: trades avec news_time, title, country (NaN si aucune news dans la fenêtre)
+    """
+    import pandas as pd
+
+    news = pd.DataFrame(events, columns=["news_time", "news_symbol", "title", "country"]).drop(columns="news_symbol")
+    news["country"] = news["country"].str.upper()
+    news["window_start"] = news["news_time"] - pre_seconds
+    news = news.sort_values("window_start")
+
+    # Une ligne par devise du symbole, puis merge_asof par devise
+    letters = trades["symbol"].str.upper().str.replace(r"[^A-Z]", "", regex=True)
+    legs = pd.concat([
+        trades.assign(country=letters.str[:3], leg=0),
+        trades.assign(country=letters.str[3:6], leg=1),
+    ]).reset_index().rename(columns={"index": "trade_index"}).sort_values("open_time")
+
+    matched = pd.merge_asof(
+        legs, news, left_on="open_time", right_on="window_start", by="country",
+        direction="backward", tolerance=pre_seconds + post_seconds,
+    ).dropna(subset=["news_time"])
+    matched["distance"] = (matched["open_time"] - matched["news_time"]).abs()
+    best = matched.sort_values("distance").drop_duplicates("trade_index").set_index("trade_index")
+
+    trades = trades.copy()
+    for column in ("news_time", "title", "country"):
+        trades[column] = best[column]
+    return trades
+
+
+def _range_extrema(values, starts, ends, ufunc):
+    """ufunc.reduce de values[start:end] pour chaque paire, en un seul reduceat."""
+    padded = np.append(values, values[-1])
+    indices = np.empty(len(starts) * 2, dtype=np.int64)
+    indices[0::2] = starts
+    indices[1::2] = ends
+    return ufunc.reduceat(padded, indices)[0::2]
+
+
+def add_excursions(trades, bars_dir=BARS_DIR):
+    """
+    Ajoute MAE / MFE (pips) à partir des bougies M1 locales, slippage (pips, positif = défavorable)
+    et délai entre création de l'ordre et exécution (ms).
+
+    Returns:
+        pd.DataFrame: trades avec pnl_pips, mae_pips, mfe_pips, slippage_pips, time_to_fill_ms
+    """
+    trades = trades.copy()
+    pip = np.where(trades["symbol"].str.upper().str.contains("JPY"), 0.01, 0.0001)
+    sign = np.where(trades["direction"] == "buy", 1.0, -1.0)
+
+    trades["pnl_pips"] = (trades["exit_price"] - trades["entry_price"]) * sign / pip
+    requested = trades["requested_price"].where(trades["requested_price"] > 0)
+    trades["slippage_pips"] = (trades["entry_price"] - requested) * sign / pip
+    trades["time_to_fill_ms"] = (trades["open_msc"] - trades["order_setup_msc"]).where(trades["order_setup_msc"] > 0)
+
+    trades["mae_pips"] = np.nan
+    trades["mfe_pips"] = np.nan
+    closed = trades["close_time"].notna()
+    for symbol, group in trades[closed].groupby("symbol"):
+        bars = load_bars(symbol, bars_dir)
+        if bars is None or not len(bars):
+            logging.warning("Pas de bougies locales pour %s, MAE/MFE non calculés", symbol)
+            continue
+
+        # Bougies M1 couvrant [ouverture, fermeture] (la bougie de l'ouverture incluse)
+        starts = np.maximum(np.searchsorted(bars[:, 0], group["open_time"].to_numpy(), side="right") - 1, 0)
+        ends = np.maximum(np.searchsorted(bars[:, 0], group["close_time"].to_numpy(), side="right"), starts + 1)
+        highest = _range_extrema(bars[:, 2], starts, ends, np.maximum)
+        lowest = _range_extrema(bars[:, 3], starts, ends, np.minimum)
+
+        entry = group["entry_price"].to_numpy()
+        is_buy = (group["direction"] == "buy").to_numpy()
+        group_pip = pip[group.index]
+        trades.loc[group.index, "mfe_pips"] = np.where(is_buy, highest - entry, entry - lowest) / group_pip
+        trades.loc[group.index, "mae_pips"] = np.where(is_buy, entry - lowest, highest - entry) / group_pip
+    return trades
+
+
+def summarize(trades, by):
+    """
+    Agrège les trades rattachés à une news par colonne ('strategy', 'title', ...).
+
+    Returns:
+        pd.DataFrame: Trades, win rate, P&L, moyennes pips / MAE / MFE / slippage / time-to-fill
+    """
+    trades = trades.dropna(subset=["title"]).assign(win=lambda df: df["profit"] > 0)
+    summary = trades.groupby(by).agg(
+        trades=("position_id", "count"),
+        events=("news_time", "nunique"),
+        win_rate=("win", "mean"),
+        profit=("profit", "sum"),
+        pnl_pips=("pnl_pips", "mean"),
+        mae_pips=("mae_pips", "mean"),
+        mfe_pips=("mfe_pips", "mean"),
+        slippage_pips=("slippage_pips", "mean"),
+        time_to_fill_ms=("time_to_fill_ms", "mean"),
+    )
+    return summary.sort_values("profit", ascending=False)
+
+
+def format_summary(summary):
+    from tabulate import tabulate
+
+    table = summary.reset_index()
+    table["win_rate"] = (table["win_rate"] * 100).round(1)
+    headers = [str(table.columns[0]).capitalize(), "Trades", "Events", "Win %", "Profit", "Pips (moy)",
+               "MAE (pips)", "MFE (pips)", "Slippage (pips)", "Fill (ms)"]
+    return tabulate(table.round(2).values.tolist(), headers=headers, tablefmt="pretty")
+
+
+def build_report(db_path="data/deal_history.db", data_dir=DATA_DIR, bars_dir=BARS_DIR, output_txt=REPORT_FILE):
+    """
+    Rapport de performance par stratégie et par titre de news, sauvegardé en texte.
+
+    Returns:
+        str: Le rapport
+    """
+    start = time.perf_counter()
+    trades = load_trades(db_path)
+    trades = attach_events(trades, load_archived_events(data_dir))
+    trades = add_excursions(trades, bars_dir)
+
+    report = "\n\n".join([
+        "Performance par stratégie", format_summary(summarize(trades, "strategy")),
+        "Performance par news", format_summary(summarize(trades, "title")),
+    ])
+
+    directory = os.path.dirname(output_txt)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_txt, "w", encoding="utf-8") as f:
+        f.write(report)
+
+    logging.info("OK - Rapport de %s trades généré en %.2fs : %s", len(trades), time.perf_counter() - start, output_txt)
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Performance des trades par stratégie et par news")
+    parser.add_argument("--db", default="data/deal_history.db")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--bars-dir", default=BARS_DIR)
+    parser.add_argument("--output", default=REPORT_FILE)
+    args = parser.parse_args()
+
+    print(build_report(args.db, args.data_dir, args.bars_dir, args.output))
@@ -0,0 +1,552 @@
+import argparse
+import glob
+import hashlib
+import inspect
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+import numpy as np
+from tabulate import tabulate
+from core.backtest_cache import BacktestCache
+from core import market_utils
+from core.market_utils import NEWS_CURRENCY_SYMBOLS, SERVER_OFFSET_HOURS, pip_size_for_symbol, sl_tp_from_price
+
+
+# Configuration
+DATA_DIR = "weekly_news_json"
+BARS_DIR = "bars"
+CACHE_DIR = ".backtest_cache"
+CACHE_MAX_MB = 512
+BAR_COLUMNS = ("time", "open", "high", "low", "close")
+TIME, OPEN, HIGH, LOW, CLOSE = range(len(BAR_COLUMNS))
+
+# Expiration des ordres pending, cf TradingEngine.prepare_pending_order_request
+PENDING_EXPIRATION_MINUTES = 15
+
+# Valeurs actuellement codées en dur dans les stratégies
+DEFAULT_PARAMS = {
+    "lookback": 5,                  # TradingStrategySandwich.get_high_and_low
+    "buffer_pips": 3,               # TradingStrategySandwich.get_high_and_low
+    "volatility_multiplier": 1,     # calculate_sl_tp_from_price
+    "tp_ratio": 1.2,                # calculate_sl_tp_from_price
+    "grid_multiplier": 1.5,         # TradingStrategy.set_grid_and_hedge_pips_value
+    "drawdown_multiplier": 4,       # TradingStrategy.set_grid_and_hedge_pips_value
+    "close_after_minutes": 45,      # TradingEngine.close_positions_after_45min
+}
+
+DEFAULT_GRID = {
+    "sandwich": {
+        "lookback": [3, 5, 10],
+        "buffer_pips": [1, 3, 5],
+        "volatility_multiplier": [0.5, 1, 1.5],
+        "tp_ratio": [1, 1.2, 2],
+        "close_after_minutes": [15, 30, 45],
+    },
+    "grid": {
+        "volatility_multiplier": [0.5, 1, 1.5],
+        "tp_ratio": [1, 1.2, 2],
+        "grid_multiplier": [1, 1.5, 2],
+        "drawdown_multiplier": [3, 4, 6],
+        "close_after_minutes": [15, 30, 45],
+    },
+}
+
+
+def load_archived_weeks(data_dir=DATA_DIR, impact="High"):
+    """
+    Charge les news archivées (fichiers hebdo déjà traités par process_news), semaine par semaine.
+
+    Returns:
+        list: Tuples (nom du fichier, hash du contenu, événements) ; les événements sont
+              des tuples (timestamp_utc, symbol, title, country) triés par date
+    """
+    weeks = []
+    for filename in sorted(glob.glob(os.path.join(data_dir, "forex_*.json"))):
+        with open(filename, 'rb') as f:
+            content = f.read()
+        data = json.loads(content.decode('utf-8'))
+
+        events = []
+        for news in data:
+            if news.get('impact') != impact or not news.get('date_utc'):
+                continue
+            symbol = NEWS_CURRENCY_SYMBOLS.get(news['country'].upper())
+            if symbol is None:
+                continue
+            timestamp = int(datetime.fromisoformat(news['date_utc']).timestamp())
+            events.append((timestamp, symbol, news['title'], news['country']))
+
+        events.sort()
+        weeks.append((os.path.basename(filename), hashlib.sha256(content).hexdigest(), events))
+    return weeks
+
+
+def load_archived_events(data_dir=DATA_DIR, impact="High"):
+    """
+    Charge les news archivées de toutes les semaines.
+
+    Returns:
+        list: Tuples (timestamp_utc, symbol, title, country) triés par date
+    """
+    events = [event for _, _, week_events in load_archived_weeks(data_dir, impact) for event in week_events]
+    events.sort()
+    return events
+
+
+def load_bars(symbol, bars_dir=BARS_DIR):
+    """
+    Charge les bougies M1 locales d'un symbole.
+
+    Formats acceptés : `<symbol>_M1.npy` (tableau float64 (n, 5)) ou `<symbol>_M1.csv`
+    avec en-tête contenant au moins time (timestamp UTC en secondes), open, high, low, close.
+
+    Returns:
+        np.ndarray: Tableau float64 (n, 5) trié par temps, ou None si absent
+    """
+    npy_path = os.path.join(bars_dir, f"{symbol}_M1.npy")
+    csv_path = os.path.join(bars_dir, f"{symbol}_M1.csv")
+
+    if os.path.exists(npy_path):
+        bars = np.load(npy_path)
+    elif os.path.exists(csv_path):
+        with open(csv_path, 'r', encoding='utf-8') as f:
+            header = f.readline().strip().split(',')
+        columns = [header.index(column) for column in BAR_COLUMNS]
+        bars = np.loadtxt(csv_path, delimiter=',', skiprows=1, usecols=columns, ndmin=2)
+    else:
+        return None
+
+    bars = np.ascontiguousarray(bars, dtype=np.float64)
+    return bars[np.argsort(bars[:, TIME], kind="stable")]
+
+
+def export_bars(symbol, date_from, date_to, bars_dir=BARS_DIR):
+    """
+    Exporte depuis MT5 les bougies M1 d'un symbole au format attendu par load_bars.
+
+    Les horodatages MT5 sont en heure serveur (UTC+SERVER_OFFSET_HOURS) : ils sont
+    ramenés en UTC avant l'écriture, comme les timestamps des news archivées.
+    """
+    import MetaTrader5 as mt5
+
+    rates = mt5.copy_rates_range(symbol, mt5.TIMEFRAME_M1, date_from, date_to)
+    if rates is None:
+        logging.error(f"Impossible d'exporter les bougies de {symbol} : {mt5.last_error()}")
+        return None
+
+    os.makedirs(bars_dir, exist_ok=True)
+    bars = np.column_stack([rates[column].astype(np.float64) for column in BAR_COLUMNS])
+    bars[:, TIME] -= SERVER_OFFSET_HOURS * 3600
+    path = os.path.join(bars_dir, f"{symbol}_M1.npy")
+    np.save(path, bars)
+    # Spreads en pips à côté des bougies, pour le coût des réactions aux news (cf reaction_table)
+    info = mt5.symbol_info(symbol)
+    if info is not None:
+        spreads = rates['spread'].astype(np.float64) * info.point / pip_size_for_symbol(symbol)
+        np.save(os.path.join(bars_dir, f"{symbol}_M1_spread.npy"), spreads)
+    logging.info(f"OK - {len(bars)} bougies exportées dans : {path}")
+    return path
+
+
+class SharedBars:
+    """
+    Copie une seule fois les bougies de chaque symbole en mémoire partagée.
+
+    Les workers s'y attachent par nom et lisent les tableaux sans copie.
+    """
+
+    def __init__(self, bars_by_symbol):
+        self.blocks = {}
+        self.specs = {}
+        for symbol, bars in bars_by_symbol.items():
+            shm = shared_memory.SharedMemory(create=True, size=max(bars.nbytes, 1))
+            view = np.ndarray(bars.shape, dtype=np.float64, buffer=shm.buf)
+            view[:] = bars
+            self.blocks[symbol] = shm
+            self.specs[symbol] = (shm.name, bars.shape)
+
+    def close(self):
+        for shm in self.blocks.values():
+            shm.close()
+            shm.unlink()
+        self.blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# État des workers, initialisé une fois par processus
+_worker_bars = {}
+_worker_blocks = []
+_worker_events = []
+
+
+def _init_worker(specs, week_events):
+    for symbol, (name, shape) in specs.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_blocks.append(shm)
+        _worker_bars[symbol] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker_events[:] = week_events
+
+
+def _first_true(mask):
+    """Indice du premier True, ou -1."""
+    if not mask.size:
+        return -1
+    index = int(np.argmax(mask))
+    return index if mask[index] else -1
+
+
+def simulate_leg(bars, start, side, kind, entry, sl, tp, expiry_bars, hold_bars):
+    """
+    Simule un ordre à l'échelle de la bougie M1 (prix bid, sans spread).
+
+    Si SL et TP sont touchés dans la même bougie, on retient le SL (hypothèse pessimiste).
+
+    Args:
+        bars: Bougies (n, 5)
+        start: Indice de la bougie où l'ordre est envoyé
+        side: 'buy' ou 'sell'
+        kind: 'market', 'stop' ou 'limit'
+        entry: Prix d'entrée (ignoré pour 'market', on prend l'open de la bougie)
+        sl: Niveau de stop loss
+        tp: Niveau de take profit
+        expiry_bars: Durée de vie de l'ordre pending en bougies
+        hold_bars: Durée maximale de la position en bougies
+
+    Returns:
+        float: P&L en unités de prix, ou None si l'ordre n'a jamais été exécuté
+    """
+    if start >= len(bars):
+        return None
+
+    if kind == "market":
+        fill = start
+        entry = bars[start, OPEN]
+    else:
+        window = bars[start:start + expiry_bars]
+        triggers_up = (side == "buy") == (kind == "stop")
+        mask = window[:, HIGH] >= entry if triggers_up else window[:, LOW] <= entry
+        offset = _first_true(mask)
+        if offset < 0:
+            return None
+        fill = start + offset
+
+    window = bars[fill:fill + max(hold_bars, 1)]
+    if side == "buy":
+        sl_hit = _first_true(window[:, LOW] <= sl)
+        tp_hit = _first_true(window[:, HIGH] >= tp)
+    else:
+        sl_hit = _first_true(window[:, HIGH] >= sl)
+        tp_hit = _first_true(window[:, LOW] <= tp)
+
+    if sl_hit >= 0 and (tp_hit < 0 or sl_hit <= tp_hit):
+        exit_price = sl
+    elif tp_hit >= 0:
+        exit_price = tp
+    else:
+        exit_price = window[-1, CLOSE]
+
+    return (exit_price - entry) if side == "buy" else (entry - exit_price)
+
+
+def _detect_trend(rates):
+    """Même règle que TradingStrategy.detect_trend, sur les 3 dernières bougies."""
+    bullish = rates[:, CLOSE] > rates[:, OPEN]
+    bearish = rates[:, CLOSE] < rates[:, OPEN]
+    if bullish.sum() >= 2 and rates[-1, CLOSE] > rates[:-1, HIGH].mean():
+        return "buy"
+    if bearish.sum() >= 2 and rates[-1, CLOSE] < rates[:-1, LOW].mean():
+        return "sell"
+    return None
+
+
+def _volatility(rates):
+    return float(rates[:, HIGH].max() - rates[:, LOW].min())
+
+
+def simulate_sandwich(bars, timestamp, pip_size, params):
+    """Sandwich placé à T-1 : buy stop au-dessus du plus haut, sell stop sous le plus bas."""
+    trigger = int(np.searchsorted(bars[:, TIME], timestamp - 60))
+    lookback = int(params["lookback"])
+    if trigger < max(lookback, 3) or trigger >= len(bars):
+        return []
+
+    rates = bars[trigger - lookback:trigger]
+    high = rates[:, HIGH].max() + params["buffer_pips"] * pip_size
+    low = rates[:, LOW].min() - params["buffer_pips"] * pip_size
+    volatility = _volatility(bars[trigger - 3:trigger])
+
+    hold_bars = int(params["close_after_minutes"])
+    pnls = []
+    for side, entry in (("buy", high), ("sell", low)):
+        sl, tp = sl_tp_from_price(side, entry, volatility, pip_size, params["volatility_multiplier"], params["tp_ratio"])
+        pnls.append(simulate_leg(bars, trigger, side, "stop", entry, sl, tp, PENDING_EXPIRATION_MINUTES, hold_bars))
+    return [pnl for pnl in pnls if pnl is not None]
+
+
+def simulate_grid(bars, timestamp, pip_size, params):
+    """Trade initial à T+5 dans le sens de la tendance, puis grid de limites et hedge stop (TradingStrategy)."""
+    trigger = int(np.searchsorted(bars[:, TIME], timestamp + 300))
+    if trigger < 3 or trigger >= len(bars):
+        return []
+
+    rates = bars[trigger - 3:trigger]
+    trend = _detect_trend(rates)
+    if trend is None:
+        return []
+
+    volatility = _volatility(rates)
+    hold_bars = int(params["close_after_minutes"])
+    entry = bars[trigger, OPEN]
+    sign = 1 if trend == "buy" else -1
+
+    sl, tp = sl_tp_from_price(trend, entry, volatility, pip_size, params["volatility_multiplier"], params["tp_ratio"])
+    pnls = [simulate_leg(bars, trigger, trend, "market", entry, sl, tp, 0, hold_bars)]
+
+    volatility_pips = volatility / pip_size
+    grid_levels = [
+        max(minimum, round(volatility_pips * params["grid_multiplier"] * step))
+        for step, minimum in ((1, 10), (2, 20), (3, 30))
+    ]
+    for level in grid_levels:
+        grid_price = entry - sign * level * pip_size
+        sl, tp = sl_tp_from_price(trend, grid_price, volatility, pip_size, params["volatility_multiplier"], params["tp_ratio"])
+        pnls.append(simulate_leg(bars, trigger, trend, "limit", grid_price, sl, tp, PENDING_EXPIRATION_MINUTES, hold_bars))
+
+    max_drawdown = max(30, round(volatility_pips * params["drawdown_multiplier"]))
+    hedge_side = "sell" if trend == "buy" else "buy"
+    hedge_price = entry - sign * max_drawdown * pip_size
+    hedge_sl = hedge_price + sign * 10 * pip_size
+    hedge_tp = hedge_price - sign * 50 * pip_size
+    pnls.append(simulate_leg(bars, trigger, hedge_side, "stop", hedge_price, hedge_sl, hedge_tp, PENDING_EXPIRATION_MINUTES, hold_bars))
+
+    return [pnl for pnl in pnls if pnl is not None]
+
+
+SIMULATORS = {
+    "sandwich": simulate_sandwich,
+    "grid": simulate_grid,
+}
+
+
+def simulate_events(strategy, params, events, bars_by_symbol):
+    """
+    Simule une stratégie sur une liste de news.
+
+    Returns:
+        np.ndarray: P&L de chaque trade en pips, dans l'ordre des news
+    """
+    simulator = SIMULATORS[strategy]
+    full_params = {**DEFAULT_PARAMS, **params}
+    trade_pips = []
+
+    for timestamp, symbol, title, country in events:
+        bars = bars_by_symbol.get(symbol)
+        if bars is None or not len(bars):
+            continue
+        pip_size = pip_size_for_symbol(symbol)
+        trade_pips.extend(pnl / pip_size for pnl in simulator(bars, timestamp, pip_size, full_params))
+
+    return np.asarray(trade_pips, dtype=np.float64)
+
+
+def summarize_trades(params, trade_pips):
+    """
+    Returns:
+        dict: Paramètres, P&L total et drawdown max (en pips), nombre de trades et taux de réussite
+    """
+    equity = np.cumsum(trade_pips)
+    drawdown = float(np.max(np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:] - equity)) if equity.size else 0.0
+
+    return {
+        "params": params,
+        "pnl_pips": float(trade_pips.sum()),
+        "max_drawdown_pips": drawdown,
+        "trades": int(trade_pips.size),
+        "win_rate": float((trade_pips > 0).mean()) if trade_pips.size else 0.0,
+    }
+
+
+def evaluate(strategy, params, events, bars_by_symbol):
+    """
+    Évalue un jeu de paramètres sur toutes les news.
+
+    Returns:
+        dict: Cf summarize_trades
+    """
+    return summarize_trades(params, simulate_events(strategy, params, events, bars_by_symbol))
+
+
+def _simulate_weeks_in_worker(strategy, params, week_indices):
+    return [simulate_events(strategy, params, _worker_events[index], _worker_bars) for index in week_indices]
+
+
+def code_version(strategy):
+    """
+    Hash du code qui détermine le résultat d'une simulation : toute modification de ce
+    module ou de market_utils (simulateurs et tous leurs helpers) invalide les résultats en cache.
+    """
+    sources = [inspect.getsource(module) for module in (sys.modules[__name__], market_utils)]
+    return BacktestCache.make_key(strategy, *sources)
+
+
+def bars_range_hash(events, bars_by_symbol, margin_seconds=86400):
+    """
+    Hash des bougies utilisées par les news d'une semaine (plage des news ± 'margin_seconds',
+    de quoi couvrir lookback et durée de détention).
+    """
+    if not events:
+        return BacktestCache.make_key("")
+    date_from = events[0][0] - margin_seconds
+    date_to = events[-1][0] + margin_seconds
+
+    parts = []
+    for symbol in sorted({symbol for _, symbol, _, _ in events}):
+        bars = bars_by_symbol[symbol]
+        lo, hi = np.searchsorted(bars[:, TIME], (date_from, date_to))
+        parts.extend((symbol, np.ascontiguousarray(bars[lo:hi]).tobytes()))
+    return BacktestCache.make_key(*parts)
+
+
+def expand_grid(grid):
+    """Produit cartésien d'un dict {paramètre: [valeurs]} -> liste de dicts."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def rank_results(results):
+    """Classe par P&L décroissant puis drawdown croissant."""
+    return sorted(results, key=lambda r: (-r["pnl_pips"], r["max_drawdown_pips"]))
+
+
+def run_sweep(strategy="sandwich", grid=None, data_dir=DATA_DIR, bars_dir=BARS_DIR, workers=None, cache=None):
+    """
+    Lance l'évaluation de toutes les combinaisons de paramètres sur un pool de processus.
+
+    Les bougies sont chargées une fois puis partagées aux workers via la mémoire partagée.
+    Avec un cache, chaque cellule (combinaison, semaine) déjà simulée avec le même code,
+    le même calendrier et les mêmes bougies est relue au lieu d'être recalculée.
+
+    Args:
+        cache: BacktestCache (None = tout recalculer)
+
+    Returns:
+        list: Résultats classés par P&L puis drawdown
+    """
+    grid = grid if grid is not None else DEFAULT_GRID[strategy]
+    weeks = load_archived_weeks(data_dir)
+    symbols = sorted({symbol for _, _, events in weeks for _, symbol, _, _ in events})
+
+    bars_by_symbol = {}
+    for symbol in symbols:
+        bars = load_bars(symbol, bars_dir)
+        if bars is None:
+            logging.warning(f"Pas de bougies locales pour {symbol}, news ignorées")
+            continue
+        bars_by_symbol[symbol] = bars
+
+    weeks = [
+        (filename, calendar_hash, [event for event in events if event[1] in bars_by_symbol])
+        for filename, calendar_hash, events in weeks
+    ]
+    week_events = [events for _, _, events in weeks]
+    combinations = expand_grid(grid)
+    logging.info(f"Sweep {strategy} : {len(combinations)} combinaisons sur "
+                 f"{sum(len(events) for events in week_events)} news ({len(weeks)} semaines)")
+
+    # cells[i][w] : P&L des trades de la combinaison i sur la semaine w
+    cells = [[None] * len(weeks) for _ in combinations]
+    keys = None
+    if cache is not None:
+        version = code_version(strategy)
+        week_hashes = [
+            BacktestCache.make_key(calendar_hash, bars_range_hash(events, bars_by_symbol))
+            for _, calendar_hash, events in weeks
+        ]
+        keys = [
+            [BacktestCache.make_key(version, strategy, json.dumps(params, sort_keys=True), week_hash) for week_hash in week_hashes]
+            for params in combinations
+        ]
+        for i, row in enumerate(keys):
+            for w, key in enumerate(row):
+                cells[i][w] = cache.get(key)
+
+    missing = [(i, [w for w, cell in enumerate(row) if cell is None]) for i, row in enumerate(cells)]
+    missing = [(i, week_indices) for i, week_indices in missing if week_indices]
+
+    start = time.perf_counter()
+    if missing:
+        with SharedBars(bars_by_symbol) as shared:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared.specs, week_events)) as executor:
+                futures = {
+                    executor.submit(_simulate_weeks_in_worker, strategy, combinations[i], week_indices): (i, week_indices)
+                    for i, week_indices in missing
+                }
+                for future, (i, week_indices) in futures.items():
+                    for w, trade_pips in zip(week_indices, future.result()):
+                        cells[i][w] = trade_pips
+                        if cache is not None:
+                            cache.put(keys[i][w], trade_pips)
+
+    computed = sum(len(week_indices) for _, week_indices in missing)
+    logging.info(f"Sweep terminé en {time.perf_counter() - start:.1f}s ({computed} cellules calculées)")
+    if cache is not None:
+        logging.info(f"Cache backtest : {cache.hits} hits / {cache.hits + cache.misses} cellules "
+                     f"({cache.hit_rate:.0%})")
+        cache.evict()
+
+    results = [
+        summarize_trades(params, np.concatenate(row) if row else np.empty(0))
+        for params, row in zip(combinations, cells)
+    ]
+    return rank_results(results)
+
+
+def format_results(results, top=20):
+    """Tableau texte des meilleurs jeux de paramètres (même format que save_pretty_news_table)."""
+    table = [
+        [
+            ", ".join(f"{key}={value}" for key, value in result["params"].items()),
+            round(result["pnl_pips"], 1),
+            round(result["max_drawdown_pips"], 1),
+            result["trades"],
+            f"{result['win_rate']:.0%}",
+        ]
+        for result in results[:top]
+    ]
+    headers = ["Params", "P&L (pips)", "Max DD (pips)", "Trades", "Win rate"]
+    return tabulate(table, headers=headers, tablefmt="pretty")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Sweep des paramètres des stratégies sur les news archivées")
+    parser.add_argument("--strategy", choices=sorted(SIMULATORS), default="sandwich")
+    parser.add_argument("--grid", help="Fichier JSON {paramètre: [valeurs]} (grille par défaut sinon)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--bars-dir", default=BARS_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--cache-size-mb", type=int, default=CACHE_MAX_MB)
+    parser.add_argument("--no-cache", action="store_true", help="Recalcule toutes les cellules sans lire ni écrire le cache")
+    args = parser.parse_args()
+
+    custom_grid = None
+    if args.grid:
+        with open(args.grid, 'r', encoding='utf-8') as f:
+            custom_grid = json.load(f)
+
+    backtest_cache = None if args.no_cache else BacktestCache(args.cache_dir, args.cache_size_mb * 1024 * 1024)
+    ranked = run_sweep(args.strategy, custom_grid, args.data_dir, args.bars_dir, args.workers, backtest_cache)
+    print(format_results(ranked, args.top))
@@ -0,0 +1,186 @@
+import MetaTrader5 as mt5
+import logging
+import time
+
+
+class PositionSnapshot:
+    """
+    Photo des positions et ordres en attente du compte, prise une seule fois
+    par cycle de la boucle principale (ou après un fill).
+
+    Les positions et ordres sont indexés par symbole, magic number et commentaire
+    pour que SymbolSelector, TradingEngine et MT5Client puissent les interroger
+    en O(1) sans refaire d'appel `positions_get` / `orders_get` sur tout le compte.
+
+    Attributes:
+        positions (tuple): Positions ouvertes au moment du snapshot
+        orders (tuple): Ordres en attente au moment du snapshot
+        taken_at (float): Timestamp (time.time()) du dernier refresh
+        valid (bool): False si MT5 a renvoyé une erreur lors du dernier refresh
+        stale (bool): True si le snapshot doit être rafraîchi avant lecture
+    """
+
+    def __init__(self):
+        self.positions = ()
+        self.orders = ()
+        self.taken_at = None
+        self.valid = False
+        self.stale = True
+        self.restored_tickets = None
+        self.listeners = []
+        self._positions_by_symbol = {}
+        self._positions_by_magic = {}
+        self._positions_by_comment = {}
+        self._orders_by_symbol = {}
+        self._orders_by_magic = {}
+        self._orders_by_comment = {}
+
+    @staticmethod
+    def _build_index(items, attribute):
+        index = {}
+        for item in items:
+            index.setdefault(getattr(item, attribute), []).append(item)
+        return {key: tuple(values) for key, values in index.items()}
+
+    def refresh(self) -> bool:
+        """
+        Récupère positions et ordres en deux appels MT5 et reconstruit les index.
+
+        Returns:
+            bool: True si les deux appels ont réussi, False sinon
+        """
+        positions = mt5.positions_get()
+        orders = mt5.orders_get()
+
+        self.valid = positions is not None and orders is not None
+        if not self.valid:
+            logging.error(f"Erreur lors du snapshot des positions/ordres : {mt5.last_error()}")
+
+        self.positions = tuple(positions) if positions is not None else ()
+        self.orders = tuple(orders) if orders is not None else ()
+
+        self._positions_by_symbol = self._build_index(self.positions, "symbol")
+        self._positions_by_magic = self._build_index(self.positions, "magic")
+        self._positions_by_comment = self._build_index(self.positions, "comment")
+        self._orders_by_symbol = self._build_index(self.orders, "symbol")
+        self._orders_by_magic = self._build_index(self.orders, "magic")
+        self._orders_by_comment = self._build_index(self.orders, "comment")
+
+        self.taken_at = time.time()
+        self.stale = False
+        for listener in self.listeners:
+            listener(self)
+        return self.valid
+
+    def add_listener(self, listener):
+        """Ajoute un callback appelé avec le snapshot après chaque refresh."""
+        self.listeners.append(listener)
+
+    def invalidate(self):
+        """Marque le snapshot comme périmé (ex: après un fill), il sera rafraîchi à la prochaine lecture."""
+        self.stale = True
+
+    def _ensure_fresh(self):
+        if self.stale:
+            self.refresh()
+
+    @staticmethod
+    def _select(by_symbol, by_magic, by_comment, all_items, symbol, magic, comment):
+        # On part de l'index le plus sélectif disponible puis on filtre le reste
+        if symbol is not None:
+            items = by_symbol.get(symbol, ())
+        elif comment is not None:
+            items = by_comment.get(comment, ())
+        elif magic is not None:
+            items = by_magic.get(magic, ())
+        else:
+            return all_items
+
+        return tuple(
+            item for item in items
+            if (magic is None or item.magic == magic)
+            and (comment is None or item.comment == comment)
+        )
+
+    def get_positions(self, symbol=None, magic=None, comment=None) -> tuple:
+        """
+        Retourne les positions correspondant aux filtres donnés.
+
+        Args:
+            symbol: Symbole du trading
+            magic: Magic number des ordres
+            comment: Commentaire exact de la position
+
+        Returns:
+            tuple: Positions correspondantes (toutes si aucun filtre)
+        """
+        self._ensure_fresh()
+        return self._select(
+            self._positions_by_symbol, self._positions_by_magic, self._positions_by_comment,
+            self.positions, symbol, magic, comment
+        )
+
+    def get_orders(self, symbol=None, magic=None, comment=None) -> tuple:
+        """
+        Retourne les ordres en attente correspondant aux filtres donnés.
+
+        Args:
+            symbol: Symbole du trading
+            magic: Magic number des ordres
+            comment: Commentaire exact de l'ordre
+
+        Returns:
+            tuple: Ordres correspondants (tous si aucun filtre)
+        """
+        self._ensure_fresh()
+        return self._select(
+            self._orders_by_symbol, self._orders_by_magic, self._orders_by_comment,
+            self.orders, symbol, magic, comment
+        )
+
+    def has_position(self, symbol: str) -> bool:
+        """Vérifie en O(1) si une position est ouverte sur le symbole."""
+        self._ensure_fresh()
+        return symbol in self._positions_by_symbol
+
+    def export_state(self) -> dict:
+        """Tickets suivis (positions et ordres) pour la sauvegarde de l'état du bot."""
+        return {
+            "positions": {p.ticket: (p.symbol, p.comment, p.magic, p.type, p.volume, p.time) for p in self.positions},
+            "orders": {o.ticket: (o.symbol, o.comment, o.magic, o.type, o.volume_current) for o in self.orders},
+        }
+
+    def import_state(self, state: dict):
+        """Garde les tickets de la dernière sauvegarde, rapprochés du terminal au prochain reconcile()."""
+        self.restored_tickets = state
+
+    def reconcile(self):
+        """
+        Compare les tickets restaurés avec le terminal (un seul refresh) et log le delta.
+
+        Returns:
+            dict: Tickets de positions/ordres fermés ou apparus pendant l'arrêt du bot
+        """
+        if self.restored_tickets is None:
+            return {}
+
+        self.refresh()
+        current_positions = {p.ticket for p in self.positions}
+        current_orders = {o.ticket for o in self.orders}
+        saved_positions = set(self.restored_tickets.get("positions", {}))
+        saved_orders = set(self.restored_tickets.get("orders", {}))
+
+        delta = {
+            "closed_positions": sorted(saved_positions - current_positions),
+            "new_positions": sorted(current_positions - saved_positions),
+            "gone_orders": sorted(saved_orders - current_orders),
+            "new_orders": sorted(current_orders - saved_orders),
+        }
+        logging.info(
+            "Rapprochement avec le terminal : %s positions fermées, %s nouvelles, %s ordres disparus, %s nouveaux",
+            len(delta["closed_positions"]), len(delta["new_positions"]),
+            len(delta["gone_orders"]), len(delta["new_orders"]),
+            extra={"event": "warm_start_reconcile", **delta},
+        )
+        self.restored_tickets = None
+        return delta
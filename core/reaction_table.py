@@ -0,0 +1,272 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+from datetime import datetime, timezone
+import numpy as np
+from core.market_utils import pip_size_for_symbol
+
+# Configuration
+REACTIONS_PATH = "data/news_reactions.json"
+HORIZON_MINUTES = 5         # Déclenchement post-news à T+5
+HOLD_MINUTES = 45           # TradingEngine.close_positions_after_45min
+# Colonnes des bougies de optimizer.load_bars (optimizer n'est importé que pour construire la table)
+TIME, OPEN, CLOSE = 0, 1, 4
+
+# Qualificatifs qui ne changent pas la nature d'une publication ('CPI m/m' et 'CPI y/y' réagissent pareil)
+_QUALIFIERS = {"m/m", "y/y", "q/q", "flash", "prelim", "final", "revised", "advance"}
+# Devise de news -> devise cotée quand elles diffèrent (CNY publiée, USDCNH tradé)
+_QUOTED_CURRENCY = {"CNY": "CNH"}
+
+
+def title_family(title):
+    """
+    Famille d'une news : titre normalisé, sans les qualificatifs de période ou de version.
+
+    Pour les news groupées par process_news ('A | B'), c'est la première qui donne la famille.
+
+    Returns:
+        str: Ex. 'Flash Manufacturing PMI | Flash Services PMI' -> 'manufacturing pmi'
+    """
+    first = title.split("|")[0].lower()
+    first = re.sub(r"\(.*?\)", " ", first)
+    words = [word for word in first.split() if word not in _QUALIFIERS and not any(c.isdigit() for c in word)]
+    return " ".join(words)
+
+
+def load_spreads(symbol, bars_dir):
+    """
+    Spreads (en pips) alignés sur les bougies M1 du symbole, écrits par optimizer.export_bars.
+
+    Returns:
+        np.ndarray: Spread de chaque bougie, ou None si le fichier n'existe pas
+    """
+    path = os.path.join(bars_dir, f"{symbol}_M1_spread.npy")
+    return np.load(path) if os.path.exists(path) else None
+
+
+def measure_reaction(bars, timestamp, pip_size, horizon_minutes=HORIZON_MINUTES, hold_minutes=HOLD_MINUTES):
+    """
+    Réaction d'un symbole à une news, à partir des bougies M1.
+
+    Args:
+        bars: Bougies (n, 5) triées par temps (cf optimizer.load_bars)
+
+    Returns:
+        tuple: (indice de la bougie de la news, indice du déclenchement, mouvement T+0 -> T+horizon en pips
+                signé, suite du mouvement jusqu'à la clôture en pips, positive si le mouvement continue),
+               ou None si les bougies ne couvrent pas la news
+    """
+    times = bars[:, TIME]
+    start = int(np.searchsorted(times, timestamp))
+    trigger = int(np.searchsorted(times, timestamp + horizon_minutes * 60)) - 1
+    end = int(np.searchsorted(times, timestamp + (horizon_minutes + hold_minutes) * 60)) - 1
+    # Trou dans l'historique autour de la news : mesure impossible
+    if start >= len(bars) or times[start] >= timestamp + 60 or trigger <= start or end <= trigger:
+        return None
+
+    move = (bars[trigger, CLOSE] - bars[start, OPEN]) / pip_size
+    follow = (bars[end, CLOSE] - bars[trigger, CLOSE]) / pip_size
+    return start, trigger, float(move), float(np.sign(move) * follow)
+
+
+class NewsReactionTable:
+    """
+    Table des réactions historiques aux news, par (famille de news, devise, paire).
+
+    Construite hors ligne (build_reaction_table) à partir des calendriers archivés et des
+    bougies M1, elle est chargée une fois au démarrage : au déclenchement, SymbolSelector
+    ordonne et filtre ses candidats par simple lecture de dict, avant tout appel au terminal.
+
+    Chaque ligne contient :
+        samples: nombre de publications mesurées
+        move_pips: mouvement médian (absolu) entre T+0 et T+5
+        continuation: part des publications où le mouvement s'est poursuivi jusqu'à la clôture
+        edge_pips: gain moyen d'un trade dans le sens du mouvement de T+5 à la clôture, spread déduit
+        spread_pips: spread médian pendant la réaction (None si inconnu)
+
+    Attributes:
+        rows (dict): Lignes par clé (famille, devise, paire)
+        min_samples (int): Publications nécessaires pour qu'une ligne soit prise en compte
+        min_move_pips (float): Mouvement médian minimum d'une paire qui « réagit »
+        max_cost_ratio (float): Spread maximum, en fraction du mouvement médian
+    """
+
+    def __init__(self, rows=None, min_samples=3, min_move_pips=3.0, max_cost_ratio=0.5):
+        self.rows = rows if rows is not None else {}
+        self.min_samples = min_samples
+        self.min_move_pips = min_move_pips
+        self.max_cost_ratio = max_cost_ratio
+
+    @classmethod
+    def load(cls, path=REACTIONS_PATH, **kwargs):
+        """
+        Charge une table écrite par save().
+
+        Returns:
+            NewsReactionTable: La table, vide si le fichier n'existe pas (les candidats ne sont alors pas filtrés)
+        """
+        if not os.path.exists(path):
+            logging.info("Pas de table de réactions (%s), candidats dans l'ordre de priorité", path)
+            return cls(**kwargs)
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        rows = {(row.pop("family"), row.pop("currency"), row.pop("pair")): row for row in data["rows"]}
+        logging.info("Table de réactions chargée : %s lignes (construite le %s)", len(rows), data.get("built_at"),
+                     extra={"event": "reaction_table", "rows": len(rows)})
+        return cls(rows, **kwargs)
+
+    def save(self, path=REACTIONS_PATH, **metadata):
+        """Écrit la table en JSON (écriture atomique via un fichier temporaire)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            "built_at": datetime.now(timezone.utc).isoformat(),
+            **metadata,
+            "rows": [
+                {"family": family, "currency": currency, "pair": pair, **row}
+                for (family, currency, pair), row in sorted(self.rows.items())
+            ],
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def lookup(self, title, currency, pair):
+        """Ligne de la table pour une news et une paire, ou None."""
+        return self.rows.get((title_family(title), currency.upper(), pair.upper()))
+
+    def reacts(self, row) -> bool:
+        """True si la paire a historiquement bougé assez, pour un spread acceptable."""
+        if row["move_pips"] < self.min_move_pips:
+            return False
+        return row["spread_pips"] is None or row["spread_pips"] <= self.max_cost_ratio * row["move_pips"]
+
+    def order_candidates(self, title, currency, pairs) -> list:
+        """
+        Ordonne et filtre les paires candidates d'une news.
+
+        Les paires mesurées sur assez de publications passent en tête, de la meilleure
+        espérance (edge_pips) à la moins bonne ; celles qui n'ont pas réagi sont retirées.
+        Les paires sans historique suffisant gardent leur ordre de priorité, à la suite.
+
+        Returns:
+            list: Les paires à évaluer
+        """
+        family = title_family(title)
+        currency = currency.upper()
+        ranked, unknown, pruned = [], [], []
+        for pair in pairs:
+            row = self.rows.get((family, currency, pair.upper()))
+            if row is None or row["samples"] < self.min_samples:
+                unknown.append(pair)
+            elif self.reacts(row):
+                ranked.append((row["edge_pips"], pair))
+            else:
+                pruned.append(pair)
+
+        ranked.sort(key=lambda item: -item[0])
+        ordered = [pair for _, pair in ranked] + unknown
+        if pruned:
+            logging.debug("[%s] %s : paires sans réaction historique ignorées : %s", currency, family, pruned,
+                          extra={"event": "reaction_prune", "family": family, "pruned": pruned})
+        return ordered
+
+
+def bar_symbols(bars_dir):
+    """Symboles qui ont des bougies M1 locales (<symbol>_M1.npy ou .csv)."""
+    names = glob.glob(os.path.join(bars_dir, "*_M1.npy")) + glob.glob(os.path.join(bars_dir, "*_M1.csv"))
+    return sorted({os.path.basename(name)[:-len("_M1.npy")] for name in names})
+
+
+def build_reaction_table(data_dir=None, bars_dir=None, impact="High", horizon_minutes=HORIZON_MINUTES,
+                         hold_minutes=HOLD_MINUTES, **kwargs):
+    """
+    Mesure la réaction de chaque paire à chaque news archivée et agrège par (famille, devise, paire).
+
+    Toutes les paires qui ont des bougies locales et contiennent la devise de la news sont mesurées.
+
+    Returns:
+        NewsReactionTable: La table construite
+    """
+    from core.optimizer import DATA_DIR, BARS_DIR, load_archived_events, load_bars
+
+    data_dir = data_dir or DATA_DIR
+    bars_dir = bars_dir or BARS_DIR
+    events = load_archived_events(data_dir, impact)
+
+    bars_by_pair = {}
+    for symbol in bar_symbols(bars_dir):
+        pair = "".join(c for c in symbol.upper() if c.isalpha())[:6]
+        if len(pair) == 6 and pair not in bars_by_pair:
+            bars_by_pair[pair] = (pip_size_for_symbol(pair), load_bars(symbol, bars_dir), load_spreads(symbol, bars_dir))
+
+    samples = {}
+    for timestamp, _, title, country in events:
+        currency = country.upper()
+        quoted = _QUOTED_CURRENCY.get(currency, currency)
+        family = title_family(title)
+        for pair, (pip_size, bars, spreads) in bars_by_pair.items():
+            if quoted not in (pair[:3], pair[3:]):
+                continue
+            reaction = measure_reaction(bars, timestamp, pip_size, horizon_minutes, hold_minutes)
+            if reaction is None:
+                continue
+            start, trigger, move, follow = reaction
+            spread = float(np.median(spreads[start:trigger + 1])) if spreads is not None else np.nan
+            samples.setdefault((family, currency, pair), []).append((move, follow, spread))
+
+    rows = {}
+    for key, values in samples.items():
+        move, follow, spread = np.array(values).T
+        spread_pips = float(np.median(spread)) if not np.isnan(spread).all() else None
+        rows[key] = {
+            "samples": len(values),
+            "move_pips": round(float(np.median(np.abs(move))), 2),
+            "continuation": round(float((follow > 0).mean()), 3),
+            "edge_pips": round(float(follow.mean()) - (spread_pips or 0.0), 2),
+            "spread_pips": round(spread_pips, 2) if spread_pips is not None else None,
+        }
+    logging.info("Table de réactions : %s lignes sur %s news et %s paires", len(rows), len(events), len(bars_by_pair))
+    return NewsReactionTable(rows, **kwargs)
+
+
+def format_table(table, currency=None, top=30):
+    """Tableau texte des lignes de la table, meilleure espérance d'abord."""
+    from tabulate import tabulate
+
+    rows = [
+        [family, row_currency, pair, row["samples"], row["move_pips"], f"{row['continuation']:.0%}",
+         row["edge_pips"], row["spread_pips"] if row["spread_pips"] is not None else "-",
+         "oui" if table.reacts(row) else "non"]
+        for (family, row_currency, pair), row in table.rows.items()
+        if currency is None or row_currency == currency.upper()
+    ]
+    rows.sort(key=lambda r: -r[6])
+    headers = ["Famille", "Devise", "Paire", "News", "Mouvement (pips)", "Continuation", "Edge (pips)",
+               "Spread (pips)", "Réagit"]
+    return tabulate(rows[:top], headers=headers, tablefmt="pretty")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Construit la table des réactions historiques aux news")
+    parser.add_argument("--data-dir", default=None, help="Calendriers archivés (weekly_news_json par défaut)")
+    parser.add_argument("--bars-dir", default=None, help="Bougies M1 locales (bars par défaut)")
+    parser.add_argument("--impact", default="High")
+    parser.add_argument("--horizon", type=int, default=HORIZON_MINUTES, help="Minutes entre la news et le déclenchement")
+    parser.add_argument("--hold", type=int, default=HOLD_MINUTES, help="Minutes de détention après le déclenchement")
+    parser.add_argument("--out", default=REACTIONS_PATH)
+    parser.add_argument("--currency", help="N'affiche que cette devise")
+    parser.add_argument("--top", type=int, default=30)
+    args = parser.parse_args()
+
+    reactions = build_reaction_table(args.data_dir, args.bars_dir, args.impact, args.horizon, args.hold)
+    reactions.save(args.out, impact=args.impact, horizon_minutes=args.horizon, hold_minutes=args.hold)
+    print(format_table(reactions, args.currency, args.top))
+    print(f"Table écrite dans : {args.out}")
@@ -0,0 +1,582 @@
+import argparse
+import collections
+import glob
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+import numpy as np
+from tabulate import tabulate
+from core.clock import VirtualClock, set_clock
+from core.market_utils import SERVER_OFFSET_HOURS, aggregate_rates, pip_size_for_symbol
+from core.mt5_backend import install_backend
+from core.optimizer import BARS_DIR, CLOSE, HIGH, LOW, OPEN, TIME, load_bars
+
+
+# Configuration
+DEFAULT_SPREAD_POINTS = 10
+# Réveils des news quelques secondes après la minute, comme le cycle d'un bot réel : la bougie en formation a déjà bougé
+WAKEUP_DELAY_SECONDS = 15
+CONTRACT_SIZE = 100000
+
+RATES_DTYPE = np.dtype([
+    ("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8"),
+])
+
+# Mêmes champs que les structures renvoyées par le package MetaTrader5
+Tick = collections.namedtuple("Tick", "time bid ask last volume time_msc flags volume_real")
+SymbolInfo = collections.namedtuple(
+    "SymbolInfo", "name digits point spread trade_stops_level volume_min volume_max volume_step trade_contract_size visible select "
+                  "currency_base currency_profit"
+)
+TerminalInfo = collections.namedtuple("TerminalInfo", "connected trade_allowed")
+TradePosition = collections.namedtuple(
+    "TradePosition", "ticket time time_msc time_update time_update_msc type magic identifier reason volume "
+                     "price_open sl tp price_current swap profit symbol comment external_id"
+)
+TradeOrder = collections.namedtuple(
+    "TradeOrder", "ticket time_setup time_setup_msc time_done time_done_msc time_expiration type type_time "
+                  "type_filling state magic position_id position_by_id reason volume_initial volume_current "
+                  "price_open sl tp price_current price_stoplimit symbol comment external_id"
+)
+TradeDeal = collections.namedtuple(
+    "TradeDeal", "ticket order time time_msc type entry magic position_id reason volume price commission "
+                 "swap profit fee symbol comment external_id"
+)
+OrderSendResult = collections.namedtuple(
+    "OrderSendResult", "retcode deal order volume price bid ask comment request_id retcode_external request"
+)
+
+
+class SimulatedBroker:
+    """
+    Broker local pour les simulations : remplace le module MetaTrader5 (cf install_backend).
+
+    Les prix viennent des bougies M1 archivées (format de core.optimizer.load_bars) à
+    l'heure de la VirtualClock. La bougie en formation avance avec les secondes écoulées
+    (trajet open -> low -> high -> close pour une bougie haussière, open -> high -> low ->
+    close sinon, un tiers de minute par segment) : le tick est le prix atteint sur ce trajet
+    et la bougie en formation expose le high / low / close partiels. Les ordres pending, SL
+    et TP sont exécutés bougie par bougie clôturée (SL retenu si SL et TP sont touchés dans
+    la même bougie).
+
+    Attributes:
+        clock (VirtualClock): Horloge de la simulation
+        bars (dict): Bougies (n, 5) par symbole, temps en UTC
+        server_offset (int): Décalage de l'heure serveur (secondes)
+    """
+
+    TIMEFRAME_M1 = 1
+    TIMEFRAME_M5 = 5
+    TIMEFRAME_M15 = 15
+    TIMEFRAME_M30 = 30
+    TIMEFRAME_H1 = 16385
+    TIMEFRAME_H4 = 16388
+    TIMEFRAME_D1 = 16408
+    ORDER_TYPE_BUY = 0
+    ORDER_TYPE_SELL = 1
+    ORDER_TYPE_BUY_LIMIT = 2
+    ORDER_TYPE_SELL_LIMIT = 3
+    ORDER_TYPE_BUY_STOP = 4
+    ORDER_TYPE_SELL_STOP = 5
+    POSITION_TYPE_BUY = 0
+    POSITION_TYPE_SELL = 1
+    TRADE_ACTION_DEAL = 1
+    TRADE_ACTION_PENDING = 5
+    ORDER_FILLING_FOK = 0
+    ORDER_FILLING_IOC = 1
+    ORDER_FILLING_RETURN = 2
+    ORDER_TIME_GTC = 0
+    ORDER_TIME_DAY = 1
+    ORDER_TIME_SPECIFIED = 2
+    ORDER_STATE_PLACED = 1
+    ORDER_STATE_CANCELED = 2
+    ORDER_STATE_FILLED = 4
+    ORDER_STATE_EXPIRED = 6
+    DEAL_TYPE_BUY = 0
+    DEAL_TYPE_SELL = 1
+    DEAL_ENTRY_IN = 0
+    DEAL_ENTRY_OUT = 1
+    DEAL_REASON_EXPERT = 3
+    DEAL_REASON_SL = 4
+    DEAL_REASON_TP = 5
+    TRADE_RETCODE_DONE = 10009
+    TRADE_RETCODE_INVALID = 10013
+    TRADE_RETCODE_INVALID_PRICE = 10015
+    TRADE_RETCODE_POSITION_CLOSED = 10036
+
+    TIMEFRAME_SECONDS = {TIMEFRAME_M1: 60, TIMEFRAME_M5: 300, TIMEFRAME_M15: 900, TIMEFRAME_M30: 1800,
+                         TIMEFRAME_H1: 3600, TIMEFRAME_H4: 14400, TIMEFRAME_D1: 86400}
+
+    OrderSendResult = OrderSendResult
+
+    def __init__(self, bars_by_symbol, clock, server_offset_hours=SERVER_OFFSET_HOURS, spread_points=DEFAULT_SPREAD_POINTS):
+        self.bars = bars_by_symbol
+        self.clock = clock
+        self.server_offset = server_offset_hours * 3600
+        self.spread_points = spread_points
+        self._lock = threading.RLock()
+        self._next_ticket = 1000
+        self._positions = {}
+        self._orders = {}
+        self._history_orders = []
+        self._deals = []
+        self._processed_until = clock.time()
+
+    # --- Données de marché ---
+
+    def _digits(self, symbol):
+        return 3 if symbol.endswith("JPY") else 5
+
+    def _spread(self, symbol):
+        return self.spread_points * 10 ** -self._digits(symbol)
+
+    def _locate(self, symbol, now):
+        """Indice de la dernière bougie commencée à 'now' et True si elle est encore en formation."""
+        bars = self.bars.get(symbol)
+        if bars is None or not len(bars):
+            return -1, False
+        index = int(np.searchsorted(bars[:, TIME], now, side="right")) - 1
+        return index, index >= 0 and now < bars[index, TIME] + 60
+
+    @staticmethod
+    def _forming(bar, now):
+        """Bougie en formation à 'now' : (prix atteint, plus haut, plus bas) sur le trajet intra-minute."""
+        open_price, close = bar[OPEN], bar[CLOSE]
+        path = (open_price, bar[LOW], bar[HIGH], close) if close >= open_price else (open_price, bar[HIGH], bar[LOW], close)
+        progress = min(max((now - bar[TIME]) / 60, 0.0), 1.0) * 3
+        segment = min(int(progress), 2)
+        price = path[segment] + (path[segment + 1] - path[segment]) * (progress - segment)
+        visited = path[:segment + 1] + (price,)
+        return float(price), float(max(visited)), float(min(visited))
+
+    def _bid(self, symbol, now):
+        index, forming = self._locate(symbol, now)
+        if index < 0:
+            return None
+        bars = self.bars[symbol]
+        return self._forming(bars[index], now)[0] if forming else bars[index, CLOSE]
+
+    def _m1_rates(self, symbol, now, count):
+        index, forming = self._locate(symbol, now)
+        if index < 0:
+            return np.zeros(0, dtype=RATES_DTYPE)
+        bars = self.bars[symbol]
+        closed_end = index if forming else index + 1
+        closed = bars[max(closed_end - count, 0):closed_end]
+        rates = np.zeros(len(closed) + (1 if forming else 0), dtype=RATES_DTYPE)
+        rates["time"][:len(closed)] = closed[:, TIME].astype(np.int64) + self.server_offset
+        for name, column in (("open", OPEN), ("high", HIGH), ("low", LOW), ("close", CLOSE)):
+            rates[name][:len(closed)] = closed[:, column]
+        if forming:
+            price, high, low = self._forming(bars[index], now)
+            rates[-1] = (int(bars[index, TIME]) + self.server_offset, bars[index, OPEN], high, low, price, 1, 0, 0)
+        rates["spread"] = self.spread_points
+        return rates
+
+    def symbol_info(self, symbol):
+        if symbol not in self.bars:
+            return None
+        digits = self._digits(symbol)
+        # Nom des bougies = nom broker, éventuellement suffixé ('EURUSD.m') : la paire en est les 6 premières lettres
+        pair = "".join(c for c in symbol.upper() if c.isalpha())[:6]
+        return SymbolInfo(symbol, digits, 10 ** -digits, self.spread_points, 0, 0.01, 100.0, 0.01, CONTRACT_SIZE,
+                          True, True, pair[:3], pair[3:])
+
+    def symbols_get(self, group=None):
+        return tuple(self.symbol_info(symbol) for symbol in sorted(self.bars))
+
+    def symbol_info_tick(self, symbol):
+        with self._lock:
+            self._process()
+            now = self.clock.time()
+            bid = self._bid(symbol, now)
+            if bid is None:
+                return None
+            server_now = now + self.server_offset
+            return Tick(int(server_now), bid, bid + self._spread(symbol), 0.0, 0, int(server_now * 1000), 0, 0.0)
+
+    def copy_rates_from_pos(self, symbol, timeframe, start, count):
+        period = self.TIMEFRAME_SECONDS.get(timeframe)
+        if period is None or symbol not in self.bars:
+            return None
+        now = self.clock.time()
+        factor = period // 60
+        rates = self._m1_rates(symbol, now, (start + count + 1) * factor)
+        if factor > 1:
+            rates = aggregate_rates(rates, period)
+        end = len(rates) - start
+        return rates[max(end - count, 0):max(end, 0)]
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        rates = self.copy_rates_from_pos(symbol, timeframe, 0, len(self.bars.get(symbol, ())))
+        if rates is None:
+            return None
+        # Comme MT5 : les dates sont comparées telles quelles aux heures serveur
+        lo, hi = date_from.timestamp(), date_to.timestamp()
+        return rates[(rates["time"] >= lo) & (rates["time"] <= hi)]
+
+    # --- Terminal ---
+
+    def initialize(self, *args, **kwargs):
+        return True
+
+    def login(self, *args, **kwargs):
+        return True
+
+    def shutdown(self):
+        return True
+
+    def last_error(self):
+        return (1, "Success")
+
+    def terminal_info(self):
+        return TerminalInfo(True, True)
+
+    def symbol_select(self, symbol, enable=True):
+        return symbol in self.bars
+
+    # --- Ordres et positions ---
+
+    @property
+    def busy(self) -> bool:
+        """True tant qu'une position ou un ordre pending est ouvert."""
+        with self._lock:
+            return bool(self._positions or self._orders)
+
+    def _ticket(self):
+        self._next_ticket += 1
+        return self._next_ticket
+
+    def _open_position(self, order, price, when, reason=DEAL_REASON_EXPERT):
+        side = self.POSITION_TYPE_BUY if order["type"] in (self.ORDER_TYPE_BUY, self.ORDER_TYPE_BUY_LIMIT, self.ORDER_TYPE_BUY_STOP) \
+            else self.POSITION_TYPE_SELL
+        ticket = order["ticket"]
+        server_time = int(when) + self.server_offset
+        self._positions[ticket] = {
+            "ticket": ticket, "time": server_time, "type": side, "magic": order["magic"], "volume": order["volume"],
+            "price_open": price, "sl": order["sl"], "tp": order["tp"], "symbol": order["symbol"], "comment": order["comment"],
+        }
+        deal = self._ticket()
+        self._deals.append(TradeDeal(
+            deal, ticket, server_time, server_time * 1000, side, self.DEAL_ENTRY_IN, order["magic"], ticket, reason,
+            order["volume"], price, 0.0, 0.0, 0.0, 0.0, order["symbol"], order["comment"], "",
+        ))
+        return deal
+
+    def _close_position(self, ticket, price, when, comment, reason=DEAL_REASON_EXPERT):
+        position = self._positions.pop(ticket)
+        sign = 1 if position["type"] == self.POSITION_TYPE_BUY else -1
+        profit = sign * (price - position["price_open"]) * position["volume"] * CONTRACT_SIZE
+        server_time = int(when) + self.server_offset
+        deal = self._ticket()
+        self._deals.append(TradeDeal(
+            deal, deal, server_time, server_time * 1000, 1 - position["type"], self.DEAL_ENTRY_OUT, position["magic"],
+            ticket, reason, position["volume"], price, 0.0, 0.0, profit, 0.0, position["symbol"], comment, "",
+        ))
+        return deal
+
+    def _archive_order(self, order, state, when):
+        server_time = int(when) + self.server_offset
+        self._history_orders.append(self._order_tuple(order, state, server_time))
+
+    def _order_tuple(self, order, state, time_done=0):
+        return TradeOrder(
+            order["ticket"], order["time_setup"], order["time_setup"] * 1000, time_done, time_done * 1000,
+            order.get("expiration", 0), order["type"], order.get("type_time", 0), order.get("type_filling", 0), state,
+            order["magic"], order["ticket"] if state == self.ORDER_STATE_FILLED else 0, 0, self.DEAL_REASON_EXPERT,
+            order["volume"], 0.0 if state == self.ORDER_STATE_FILLED else order["volume"], order["price"],
+            order["sl"], order["tp"], order["price"], 0.0, order["symbol"], order["comment"], "",
+        )
+
+    def _process(self):
+        """Exécute pending, SL et TP sur les bougies clôturées depuis le dernier passage."""
+        now = self.clock.time()
+        since, self._processed_until = self._processed_until, now
+        if not (self._positions or self._orders):
+            return
+
+        symbols = {order["symbol"] for order in self._orders.values()} | {p["symbol"] for p in self._positions.values()}
+        for symbol in symbols:
+            bars = self.bars.get(symbol)
+            if bars is None:
+                continue
+            spread = self._spread(symbol)
+            # Bougies terminées entre le dernier passage et maintenant
+            lo = int(np.searchsorted(bars[:, TIME], since - 60, side="right"))
+            hi = int(np.searchsorted(bars[:, TIME], now - 60, side="right"))
+            for bar in bars[lo:hi]:
+                bar_time, high, low = bar[TIME], bar[HIGH], bar[LOW]
+                for ticket, order in list(self._orders.items()):
+                    if order["symbol"] != symbol or bar_time < order["placed_at"]:
+                        continue
+                    if order.get("expiration") and bar_time + self.server_offset >= order["expiration"]:
+                        del self._orders[ticket]
+                        self._archive_order(order, self.ORDER_STATE_EXPIRED, order["expiration"] - self.server_offset)
+                        continue
+                    price = order["price"]
+                    triggered = {
+                        self.ORDER_TYPE_BUY_STOP: high + spread >= price,
+                        self.ORDER_TYPE_BUY_LIMIT: low + spread <= price,
+                        self.ORDER_TYPE_SELL_STOP: low <= price,
+                        self.ORDER_TYPE_SELL_LIMIT: high >= price,
+                    }[order["type"]]
+                    if triggered:
+                        del self._orders[ticket]
+                        self._archive_order(order, self.ORDER_STATE_FILLED, bar_time)
+                        self._open_position(order, price, bar_time)
+                        # SL / TP à partir de la bougie suivante
+                        self._positions[ticket]["checked_from"] = bar_time + 60
+
+                for ticket, position in list(self._positions.items()):
+                    if position["symbol"] != symbol or bar_time < position.get("checked_from", 0):
+                        continue
+                    if position["type"] == self.POSITION_TYPE_BUY:
+                        sl_hit = position["sl"] and low <= position["sl"]
+                        tp_hit = position["tp"] and high >= position["tp"]
+                    else:
+                        sl_hit = position["sl"] and high + spread >= position["sl"]
+                        tp_hit = position["tp"] and low + spread <= position["tp"]
+                    if sl_hit:
+                        self._close_position(ticket, position["sl"], bar_time + 59, "[sl]", self.DEAL_REASON_SL)
+                    elif tp_hit:
+                        self._close_position(ticket, position["tp"], bar_time + 59, "[tp]", self.DEAL_REASON_TP)
+
+    def order_send(self, request):
+        with self._lock:
+            self._process()
+            now = self.clock.time()
+            symbol = request["symbol"]
+            bid = self._bid(symbol, now)
+            if bid is None:
+                return OrderSendResult(self.TRADE_RETCODE_INVALID, 0, 0, 0.0, 0.0, 0.0, 0.0, "Unknown symbol", 0, 0, request)
+            ask = bid + self._spread(symbol)
+
+            def result(retcode, deal=0, order=0, price=0.0, comment="Request executed"):
+                return OrderSendResult(retcode, deal, order, request["volume"], price, bid, ask, comment, 0, 0, request)
+
+            if request["action"] == self.TRADE_ACTION_DEAL and request.get("position"):
+                if request["position"] not in self._positions:
+                    return result(self.TRADE_RETCODE_POSITION_CLOSED, comment="Position doesn't exist")
+                price = ask if request["type"] == self.ORDER_TYPE_BUY else bid
+                deal = self._close_position(request["position"], price, now, request.get("comment", ""))
+                return result(self.TRADE_RETCODE_DONE, deal, deal, price)
+
+            order = {
+                "ticket": self._ticket(), "time_setup": int(now) + self.server_offset, "placed_at": now,
+                "type": request["type"], "magic": request.get("magic", 0), "volume": request["volume"],
+                "price": request.get("price", 0.0), "sl": request.get("sl", 0.0), "tp": request.get("tp", 0.0),
+                "symbol": symbol, "comment": request.get("comment", ""), "type_time": request.get("type_time", 0),
+                "type_filling": request.get("type_filling", 0), "expiration": request.get("expiration", 0),
+            }
+
+            if request["action"] == self.TRADE_ACTION_DEAL:
+                price = ask if request["type"] == self.ORDER_TYPE_BUY else bid
+                order["price"] = price
+                self._archive_order(order, self.ORDER_STATE_FILLED, now)
+                deal = self._open_position(order, price, now)
+                # SL / TP à partir de la prochaine bougie clôturée
+                self._positions[order["ticket"]]["checked_from"] = now - now % 60 + 60
+                return result(self.TRADE_RETCODE_DONE, deal, order["ticket"], price)
+
+            if request["action"] == self.TRADE_ACTION_PENDING:
+                price = order["price"]
+                valid = {
+                    self.ORDER_TYPE_BUY_STOP: price > ask,
+                    self.ORDER_TYPE_BUY_LIMIT: price < ask,
+                    self.ORDER_TYPE_SELL_STOP: price < bid,
+                    self.ORDER_TYPE_SELL_LIMIT: price > bid,
+                }.get(request["type"], False)
+                if not valid:
+                    return result(self.TRADE_RETCODE_INVALID_PRICE, comment="Invalid price")
+                # Bougies entièrement postérieures à l'envoi uniquement
+                order["placed_at"] = now - now % 60 + 60
+                self._orders[order["ticket"]] = order
+                return result(self.TRADE_RETCODE_DONE, 0, order["ticket"], price)
+
+            return result(self.TRADE_RETCODE_INVALID, comment="Unsupported action")
+
+    def positions_get(self, symbol=None, group=None, ticket=None):
+        with self._lock:
+            self._process()
+            now = self.clock.time()
+            positions = []
+            for position in self._positions.values():
+                if (symbol is not None and position["symbol"] != symbol) or (ticket is not None and position["ticket"] != ticket):
+                    continue
+                price_current = self._bid(position["symbol"], now)
+                sign = 1 if position["type"] == self.POSITION_TYPE_BUY else -1
+                profit = sign * (price_current - position["price_open"]) * position["volume"] * CONTRACT_SIZE
+                positions.append(TradePosition(
+                    position["ticket"], position["time"], position["time"] * 1000, position["time"], position["time"] * 1000,
+                    position["type"], position["magic"], position["ticket"], self.DEAL_REASON_EXPERT, position["volume"],
+                    position["price_open"], position["sl"], position["tp"], price_current, 0.0, profit,
+                    position["symbol"], position["comment"], "",
+                ))
+            return tuple(positions)
+
+    def orders_get(self, symbol=None, group=None, ticket=None):
+        with self._lock:
+            self._process()
+            return tuple(
+                self._order_tuple(order, self.ORDER_STATE_PLACED) for order in self._orders.values()
+                if (symbol is None or order["symbol"] == symbol) and (ticket is None or order["ticket"] == ticket)
+            )
+
+    def history_deals_get(self, date_from, date_to, group=None):
+        with self._lock:
+            self._process()
+            lo, hi = date_from.timestamp(), date_to.timestamp()
+            return tuple(deal for deal in self._deals if lo <= deal.time <= hi)
+
+    def history_orders_get(self, date_from, date_to, group=None):
+        with self._lock:
+            self._process()
+            lo, hi = date_from.timestamp(), date_to.timestamp()
+            return tuple(order for order in self._history_orders if lo <= order.time_setup <= hi)
+
+    def closed_trades(self):
+        """
+        Returns:
+            list: Trades fermés (dict symbol, comment, ouverture/fermeture UTC, P&L en pips), dans l'ordre de fermeture
+        """
+        with self._lock:
+            entries = {deal.position_id: deal for deal in self._deals if deal.entry == self.DEAL_ENTRY_IN}
+            trades = []
+            for deal in self._deals:
+                if deal.entry != self.DEAL_ENTRY_OUT:
+                    continue
+                entry = entries[deal.position_id]
+                sign = 1 if entry.type == self.DEAL_TYPE_BUY else -1
+                trades.append({
+                    "symbol": deal.symbol,
+                    "comment": entry.comment,
+                    "opened": datetime.fromtimestamp(entry.time - self.server_offset, timezone.utc),
+                    "closed": datetime.fromtimestamp(deal.time - self.server_offset, timezone.utc),
+                    "exit": deal.comment,
+                    "pnl_pips": float(sign * (deal.price - entry.price) / pip_size_for_symbol(deal.symbol)),
+                })
+            return trades
+
+
+def _week_start(week_file):
+    """Dimanche 00:00 UTC de la semaine d'un fichier forex_YYYY-MM-DD.json."""
+    match = re.search(r"forex_(\d{4}-\d{2}-\d{2})", os.path.basename(week_file))
+    if match is None:
+        raise ValueError(f"Nom de fichier de semaine invalide : {week_file}")
+    return datetime.strptime(match.group(1), "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+
+def run_week(week_file, bars_dir=BARS_DIR, enabled_strategies=None, fast_forward=True, workdir=None, days=7):
+    """
+    Fait tourner main() sur une semaine archivée, contre le SimulatedBroker et une VirtualClock.
+
+    La simulation démarre le dimanche 00:00 UTC sans calendrier : le téléchargement du
+    dimanche 20h30 est remplacé par la copie du fichier archivé, puis toutes les news de
+    la semaine sont déclenchées (T-1, T+0, T+5) et les positions fermées à +45min.
+
+    Args:
+        week_file: Calendrier archivé (weekly_news_json/forex_YYYY-MM-DD.json)
+        bars_dir: Dossier des bougies M1 (<SYMBOL>_M1.npy ou .csv)
+        enabled_strategies: Stratégies à activer (celles de main.ENABLED_STRATEGIES par défaut)
+        fast_forward: Saute directement au prochain événement quand rien n'est ouvert
+        workdir: Dossier de travail (calendrier, journaux, bases) ; temporaire par défaut
+        days: Nombre de jours simulés à partir du dimanche 00:00
+
+    Returns:
+        dict: Trades fermés, nombre de cycles de la boucle et durée réelle de la simulation
+    """
+    week_file = os.path.abspath(week_file)
+    bars_dir = os.path.abspath(bars_dir)
+    start = _week_start(week_file).timestamp()
+    end = start + days * 86400
+
+    with open(week_file, "r", encoding="utf-8") as f:
+        news_data = json.load(f)
+    for news in news_data:
+        # Un calendrier archivé peut contenir des news déjà marquées comme traitées
+        news.pop("processed", None)
+
+    bars_by_symbol = {}
+    for path in sorted(glob.glob(os.path.join(bars_dir, "*_M1.*"))):
+        symbol = os.path.basename(path).split("_M1.")[0]
+        if symbol not in bars_by_symbol:
+            bars_by_symbol[symbol] = load_bars(symbol, bars_dir)
+    if not bars_by_symbol:
+        raise FileNotFoundError(f"Aucune bougie M1 dans {bars_dir}")
+
+    clock = VirtualClock(start, fast_forward=fast_forward, end=end)
+    broker = SimulatedBroker(bars_by_symbol, clock)
+    clock.is_busy = lambda: broker.busy
+    for news in news_data:
+        if not news.get("date_utc"):
+            continue
+        news_time = datetime.fromisoformat(news["date_utc"]).timestamp()
+        for offset in (-60, 0, 300):
+            clock.add_wakeup(news_time + offset + WAKEUP_DELAY_SECONDS)
+    sunday_fetch = start + 20 * 3600 + 30 * 60
+    clock.add_wakeup(sunday_fetch)
+
+    workdir = workdir or tempfile.mkdtemp(prefix="zenlion_sim_")
+    os.makedirs(workdir, exist_ok=True)
+    calendar_path = os.path.join(workdir, "weekly_news_json", os.path.basename(week_file))
+
+    def fetch_calendar():
+        # Remplace le téléchargement ForexFactory par le calendrier archivé
+        os.makedirs(os.path.dirname(calendar_path), exist_ok=True)
+        with open(calendar_path, "w", encoding="utf-8") as f:
+            json.dump(news_data, f, indent=4, ensure_ascii=False)
+
+    previous_dir = os.getcwd()
+    previous_backend = install_backend(broker)
+    previous_clock = set_clock(clock)
+    real_start = time.perf_counter()
+    try:
+        os.chdir(workdir)
+        import main as bot
+        strategies = tuple(enabled_strategies) if enabled_strategies else bot.ENABLED_STRATEGIES
+        bot.main(strategies, until=end, calendar_fetcher=fetch_calendar)
+    finally:
+        os.chdir(previous_dir)
+        set_clock(previous_clock)
+        if previous_backend is not None:
+            install_backend(previous_backend)
+
+    return {
+        "trades": broker.closed_trades(),
+        "cycles": clock.steps,
+        "elapsed": time.perf_counter() - real_start,
+        "workdir": workdir,
+    }
+
+
+def format_trades(trades):
+    """Tableau texte des trades fermés de la simulation."""
+    table = [
+        [trade["opened"].strftime("%a %H:%M"), trade["closed"].strftime("%a %H:%M"), trade["symbol"],
+         trade["comment"], trade["exit"], round(trade["pnl_pips"], 1)]
+        for trade in trades
+    ]
+    headers = ["Ouverture (UTC)", "Fermeture (UTC)", "Symbole", "Commentaire", "Sortie", "P&L (pips)"]
+    return tabulate(table, headers=headers, tablefmt="pretty")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulation accélérée d'une semaine archivée contre un broker local")
+    parser.add_argument("week_file", help="Calendrier archivé (weekly_news_json/forex_YYYY-MM-DD.json)")
+    parser.add_argument("--bars-dir", default=BARS_DIR)
+    parser.add_argument("--strategies", help="Stratégies à activer, séparées par des virgules")
+    parser.add_argument("--no-fast-forward", action="store_true", help="Avance minute par minute")
+    parser.add_argument("--workdir", help="Dossier de travail (temporaire par défaut)")
+    args = parser.parse_args()
+
+    strategies = [name.strip() for name in args.strategies.split(",") if name.strip()] if args.strategies else None
+    report = run_week(args.week_file, args.bars_dir, strategies, not args.no_fast_forward, args.workdir)
+    print(format_trades(report["trades"]))
+    total = sum(trade["pnl_pips"] for trade in report["trades"])
+    print(f"{len(report['trades'])} trades, P&L {total:.1f} pips - {report['cycles']} cycles "
+          f"en {report['elapsed']:.1f}s (dossier : {report['workdir']})")
@@ -0,0 +1,86 @@
+import logging
+import threading
+import time
+from core.clock import get_clock
+
+
+class SpeculativeEvaluator:
+    """
+    Réévalue les candidats multi-timeframe d'une news à chaque clôture de bougie M1
+    entre la news (T+0) et le déclenchement (T+5), pour que la décision soit prête
+    quand get_best_symbol_multi_timeframe est appelé.
+
+    Attributes:
+        selector (SymbolSelector): Sélecteur utilisé pour l'évaluation complète
+        settle_seconds (float): Délai après la clôture d'une bougie avant réévaluation
+        max_age (float): Âge maximum (secondes) d'une décision encore utilisable
+    """
+
+    def __init__(self, selector, settle_seconds=1.0, max_age=90):
+        self.selector = selector
+        self.settle_seconds = settle_seconds
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # Décisions, échéances et threads par (devise, titre de la news) : l'ordre des candidats
+        # dépend du titre (table de réactions), une décision n'est servie qu'à la news qui l'a produite
+        self._decisions = {}
+        self._deadlines = {}
+        self._threads = {}
+
+    def start(self, country, until, title=None):
+        """
+        Lance (ou prolonge) l'évaluation en arrière-plan pour une news.
+
+        Args:
+            country: Devise de la news ('USD', 'EUR', ...)
+            until: Timestamp (get_clock().time()) de fin d'évaluation, après le déclenchement T+5
+            title: Titre de la news, pour ordonner les candidats selon leur réaction historique
+        """
+        key = (country.upper(), title)
+        with self._lock:
+            self._deadlines[key] = max(until, self._deadlines.get(key, 0))
+            # Le thread se retire lui-même de _threads (sous le verrou) avant de s'arrêter
+            if key in self._threads:
+                return
+            thread = threading.Thread(target=self._loop, args=(key,), name=f"speculative-{key[0]}", daemon=True)
+            self._threads[key] = thread
+        logging.info("[%s] Évaluation spéculative des candidats démarrée", key[0])
+        thread.start()
+
+    def _loop(self, key):
+        country, title = key
+        while True:
+            with self._lock:
+                if get_clock().time() >= self._deadlines[key]:
+                    self._decisions.pop(key, None)
+                    self._deadlines.pop(key, None)
+                    self._threads.pop(key, None)
+                    return
+
+            start = time.perf_counter()
+            try:
+                decision = self.selector.evaluate_multi_timeframe(country, title)
+            except Exception:
+                logging.exception("[%s] Erreur pendant l'évaluation spéculative", country)
+            else:
+                with self._lock:
+                    self._decisions[key] = (decision, get_clock().time())
+                logging.debug("[%s] Décision spéculative : %s (%.0f ms)", country, decision,
+                              (time.perf_counter() - start) * 1000)
+
+            # Attente de la clôture de la prochaine bougie M1
+            now = get_clock().time()
+            get_clock().sleep(60 - now % 60 + self.settle_seconds)
+
+    def get_decision(self, country, title=None):
+        """
+        Dernière décision calculée pour la news (devise et titre passés à start).
+
+        Returns:
+            tuple: (True, (symbol, trend) ou None) si une décision récente existe, (False, None) sinon
+        """
+        with self._lock:
+            entry = self._decisions.get((country.upper(), title))
+        if entry is None or get_clock().time() - entry[1] > self.max_age:
+            return False, None
+        return True, entry[0]
@@ -0,0 +1,228 @@
+import MetaTrader5 as mt5
+import numpy as np
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+from core.trading_engine import TradingEngine
+from core.market_utils import pip_size_from_info, volatility_from_rates, sl_tp_from_price
+from core.volatility_service import default_volatility_service
+from core.clock import get_clock
+
+
+@dataclass(frozen=True)
+class MarketContext:
+    """
+    Données de marché figées pour une news, partagées par toutes les stratégies.
+
+    Attributes:
+        symbol (str): Symbole du trading
+        rates (np.ndarray): Dernières bougies M1 (lecture seule)
+        tick: Dernier tick MT5 du symbole
+        symbol_info: symbol_info MT5 du symbole
+        pip_size (float): Taille du pip
+        volatility (float): Volatilité (high-low) sur les 'volatility_lookback' dernières bougies
+        volatility_lookback (int): Nombre de bougies utilisées pour la volatilité
+        created_at (float): Timestamp de construction du contexte
+    """
+    symbol: str
+    rates: Any
+    tick: Any
+    symbol_info: Any
+    pip_size: float
+    volatility: float
+    volatility_lookback: int
+    created_at: float
+
+
+def build_market_context(symbol, volatility_lookback=3, volatility_service=None) -> Optional[MarketContext]:
+    """
+    Construit le contexte de marché d'une news : bougies M1 et volatilité depuis le
+    VolatilityService (mis à jour de façon incrémentale), tick et symbol_info depuis MT5.
+
+    Returns:
+        MarketContext: Le contexte, ou None si le tick ou le symbole est indisponible
+    """
+    volatility_service = volatility_service or default_volatility_service
+    rates = volatility_service.get_bars(symbol, mt5.TIMEFRAME_M1)
+    tick = mt5.symbol_info_tick(symbol)
+    info = mt5.symbol_info(symbol)
+
+    if tick is None or info is None:
+        logging.error(f"Impossible de construire le contexte de marché pour {symbol}")
+        return None
+
+    if rates is not None:
+        rates = np.array(rates, copy=True)
+        rates.setflags(write=False)
+    else:
+        logging.error(f"Erreur : pas de bougies pour {symbol}")
+
+    return MarketContext(
+        symbol=symbol,
+        rates=rates,
+        tick=tick,
+        symbol_info=info,
+        pip_size=pip_size_from_info(info),
+        volatility=volatility_service.get_range(symbol, mt5.TIMEFRAME_M1, volatility_lookback) if rates is not None else 0,
+        volatility_lookback=volatility_lookback,
+        created_at=get_clock().time(),
+    )
+
+
+class BaseStrategy:
+    """
+    Interface commune des stratégies.
+
+    Une stratégie s'exécute via `run(context, ...)` : tant qu'un contexte est attaché,
+    volatilité, pip size, tick et symbol_info sont lus depuis ce contexte au lieu
+    d'interroger MT5.
+    """
+    name = "base"
+
+    def __init__(self, symbol, comment, engine=None, volatility_service=None):
+        self.engine = engine if engine is not None else TradingEngine()
+        self.volatility_service = volatility_service or default_volatility_service
+        self.symbol = symbol
+        self.news_data = None
+        self.comment = comment
+        self.news_id = None
+        self.context = None
+
+    @classmethod
+    def preload_dependencies(cls):
+        """Importe les dépendances lourdes de la stratégie (appelé en arrière-plan après le démarrage)."""
+
+    def _has_context(self, symbol):
+        return self.context is not None and self.context.symbol == symbol
+
+    def run(self, context, trend=None):
+        """Point d'entrée du runtime : attache le contexte et exécute la stratégie."""
+        self.context = context
+        return self.execute_strategy(trend)
+
+    def execute_strategy(self, trend):
+        raise NotImplementedError
+
+    def get_tick(self):
+        if self._has_context(self.symbol):
+            return self.context.tick
+        return mt5.symbol_info_tick(self.symbol)
+
+    def get_symbol_info(self, symbol):
+        if self._has_context(symbol):
+            return self.context.symbol_info
+        return mt5.symbol_info(symbol)
+
+    def get_volatility(self, symbol, timeframe=mt5.TIMEFRAME_M1, lookback=3):
+        if self._has_context(symbol) and timeframe == mt5.TIMEFRAME_M1:
+            if lookback == self.context.volatility_lookback:
+                return self.context.volatility
+            if self.context.rates is not None and len(self.context.rates) >= lookback:
+                return volatility_from_rates(self.context.rates, lookback)
+
+        return self.volatility_service.get_range(symbol, timeframe, lookback)
+
+    def get_pip_size(self, symbol):
+        if self._has_context(symbol):
+            return self.context.pip_size
+        info = mt5.symbol_info(symbol)
+        if info is None:
+            logging.error(f"Erreur : pas d'info pour {symbol}")
+        return pip_size_from_info(info)
+
+    def get_minimum_distance(self, pip_size):
+        symbol_info = self.get_symbol_info(self.symbol)
+        if symbol_info is None:
+            logging.error(f"Erreur : symbol_info non trouvé pour {self.symbol}")
+            return (None, None, None)
+        return symbol_info.trade_stops_level * pip_size
+
+    def calculate_sl_tp(self, direction, volatility_multiplier=1, tp_ratio=1.2):
+        """
+        Calcule les prix de SL et TP basés sur la volatilité récente.
+
+        :param direction: "buy" ou "sell"
+        :param volatility_multiplier: Multiplicateur de la volatilité (ex: 1.5x)
+        :param tp_ratio: Ratio TP/SL (ex: 2 pour un RR 1:2)
+        :return: (sl_price, tp_price, entry_price)
+        """
+        tick = self.get_tick()
+        if tick is None:
+            logging.error(f"Erreur : pas de tick pour {self.symbol}")
+            return (None, None, None)
+        entry_price = tick.ask if direction == "buy" else tick.bid
+
+        sl_price, tp_price = self.calculate_sl_tp_from_price(
+            direction, entry_price, volatility_multiplier, tp_ratio
+        )
+        return (sl_price, tp_price, entry_price)
+
+    def calculate_sl_tp_from_price(self, direction, entry_price, volatility_multiplier=1, tp_ratio=1.2):
+        """
+        Calcule les SL/TP à partir d’un prix donné, plutôt que du prix marché.
+        """
+        volatility = self.get_volatility(self.symbol)
+        pip_size = self.get_pip_size(self.symbol)
+        return sl_tp_from_price(direction, entry_price, volatility, pip_size, volatility_multiplier, tp_ratio)
+
+
+class StrategyRuntime:
+    """
+    Exécute toutes les stratégies enregistrées sur une news avec un seul contexte de marché.
+
+    Le contexte est construit une fois par news ; ajouter une stratégie ne coûte
+    donc aucun appel MT5 supplémentaire pour les données de marché.
+    """
+
+    def __init__(self, engine=None, max_workers=4, volatility_service=None):
+        self.engine = engine if engine is not None else TradingEngine()
+        self.volatility_service = volatility_service or default_volatility_service
+        self.max_workers = max_workers
+        self.strategies = []
+
+    def register(self, strategy_cls, comment):
+        """
+        Enregistre une stratégie.
+
+        Args:
+            strategy_cls: Classe héritant de BaseStrategy
+            comment: Commentaire des ordres, peut contenir '{title}' (10 premiers caractères du titre de la news)
+        """
+        self.strategies.append((strategy_cls, comment))
+
+    def _run_one(self, strategy_cls, comment, context, title, trend, news_id):
+        strategy = strategy_cls(context.symbol, comment.format(title=title[:10]), self.engine, self.volatility_service)
+        strategy.news_id = news_id
+        try:
+            return strategy.run(context, trend)
+        except Exception:
+            logging.exception(f"Erreur dans la stratégie {strategy_cls.name} sur {context.symbol}")
+            return False
+
+    def run_event(self, symbol, title="", trend=None, news_id=None):
+        """
+        Construit le contexte de marché de la news et le passe à chaque stratégie, en parallèle.
+
+        Args:
+            symbol: Symbole du trading
+            title: Titre de la news (utilisé dans les commentaires d'ordres)
+            trend: Direction détectée ('buy'/'sell'), pour les stratégies qui en ont besoin
+            news_id: Identifiant de la news, reporté dans le journal des trades
+
+        Returns:
+            dict: Résultat de chaque stratégie, indexé par son nom
+        """
+        if not self.strategies:
+            return {}
+
+        context = build_market_context(symbol, volatility_service=self.volatility_service)
+        if context is None:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.strategies))) as executor:
+            futures = {
+                strategy_cls.name: executor.submit(self._run_one, strategy_cls, comment, context, title, trend, news_id)
+                for strategy_cls, comment in self.strategies
+            }
+            return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,139 @@
+import MetaTrader5 as mt5
+import logging
+import threading
+from core.clock import get_clock
+
+
+class SymbolResolver:
+    """
+    Index paire de devises -> nom du symbole chez le broker ('EURUSD' -> 'EURUSD.m').
+
+    L'index est construit une seule fois à partir de symbols_get() ; les symboles utilisés
+    sont ajoutés au Market Watch (symbol_select) à leur première résolution. Au moment
+    d'un déclenchement, résoudre un candidat ne coûte donc qu'une lecture de dict.
+
+    Si symbols_get échoue (terminal pas encore connecté), la construction est retentée
+    au plus toutes les retry_after secondes, par exemple après une reconnexion du watchdog.
+
+    Attributes:
+        index (dict): Nom du symbole broker par paire ('EURUSD', 'USDCNH', ...)
+        built (bool): True une fois l'index construit
+        retry_after (float): Délai en secondes avant de retenter une construction échouée
+    """
+
+    def __init__(self, retry_after=60):
+        self._lock = threading.Lock()
+        self.index = {}
+        self.built = False
+        self.retry_after = retry_after
+        self._failed_at = None
+        self._selected = set()
+        self._missing = set()
+
+    @staticmethod
+    def pair_of(info):
+        """
+        Paire de devises d'un symbole MT5 : currency_base + currency_profit, ou les 6 premières
+        lettres du nom si ces champs manquent.
+
+        Returns:
+            str: La paire ('EURUSD'), ou None si le symbole n'est pas une paire de devises
+        """
+        base = getattr(info, "currency_base", None)
+        profit = getattr(info, "currency_profit", None)
+        if base is not None and profit is not None:
+            if len(base) == 3 and len(profit) == 3 and base != profit and base.isalpha() and profit.isalpha():
+                return (base + profit).upper()
+            return None
+        letters = "".join(c for c in info.name.upper() if c.isalpha())
+        return letters[:6] if len(letters) >= 6 else None
+
+    @staticmethod
+    def _preference(pair, info):
+        # Nom exact d'abord, puis symbole déjà visible dans le Market Watch, puis le nom le plus court
+        return (info.name.upper() != pair, not getattr(info, "visible", False), len(info.name), info.name)
+
+    def build(self) -> bool:
+        """
+        Construit l'index à partir de tous les symboles du broker.
+
+        Returns:
+            bool: True si l'index a été construit, False si symbols_get a échoué
+        """
+        symbols = mt5.symbols_get()
+        if symbols is None:
+            self._failed_at = get_clock().time()
+            logging.error("Impossible de lister les symboles du broker : %s", mt5.last_error())
+            return False
+
+        best = {}
+        for info in symbols:
+            pair = self.pair_of(info)
+            if pair is None:
+                continue
+            current = best.get(pair)
+            if current is None or self._preference(pair, info) < self._preference(pair, current):
+                best[pair] = info
+
+        with self._lock:
+            self.index = {pair: info.name for pair, info in best.items()}
+            self.built = True
+            self._failed_at = None
+            self._missing.clear()
+        renamed = {pair: name for pair, name in self.index.items() if name != pair}
+        logging.info("Index des symboles : %s paires sur %s symboles broker (%s sous un autre nom)",
+                     len(self.index), len(symbols), len(renamed),
+                     extra={"event": "symbol_index", "pairs": len(self.index), "renamed": renamed})
+        return True
+
+    def _backing_off(self) -> bool:
+        return self._failed_at is not None and get_clock().time() - self._failed_at < self.retry_after
+
+    def resolve(self, pair):
+        """
+        Nom broker d'une paire, sélectionné dans le Market Watch si besoin.
+
+        L'index est construit au premier appel s'il ne l'a pas été au démarrage (prepare).
+        Sans index (symbols_get indisponible), la paire est renvoyée telle quelle et la
+        construction est retentée une fois retry_after écoulé.
+
+        Returns:
+            str: Le nom du symbole broker, ou None si le broker ne propose pas la paire
+        """
+        pair = pair.upper()
+        if not self.built and (self._backing_off() or not self.build()):
+            return pair
+
+        name = self.index.get(pair)
+        if name is None:
+            if pair not in self._missing:
+                self._missing.add(pair)
+                logging.warning("Paire %s absente chez le broker, ignorée", pair)
+            return None
+
+        if name not in self._selected:
+            if not mt5.symbol_select(name, True):
+                logging.error("Impossible d'ajouter %s au Market Watch : %s", name, mt5.last_error())
+                return None
+            with self._lock:
+                self._selected.add(name)
+        return name
+
+    def resolve_many(self, pairs) -> list:
+        """Noms broker des paires disponibles, dans le même ordre."""
+        names = (self.resolve(pair) for pair in pairs)
+        return [name for name in names if name is not None]
+
+    def prepare(self, pairs) -> list:
+        """
+        Construit l'index et sélectionne toutes les paires données, au démarrage du bot.
+
+        Returns:
+            list: Les paires introuvables chez le broker
+        """
+        self.build()
+        return [pair for pair in dict.fromkeys(pair.upper() for pair in pairs) if self.resolve(pair) is None]
+
+
+# Index partagé par défaut (construit une fois par process)
+default_symbol_resolver = SymbolResolver()
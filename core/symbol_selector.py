@@ -1,10 +1,31 @@
 import MetaTrader5 as mt5
-import pandas as pd
-import pandas_ta as ta
+import numpy as np
 import logging
+import time
+from core.position_snapshot import PositionSnapshot
+from core.market_utils import NEWS_CURRENCY_SYMBOLS, pip_size_from_info
+from core.bar_aggregator import default_bar_aggregator
+from core.symbol_resolver import default_symbol_resolver
 
 class SymbolSelector:
-    def __init__(self):
+    def __init__(self, snapshot=None, exposure=None, lot_size=0.01, ranking="priority", range_bars=5, bar_aggregator=None, resolver=None,
+                 reactions=None):
+        self.snapshot = snapshot if snapshot is not None else PositionSnapshot()
+        # Bougies M5 dérivées des M1 (un seul appel MT5 par candidat en multi-timeframe)
+        self.bar_aggregator = bar_aggregator or default_bar_aggregator
+        # Paire -> nom du symbole chez le broker (suffixes '.m', 'pro'...), index construit une fois au démarrage
+        self.resolver = resolver or default_symbol_resolver
+        # NewsReactionTable optionnelle : candidats ordonnés / filtrés par leur réaction historique à la news
+        self.reactions = reactions
+        # SpeculativeEvaluator optionnel : décision multi-timeframe préparée depuis T+0
+        self.speculative = None
+        # Ordre des candidats : "priority" (liste fixe ci-dessous) ou "cost" (rank_symbols : spread vs range récent)
+        self.ranking = ranking
+        self.range_bars = range_bars
+        self.last_ranking = None
+        # Exposition par devise (ExposureIndex) : un candidat qui dépasserait un plafond est ignoré
+        self.exposure = exposure
+        self.lot_size = lot_size
 
         self.symbol_priority = {
             'USD': ['EURUSD', 'GBPUSD', 'USDJPY', 'USDCHF', 'USDCAD', 'AUDUSD', 'NZDUSD'],
@@ -19,15 +40,88 @@ class SymbolSelector:
         }
     
 
+    def rank_symbols(self, country_news, title=None):
+        """
+        Classe les symboles candidats d'une devise par coût ajusté : range récent / spread, en pips.
+
+        Les ticks et bougies de tous les candidats sont récupérés en un seul passage
+        (MT5 n'a pas d'appel multi-symboles), puis le score est calculé en une passe vectorisée.
+
+        Args:
+            country_news: Devise de la news ('USD', 'EUR', ...)
+            title: Titre de la news (filtre des candidats par la table de réactions, optionnel)
+
+        Returns:
+            tuple: (liste des symboles classés du meilleur au moins bon, détail du scoring par symbole)
+        """
+        candidates = self.resolver.resolve_many(self._candidate_pairs(country_news.upper(), title))
+        if not candidates:
+            return [], {}
+
+        # 1. Collecte des données brutes
+        infos = [mt5.symbol_info(symbol) for symbol in candidates]
+        ticks = [mt5.symbol_info_tick(symbol) if info is not None else None for symbol, info in zip(candidates, infos)]
+        rates = [
+            mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M1, 0, self.range_bars) if tick is not None else None
+            for symbol, tick in zip(candidates, ticks)
+        ]
+
+        # 2. Scoring vectorisé
+        start = time.perf_counter()
+        valid = np.array([
+            tick is not None and r is not None and len(r) > 0 for tick, r in zip(ticks, rates)
+        ])
+        pip = np.array([pip_size_from_info(info) for info in infos])
+        bid = np.array([tick.bid if tick is not None else np.nan for tick in ticks])
+        ask = np.array([tick.ask if tick is not None else np.nan for tick in ticks])
+        high = np.array([r['high'].max() if ok else np.nan for r, ok in zip(rates, valid)])
+        low = np.array([r['low'].min() if ok else np.nan for r, ok in zip(rates, valid)])
+
+        spread_pips = (ask - bid) / pip
+        range_pips = (high - low) / pip
+        # Spread plancher à 0.1 pip pour ne pas diviser par zéro sur les cotations sans spread
+        score = np.where(valid, range_pips / np.maximum(spread_pips, 0.1), -np.inf)
+        order = np.argsort(-score, kind="stable")
+        elapsed_us = (time.perf_counter() - start) * 1e6
+
+        breakdown = {
+            candidates[i]: {
+                "rank": rank + 1,
+                "spread_pips": float(spread_pips[i]),
+                "range_pips": float(range_pips[i]),
+                "score": float(score[i]),
+                "valid": bool(valid[i]),
+            }
+            for rank, i in enumerate(order)
+        }
+        ranked = [candidates[i] for i in order if valid[i]]
+        self.last_ranking = {"country": country_news.upper(), "elapsed_us": elapsed_us, "symbols": breakdown}
+        logging.debug("[%s] Classement coût : %s (%.0f µs)", country_news.upper(), ranked, elapsed_us,
+                      extra={"event": "symbol_ranking", "breakdown": breakdown})
+        return ranked, breakdown
+
+    def _candidate_pairs(self, country, title=None):
+        """Paires de la liste de priorité, ordonnées et filtrées par la table de réactions si la news est connue."""
+        pairs = self.symbol_priority.get(country, [])
+        if title is None or self.reactions is None:
+            return pairs
+        return self.reactions.order_candidates(title, country, pairs)
+
+    def get_candidates(self, country, title=None):
+        """Symboles broker à évaluer pour la devise, dans l'ordre du mode de classement configuré."""
+        if self.ranking == "cost":
+            ranked, _ = self.rank_symbols(country, title)
+            return ranked
+        return self.resolver.resolve_many(self._candidate_pairs(country, title))
+
     def check_if_open_position(self, symbol):
-        positions = mt5.positions_get()
-        if positions is None:
-            return False
-        return any(pos.symbol == symbol for pos in positions)
+        return self.snapshot.has_position(symbol)
     
 
     def detect_trend(self, symbol, timeframe=mt5.TIMEFRAME_M1, lookback=3):
         """Détecte la tendance sur les dernières 'lookback' bougies M1."""
+        import pandas as pd
+
         rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, lookback)
         if rates is None or len(rates) < lookback:
             logging.error("Erreur : Données MT5 insuffisantes.")
@@ -45,8 +139,16 @@ class SymbolSelector:
         return False
     
     def detect_trend_multi_timeframe(self, symbol):
-        m5_data = pd.DataFrame(mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M5, 0, 50))
-        m1_data = pd.DataFrame(mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M1, 0, 50))
+        # Imports locaux : pandas / pandas_ta sont lourds et inutiles au démarrage
+        import pandas as pd
+        import pandas_ta as ta
+
+        # Une seule série M1 demandée au terminal, les M5 en sont dérivées localement
+        rates = self.bar_aggregator.get_rates(symbol, {mt5.TIMEFRAME_M5: 50, mt5.TIMEFRAME_M1: 50})
+        if rates[mt5.TIMEFRAME_M5] is None or rates[mt5.TIMEFRAME_M1] is None:
+            return None
+        m5_data = pd.DataFrame(rates[mt5.TIMEFRAME_M5])
+        m1_data = pd.DataFrame(rates[mt5.TIMEFRAME_M1])
         m5_data['time'] = pd.to_datetime(m5_data['time'], unit='s')
         m1_data['time'] = pd.to_datetime(m1_data['time'], unit='s')
 
@@ -86,96 +188,119 @@ class SymbolSelector:
             return None  # on passe son tour
     
 
-    def get_best_symbol(self, country_news):
+    def get_best_symbol(self, country_news, title=None):
         """Retourne le meilleur symbole à trader selon la news (pays concerné)."""
         country = country_news.upper()  # Exemple : 'USD', 'EUR', etc.
 
         # 1. Vérifie si on a une liste prioritaire de symboles pour ce pays
         if country in self.symbol_priority:
-            for symbol in self.symbol_priority[country]:
+            for symbol in self.get_candidates(country, title):
                 # Vérifie que le symbole existe
                 if mt5.symbol_info(symbol) is None:
-                    logging.debug(f"[{country}] Symbole non disponible sur MT5 : {symbol}")
+                    logging.debug("[%s] Symbole non disponible sur MT5 : %s", country, symbol)
                     continue
 
                 
                 # Vérifie qu'aucune position n'est déjà ouverte
                 open_position = self.check_if_open_position(symbol)
                 if open_position:
-                    logging.debug(f"[{country}] Position déjà ouverte sur {symbol}, skip.")
+                    logging.debug("[%s] Position déjà ouverte sur %s, skip.", country, symbol)
                     continue
 
                 # Vérifie qu'un trade est détecté par la stratégie
                 trend = self.detect_trend(symbol)
                 if not trend:
-                    logging.debug(f"[{country}] Pas de trend détecté sur {symbol}, skip.")
+                    logging.debug("[%s] Pas de trend détecté sur %s, skip.", country, symbol)
+                    continue
+
+                # Vérifie que le trade ne dépasse pas le plafond d'exposition d'une devise
+                if self.exposure is not None and self.exposure.would_exceed(symbol, trend, self.lot_size):
+                    logging.debug("[%s] Plafond d'exposition atteint pour %s %s, skip.", country, trend, symbol)
                     continue
 
                 # Tout est bon, on retourne ce symbole et sa trend
-                logging.info(f"[{country}] Symbole sélectionné : {symbol}, trend : {trend}")
+                logging.info("[%s] Symbole sélectionné : %s, trend : %s", country, symbol, trend)
                 return symbol, trend
 
             # Aucun symbole n’a satisfait les conditions
-            logging.warning(f"[{country}] Aucun symbole éligible (position ouverte ou pas de trend).")
+            logging.warning("[%s] Aucun symbole éligible (position ouverte, pas de trend ou plafond d'exposition).", country)
             return None
 
         else:
-            logging.warning(f'{country} pas supporté par ZenLion !')
+            logging.warning('%s pas supporté par ZenLion !', country)
             return None
 
 
-    def get_best_symbol_multi_timeframe(self, country_news):
-        """Retourne le meilleur symbole à trader selon la news (pays concerné)."""
+    def evaluate_multi_timeframe(self, country_news, title=None):
+        """Évalue tous les candidats de la devise et retourne (symbol, trend) du premier éligible, ou None."""
         country = country_news.upper()  # Exemple : 'USD', 'EUR', etc.
 
         # 1. Vérifie si on a une liste prioritaire de symboles pour ce pays
         if country in self.symbol_priority:
-            for symbol in self.symbol_priority[country]:
+            for symbol in self.get_candidates(country, title):
                 # Vérifie que le symbole existe
                 if mt5.symbol_info(symbol) is None:
-                    logging.debug(f"[{country}] Symbole non disponible sur MT5 : {symbol}")
+                    logging.debug("[%s] Symbole non disponible sur MT5 : %s", country, symbol)
                     continue
 
                 
                 # Vérifie qu'aucune position n'est déjà ouverte
                 open_position = self.check_if_open_position(symbol)
                 if open_position:
-                    logging.debug(f"[{country}] Position déjà ouverte sur {symbol}, skip.")
+                    logging.debug("[%s] Position déjà ouverte sur %s, skip.", country, symbol)
                     continue
 
                 # Vérifie qu'un trade est détecté par la stratégie
                 trend = self.detect_trend_multi_timeframe(symbol)
                 if not trend:
-                    logging.debug(f"[{country}] Pas de trend détecté sur {symbol}, skip.")
+                    logging.debug("[%s] Pas de trend détecté sur %s, skip.", country, symbol)
+                    continue
+
+                # Vérifie que le trade ne dépasse pas le plafond d'exposition d'une devise
+                if self.exposure is not None and self.exposure.would_exceed(symbol, trend, self.lot_size):
+                    logging.debug("[%s] Plafond d'exposition atteint pour %s %s, skip.", country, trend, symbol)
                     continue
 
                 # Tout est bon, on retourne ce symbole et sa trend
-                logging.info(f"[{country}] Symbole sélectionné : {symbol}, trend : {trend}")
                 return symbol, trend
 
             # Aucun symbole n’a satisfait les conditions
-            logging.warning(f"[{country}] Aucun symbole éligible (position ouverte ou pas de trend).")
             return None
 
         else:
-            logging.warning(f'{country} pas supporté par ZenLion !')
+            logging.warning('%s pas supporté par ZenLion !', country)
             return None
 
 
+    def get_best_symbol_multi_timeframe(self, country_news, title=None):
+        """Retourne le meilleur symbole à trader selon la news (pays concerné)."""
+        country = country_news.upper()
+
+        # Décision déjà calculée depuis T+0 par l'évaluateur spéculatif : seuls les contrôles O(1) sont refaits
+        if self.speculative is not None:
+            ready, decision = self.speculative.get_decision(country, title)
+            if ready and decision is None:
+                logging.warning("[%s] Aucun symbole éligible (décision spéculative).", country)
+                return None
+            if ready:
+                symbol, trend = decision
+                blocked = self.check_if_open_position(symbol) or (
+                    self.exposure is not None and self.exposure.would_exceed(symbol, trend, self.lot_size)
+                )
+                if not blocked:
+                    logging.info("[%s] Symbole sélectionné : %s, trend : %s (décision spéculative)", country, symbol, trend)
+                    return decision
+
+        decision = self.evaluate_multi_timeframe(country, title)
+        if decision is None:
+            logging.warning("[%s] Aucun symbole éligible (position ouverte, pas de trend ou plafond d'exposition).", country)
+        else:
+            logging.info("[%s] Symbole sélectionné : %s, trend : %s", country, *decision)
+        return decision
+
+
     def get_symbol_from_news_currency(self, news_currency):
-        mapping = {
-            'USD': 'EURUSD',
-            'EUR': 'EURUSD',
-            'GBP': 'GBPUSD',
-            'JPY': 'USDJPY',
-            'CHF': 'USDCHF',
-            'AUD': 'AUDUSD',
-            'CAD': 'USDCAD',
-            'NZD': 'NZDUSD',
-            'CNY': 'USDCNH',  # souvent nommée comme ça chez les brokers
-        }
-        
-        symbol = mapping.get(news_currency.upper())
+        symbol = NEWS_CURRENCY_SYMBOLS.get(news_currency.upper())
         if symbol is None:
             raise ValueError(f"Devise non supportée : {news_currency}")
-        return symbol
+        return self.resolver.resolve(symbol)
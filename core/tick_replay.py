@@ -0,0 +1,286 @@
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from core.market_utils import SERVER_OFFSET_HOURS, pip_size_for_symbol, sl_tp_from_price
+
+
+# Configuration
+TICKS_DIR = "ticks"
+TICK_DTYPE = np.dtype([("time_msc", "<i8"), ("bid", "<f8"), ("ask", "<f8")])
+CHUNK_SIZE = 1_000_000
+
+# Expiration des ordres pending, cf TradingEngine.prepare_pending_order_request
+PENDING_EXPIRATION_MS = 15 * 60 * 1000
+
+
+@dataclass(frozen=True)
+class PendingOrder:
+    """
+    Ordre pending à rejouer.
+
+    Attributes:
+        side (str): 'buy' ou 'sell'
+        price (float): Prix de l'ordre
+        sl (float): Stop loss
+        tp (float): Take profit
+        placed_msc (int): Heure d'envoi (ms UTC)
+        current_price (float): Prix au moment de l'envoi (choisit stop ou limit)
+        comment (str): Commentaire de l'ordre
+    """
+    side: str
+    price: float
+    sl: float
+    tp: float
+    placed_msc: int
+    current_price: float
+    comment: str = ""
+
+    @property
+    def kind(self):
+        # Même règle que TradingEngine.prepare_pending_order_request
+        if self.side == "buy":
+            return "limit" if self.price < self.current_price else "stop"
+        return "limit" if self.price > self.current_price else "stop"
+
+
+@dataclass(frozen=True)
+class ReplayResult:
+    """Résultat d'un ordre rejoué (exit_reason : 'sl', 'tp', 'timeout', 'expired' ou 'no_data')."""
+    comment: str
+    kind: str
+    filled: bool
+    fill_msc: Optional[int]
+    fill_price: Optional[float]
+    exit_msc: Optional[int]
+    exit_price: Optional[float]
+    exit_reason: str
+    pnl: float
+
+
+def convert_csv_to_npy(csv_path, npy_path=None, chunk_rows=CHUNK_SIZE):
+    """
+    Convertit une archive CSV de ticks (colonnes time_msc, bid, ask, ex: export de copy_ticks_range)
+    en fichier .npy binaire, morceau par morceau, pour la lecture en memory-map.
+
+    Le time_msc du CSV est en heure serveur MT5 (UTC+SERVER_OFFSET_HOURS) : il est ramené
+    en UTC dans le .npy, la base de temps des news archivées et des bougies de bars/.
+
+    Returns:
+        str: Chemin du fichier .npy
+    """
+    import pandas as pd
+
+    npy_path = npy_path or os.path.splitext(csv_path)[0] + ".npy"
+    with open(csv_path, "rb") as f:
+        total_rows = sum(1 for _ in f) - 1
+
+    output = np.lib.format.open_memmap(npy_path, mode="w+", dtype=TICK_DTYPE, shape=(total_rows,))
+    offset = 0
+    for chunk in pd.read_csv(csv_path, usecols=list(TICK_DTYPE.names), chunksize=chunk_rows):
+        end = offset + len(chunk)
+        for name in TICK_DTYPE.names:
+            output[name][offset:end] = chunk[name].to_numpy()
+        output["time_msc"][offset:end] -= SERVER_OFFSET_HOURS * 3_600_000
+        offset = end
+    output.flush()
+    del output
+
+    logging.info("OK - %s ticks convertis dans : %s", total_rows, npy_path)
+    return npy_path
+
+
+def open_ticks(symbol, ticks_dir=TICKS_DIR):
+    """Ouvre les ticks d'un symbole en memory-map, time_msc en UTC (convertit le CSV au premier appel)."""
+    npy_path = os.path.join(ticks_dir, f"{symbol}.npy")
+    csv_path = os.path.join(ticks_dir, f"{symbol}.csv")
+    if not os.path.exists(npy_path):
+        if not os.path.exists(csv_path):
+            return None
+        convert_csv_to_npy(csv_path, npy_path)
+    return np.load(npy_path, mmap_mode="r")
+
+
+def _first_true(mask):
+    if not mask.size:
+        return -1
+    index = int(np.argmax(mask))
+    return index if mask[index] else -1
+
+
+class TickReplayEngine:
+    """
+    Rejoue des ordres pending sur des ticks (bid/ask) : déclenchement, SL/TP, expiration et fermeture après délai.
+
+    Les ticks sont lus par morceaux depuis un tableau memory-mappé : seule la fenêtre
+    utile est parcourue, et chaque morceau est testé en une opération vectorisée.
+
+    Attributes:
+        ticks (np.ndarray): Ticks triés par time_msc UTC (memmap ou tableau)
+        chunk_size (int): Nombre de ticks testés par opération
+        ticks_scanned (int): Compteur de ticks parcourus (mesure du débit)
+    """
+
+    def __init__(self, ticks, chunk_size=CHUNK_SIZE):
+        self.ticks = ticks
+        self.chunk_size = chunk_size
+        self.ticks_scanned = 0
+
+    def index_at(self, time_msc):
+        """Indice du premier tick à time_msc ou après."""
+        return int(np.searchsorted(self.ticks["time_msc"], time_msc, side="left"))
+
+    def _scan(self, start, end, condition):
+        """Premier indice de [start, end) où condition(chunk) est vraie, ou -1."""
+        for chunk_start in range(start, end, self.chunk_size):
+            chunk = self.ticks[chunk_start:min(chunk_start + self.chunk_size, end)]
+            self.ticks_scanned += len(chunk)
+            offset = _first_true(condition(chunk))
+            if offset >= 0:
+                return chunk_start + offset
+        return -1
+
+    def replay_order(self, order: PendingOrder, max_hold_ms=45 * 60 * 1000, expiration_ms=PENDING_EXPIRATION_MS):
+        """
+        Rejoue un ordre pending.
+
+        Un achat se déclenche et s'ouvre sur l'ask, se ferme sur le bid ; l'inverse pour une vente.
+
+        Returns:
+            ReplayResult: Le déroulé de l'ordre
+        """
+        kind = order.kind
+        start = self.index_at(order.placed_msc)
+        expiry = self.index_at(order.placed_msc + expiration_ms)
+        if start >= len(self.ticks):
+            return ReplayResult(order.comment, kind, False, None, None, None, None, "no_data", 0.0)
+
+        price = order.price
+        if order.side == "buy":
+            trigger = (lambda c: c["ask"] >= price) if kind == "stop" else (lambda c: c["ask"] <= price)
+        else:
+            trigger = (lambda c: c["bid"] <= price) if kind == "stop" else (lambda c: c["bid"] >= price)
+
+        fill = self._scan(start, expiry, trigger)
+        if fill < 0:
+            return ReplayResult(order.comment, kind, False, None, None, None, None, "expired", 0.0)
+
+        fill_tick = self.ticks[fill]
+        fill_price = float(fill_tick["ask"] if order.side == "buy" else fill_tick["bid"])
+        # Un stop exécuté sur un gap est rempli au prix du marché, un limit au prix demandé au mieux
+        if kind == "limit":
+            fill_price = min(fill_price, price) if order.side == "buy" else max(fill_price, price)
+
+        close_end = self.index_at(int(fill_tick["time_msc"]) + max_hold_ms)
+        sl, tp = order.sl, order.tp
+        if order.side == "buy":
+            exit_condition = lambda c: (c["bid"] <= sl) | (c["bid"] >= tp)
+        else:
+            exit_condition = lambda c: (c["ask"] >= sl) | (c["ask"] <= tp)
+
+        exit_index = self._scan(fill, close_end, exit_condition)
+        if exit_index >= 0:
+            exit_tick = self.ticks[exit_index]
+            market = float(exit_tick["bid"] if order.side == "buy" else exit_tick["ask"])
+            hit_sl = market <= sl if order.side == "buy" else market >= sl
+            reason = "sl" if hit_sl else "tp"
+        else:
+            exit_index = max(min(close_end, len(self.ticks)) - 1, fill)
+            exit_tick = self.ticks[exit_index]
+            market = float(exit_tick["bid"] if order.side == "buy" else exit_tick["ask"])
+            reason = "timeout"
+
+        pnl = market - fill_price if order.side == "buy" else fill_price - market
+        return ReplayResult(
+            order.comment, kind, True, int(fill_tick["time_msc"]), fill_price,
+            int(exit_tick["time_msc"]), market, reason, pnl
+        )
+
+    def sandwich_orders(self, news_msc, pip_size, lookback_minutes=5, buffer_pips=3,
+                        volatility_minutes=3, volatility_multiplier=1, tp_ratio=1.2, comment="sandwich"):
+        """
+        Ordres du sandwich placés à T-1, calculés depuis les ticks (plus haut / plus bas du bid
+        sur 'lookback_minutes', volatilité sur 'volatility_minutes'), comme TradingStrategySandwich.
+
+        Returns:
+            list: Deux PendingOrder (High, Low), ou [] si pas de données
+        """
+        placed = news_msc - 60_000
+        start = self.index_at(placed - lookback_minutes * 60_000)
+        end = self.index_at(placed)
+        if end <= start or end >= len(self.ticks):
+            return []
+
+        window = self.ticks[start:end]
+        recent = self.ticks[self.index_at(placed - volatility_minutes * 60_000):end]
+        high = float(window["bid"].max()) + buffer_pips * pip_size
+        low = float(window["bid"].min()) - buffer_pips * pip_size
+        volatility = float(recent["bid"].max() - recent["bid"].min()) if len(recent) else 0.0
+        last = self.ticks[end - 1]
+
+        sl_high, tp_high = sl_tp_from_price("buy", high, volatility, pip_size, volatility_multiplier, tp_ratio)
+        sl_low, tp_low = sl_tp_from_price("sell", low, volatility, pip_size, volatility_multiplier, tp_ratio)
+        return [
+            PendingOrder("buy", high, sl_high, tp_high, placed, float(last["ask"]), f"{comment}-High"),
+            PendingOrder("sell", low, sl_low, tp_low, placed, float(last["bid"]), f"{comment}-Low"),
+        ]
+
+
+def _replay_window(args):
+    symbol, news_msc, ticks_dir, params = args
+    ticks = open_ticks(symbol, ticks_dir)
+    if ticks is None:
+        return symbol, news_msc, [], 0
+    engine = TickReplayEngine(ticks)
+    orders = engine.sandwich_orders(news_msc, pip_size_for_symbol(symbol), **params.get("sandwich", {}))
+    results = [engine.replay_order(order, max_hold_ms=params.get("max_hold_minutes", 45) * 60_000) for order in orders]
+    return symbol, news_msc, results, engine.ticks_scanned
+
+
+def replay_news_windows(events, ticks_dir=TICKS_DIR, params=None, workers=None):
+    """
+    Rejoue le sandwich sur chaque news en parallèle (un process par fenêtre, ticks en memory-map partagés par l'OS).
+
+    Args:
+        events: Tuples (timestamp_utc, symbol, ...) comme renvoyés par optimizer.load_archived_events
+        ticks_dir: Dossier des archives de ticks
+        params: {'sandwich': kwargs de sandwich_orders, 'max_hold_minutes': int}
+        workers: Nombre de processus
+
+    Returns:
+        tuple: (liste (symbol, news_msc, [ReplayResult]), ticks parcourus, durée en secondes)
+    """
+    params = params or {}
+    tasks = [(event[1], int(event[0]) * 1000, ticks_dir, params) for event in events]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        outputs = list(executor.map(_replay_window, tasks))
+    elapsed = time.perf_counter() - start
+
+    scanned = sum(output[3] for output in outputs)
+    return [output[:3] for output in outputs], scanned, elapsed
+
+
+if __name__ == "__main__":
+    from tabulate import tabulate
+    from core.optimizer import load_archived_events, DATA_DIR
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Replay tick par tick du sandwich sur les news archivées")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--ticks-dir", default=TICKS_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    replayed, ticks_scanned, duration = replay_news_windows(load_archived_events(args.data_dir), args.ticks_dir, workers=args.workers)
+    table = [
+        [symbol, news_msc // 1000, r.comment, r.kind, r.exit_reason, round(r.pnl / pip_size_for_symbol(symbol), 1)]
+        for symbol, news_msc, results in replayed for r in results
+    ]
+    print(tabulate(table, headers=["Symbol", "News (ts)", "Order", "Type", "Exit", "P&L (pips)"], tablefmt="pretty"))
+    print(f"{ticks_scanned} ticks parcourus en {duration:.2f}s ({ticks_scanned / max(duration, 1e-9) / 1e6:.1f} M ticks/s)")
@@ -0,0 +1,174 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    news_id TEXT,
+    sent_at REAL NOT NULL,
+    latency_ms REAL,
+    symbol TEXT,
+    action INTEGER,
+    type INTEGER,
+    volume REAL,
+    requested_price REAL,
+    sl REAL,
+    tp REAL,
+    magic INTEGER,
+    comment TEXT,
+    position INTEGER,
+    retcode INTEGER,
+    deal INTEGER,
+    "order" INTEGER,
+    filled_volume REAL,
+    filled_price REAL,
+    bid REAL,
+    ask REAL,
+    result_comment TEXT,
+    slippage REAL,
+    request_json TEXT,
+    result_json TEXT
+)
+"""
+
+_INSERT = """
+INSERT INTO trades (
+    news_id, sent_at, latency_ms, symbol, action, type, volume, requested_price, sl, tp, magic,
+    comment, position, retcode, deal, "order", filled_volume, filled_price, bid, ask,
+    result_comment, slippage, request_json, result_json
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Types d'ordres MT5 côté achat (ORDER_TYPE_BUY, _BUY_LIMIT, _BUY_STOP, _BUY_STOP_LIMIT), les autres sont côté vente
+_BUY_ORDER_TYPES = {0, 2, 4, 6}
+
+
+class TradeJournal:
+    """
+    Journal de toutes les requêtes envoyées à `order_send` et de leurs résultats.
+
+    `record` ne fait qu'une mise en file : un thread écrivain convertit les entrées
+    et les insère par lots dans SQLite, sans jamais bloquer l'envoi des ordres.
+
+    Attributes:
+        db_path (str): Chemin de la base SQLite
+        batch_size (int): Nombre d'entrées au-delà duquel on écrit immédiatement
+        flush_interval (float): Délai maximum (secondes) avant écriture d'un lot incomplet
+    """
+
+    def __init__(self, db_path="data/trade_journal.db", batch_size=50, flush_interval=1.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._stop = object()
+        self._flush_request = object()
+        self._flushed = threading.Event()
+        self._thread = threading.Thread(target=self._writer, name="trade-journal", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, request: dict, result, sent_at: float, latency: float, news_id: str = None):
+        """
+        Ajoute une requête et son résultat au journal (mise en file uniquement).
+
+        Args:
+            request: Requête passée à order_send (copiée, elle peut être modifiée ensuite)
+            result: OrderSendResult renvoyé par MT5 (ou None)
+            sent_at: Timestamp (time.time()) de l'envoi
+            latency: Durée de l'appel order_send en secondes
+            news_id: Identifiant de la news à l'origine de l'ordre
+        """
+        self._queue.put((dict(request), result, sent_at, latency, news_id))
+
+    def flush(self, timeout=5.0):
+        """Force l'écriture des entrées en attente et attend qu'elle soit terminée."""
+        if not self._thread.is_alive():
+            return
+        self._flushed.clear()
+        self._queue.put(self._flush_request)
+        self._flushed.wait(timeout)
+
+    def close(self):
+        """Écrit les dernières entrées et arrête le thread écrivain."""
+        if self._thread.is_alive():
+            self._queue.put(self._stop)
+            self._thread.join()
+
+    @staticmethod
+    def _to_row(entry):
+        request, result, sent_at, latency, news_id = entry
+        result_fields = result._asdict() if result is not None else {}
+
+        requested_price = request.get("price")
+        filled_price = result_fields.get("price") or None
+        # Le slippage n'a de sens que pour un ordre exécuté (prix renvoyé non nul) ; positif = défavorable
+        slippage = None
+        if filled_price and requested_price:
+            sign = 1 if request.get("type") in _BUY_ORDER_TYPES else -1
+            slippage = (filled_price - requested_price) * sign
+
+        return (
+            news_id, sent_at, latency * 1000, request.get("symbol"), request.get("action"),
+            request.get("type"), request.get("volume"), requested_price, request.get("sl"),
+            request.get("tp"), request.get("magic"), request.get("comment"), request.get("position"),
+            result_fields.get("retcode"), result_fields.get("deal"), result_fields.get("order"),
+            result_fields.get("volume"), filled_price, result_fields.get("bid"), result_fields.get("ask"),
+            result_fields.get("comment"), slippage,
+            json.dumps(request, default=str),
+            json.dumps(result_fields, default=str) if result is not None else None,
+        )
+
+    def _write(self, connection, batch):
+        if not batch:
+            return
+        try:
+            connection.executemany(_INSERT, [self._to_row(entry) for entry in batch])
+            connection.commit()
+        except sqlite3.Error:
+            logging.exception("Erreur lors de l'écriture du journal des trades (%s entrées perdues)", len(batch))
+        batch.clear()
+
+    def _writer(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.db_path)
+        connection.execute(_CREATE_TABLE)
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_trades_news_id ON trades (news_id)")
+        connection.commit()
+
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                entry = None
+
+            if entry is self._stop:
+                self._write(connection, batch)
+                break
+            if entry is self._flush_request:
+                self._write(connection, batch)
+                deadline = None
+                self._flushed.set()
+                continue
+            if entry is not None:
+                batch.append(entry)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if len(batch) >= self.batch_size or (deadline is not None and time.monotonic() >= deadline):
+                self._write(connection, batch)
+                deadline = None
+
+        connection.close()
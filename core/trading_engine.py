@@ -1,23 +1,60 @@
 import MetaTrader5 as mt5
+import contextlib
 import logging
 from datetime import datetime, timedelta, timezone
 import time
+from concurrent.futures import ThreadPoolExecutor
+from core.position_snapshot import PositionSnapshot
+from core.clock import get_clock
+
+
+# Requote, prix changé, pas de cotation : la fermeture est renvoyée avec un prix frais
+REQUOTE_RETCODES = (10004, 10020, 10021)
 
 
 class TradingEngine:
-    def __init__(self):
+    def __init__(self, snapshot=None, journal=None, exposure=None, session_lock=None):
         """
         Initialise le moteur de trading avec des paramètres par défaut.
         
         Args:
+            snapshot (PositionSnapshot): Snapshot partagé des positions/ordres du cycle
+            journal (TradeJournal): Journal des requêtes/résultats d'ordres (optionnel)
+            exposure (ExposureIndex): Exposition par devise, mise à jour à chaque fill/fermeture (optionnel)
+            session_lock (SessionLock): Verrou de session de MT5Client, jamais de reconnexion pendant un envoi (optionnel)
             magic_number (int): Identifiant magique pour les ordres
             deviation (int): Déviation maximale autorisée en points
         """
         self.magic_number = 234000
         self.deviation = 20
+        self.snapshot = snapshot if snapshot is not None else PositionSnapshot()
+        self.journal = journal
+        self.exposure = exposure
+        self.session_lock = session_lock
         
 
     
+    def _send_order(self, request: dict, news_id: str = None):
+        """
+        Envoie la requête à MT5 et l'ajoute au journal des trades s'il y en a un.
+        
+        Args:
+            request: Requête d'ordre formatée
+            news_id: Identifiant de la news à l'origine de l'ordre
+            
+        Returns:
+            OrderSendResult: Le résultat MT5 (None en cas d'erreur)
+        """
+        session = self.session_lock.shared() if self.session_lock is not None else contextlib.nullcontext()
+        with session:
+            sent_at = time.time()
+            start = time.perf_counter()
+            result = mt5.order_send(request)
+            latency = time.perf_counter() - start
+        if self.journal is not None:
+            self.journal.record(request, result, sent_at, latency, news_id)
+        return result
+
     def _get_price(self, symbol: str, order_type: str):
         """
         Récupère le prix actuel selon le type d'ordre.
@@ -31,7 +68,7 @@ class TradingEngine:
         """
         tick = mt5.symbol_info_tick(symbol)
         if tick is None:
-            logging.error(f"Impossible de récupérer le tick pour {symbol}")
+            logging.error("Impossible de récupérer le tick pour %s", symbol)
             return None
             
         return tick.ask if order_type == "buy" else tick.bid
@@ -81,7 +118,7 @@ class TradingEngine:
         }
     
 
-    def _prepare_pending_order_request(
+    def prepare_pending_order_request(
         self,
         symbol: str,
         order_type: str,
@@ -91,7 +128,8 @@ class TradingEngine:
         comment: str,
         price: float,
         current_price: float,
-        reduced_lot: bool = False
+        reduced_lot: bool = False,
+        server_time: int = None
     ) -> dict:
         """
         Prépare le dictionnaire de requête pour l'ordre.
@@ -105,6 +143,7 @@ class TradingEngine:
             comment: Nom de la stratégie
             price: Prix d'exécution
             reduced_lot: Si c'est un lot réduit
+            server_time: Heure serveur (tick.time) de référence pour l'expiration, tick récupéré si absente
             
         Returns:
             dict: La requête d'ordre formatée
@@ -119,8 +158,9 @@ class TradingEngine:
             raise ValueError("order_type doit être 'buy' ou 'sell'")
 
         
-        tick = mt5.symbol_info_tick(symbol)
-        server_now = datetime.fromtimestamp(tick.time)
+        if server_time is None:
+            server_time = mt5.symbol_info_tick(symbol).time
+        server_now = datetime.fromtimestamp(server_time)
 
         expiration_time = server_now + timedelta(minutes=15)
         expiration_timestamp = int(expiration_time.timestamp())
@@ -171,29 +211,74 @@ class TradingEngine:
             bool: True si l'ordre a réussi, False sinon
         """
         if result is None:
-            logging.error(f'Erreur lors de l\'envoi de la requête : {mt5.last_error()}')
+            logging.error("Erreur lors de l'envoi de la requête : %s", mt5.last_error())
             return False
             
         if result.retcode == mt5.TRADE_RETCODE_DONE:
-            lot_info = f"lot REDUIT: {lot_size}" if reduced_lot else f"lot: {lot_size}"
+            # Nouveau fill : le snapshot des positions n'est plus à jour
+            self.snapshot.invalidate()
             logging.info(
-                f"{order_type} Trade exécuté pour {symbol}, "
-                f"TP: {take_profit} & SL: {stop_loss}, "
-                f"{lot_info} via la stratégie {comment} !"
+                "%s Trade exécuté pour %s, TP: %s & SL: %s, %s: %s via la stratégie %s !",
+                order_type, symbol, take_profit, stop_loss,
+                "lot REDUIT" if reduced_lot else "lot", lot_size, comment,
+                extra={
+                    "event": "order_done", "symbol": symbol, "order_type": order_type,
+                    "volume": lot_size, "sl": stop_loss, "tp": take_profit, "comment": comment,
+                    "order": result.order, "price": result.price, "retcode": result.retcode,
+                },
             )
             return True
             
         elif result.retcode == 10019:  # Pas assez de marge
-            logging.warning(f"Erreur: Pas assez de marge pour ouvrir l'ordre sur {symbol}. Tentative avec un lot réduit.")
+            logging.warning("Erreur: Pas assez de marge pour ouvrir l'ordre sur %s. Tentative avec un lot réduit.", symbol)
             return False
             
         else:
             logging.error(
-                f'Erreur lors de l\'envoi de la requête : {result.retcode}, '
-                f'{result.comment}, prix: {result.price}'
+                "Erreur lors de l'envoi de la requête : %s, %s, prix: %s",
+                result.retcode, result.comment, result.price,
+                extra={
+                    "event": "order_failed", "symbol": symbol, "order_type": order_type,
+                    "volume": lot_size, "comment": comment, "retcode": result.retcode,
+                },
             )
             return False
     
+    def _send_and_process(self, request: dict, order_type: str, news_id: str = None):
+        """
+        Envoie la requête, traite le résultat et retente en lot réduit si la marge manque.
+        
+        Args:
+            request: Requête d'ordre formatée (son volume est modifié en cas de lot réduit)
+            order_type: Type d'ordre ('buy' ou 'sell')
+            news_id: Identifiant de la news à l'origine de l'ordre
+            
+        Returns:
+            tuple: (succès, dernier résultat MT5)
+        """
+        symbol, lot_size, comment = request["symbol"], request["volume"], request["comment"]
+        stop_loss, take_profit = request["sl"], request["tp"]
+
+        result = self._send_order(request, news_id)
+        success = self._process_order_result(
+            result, symbol, order_type, lot_size, stop_loss, take_profit, comment
+        )
+        
+        # Si échec dû à un manque de marge, on tente avec un lot réduit
+        if not success and result is not None and result.retcode == 10019:
+            reduced_lot_size = max(0.01, round((lot_size / 2), 2))
+            request["volume"] = reduced_lot_size
+            
+            # Nouvel essai avec lot réduit
+            result = self._send_order(request, news_id)
+            
+            # Traitement du résultat avec lot réduit
+            success = self._process_order_result(
+                result, symbol, order_type, reduced_lot_size, 
+                stop_loss, take_profit, comment, True
+            )
+        return success, result
+
     def place_order(
         self,
         symbol: str,
@@ -201,7 +286,8 @@ class TradingEngine:
         lot_size: float,
         stop_loss: float,
         take_profit: float,
-        comment: str
+        comment: str,
+        news_id: str = None
     ) -> bool:
         """
         Place un ordre sur le marché avec gestion des erreurs et tentative de lot réduit.
@@ -213,6 +299,7 @@ class TradingEngine:
             stop_loss: Niveau de stop loss
             take_profit: Niveau de take profit
             comment: Nom de la stratégie
+            news_id: Identifiant de la news à l'origine de l'ordre (journal)
             
         Returns:
             bool: True si l'ordre a réussi, False sinon
@@ -232,27 +319,12 @@ class TradingEngine:
         
         #print(request)
         
-        # Envoi de l'ordre initial
-        result = mt5.order_send(request)
-        
-        # Traitement du résultat
-        success = self._process_order_result(
-            result, symbol, order_type, lot_size, stop_loss, take_profit, comment
-        )
-        
-        # Si échec dû à un manque de marge, on tente avec un lot réduit
-        if not success and result is not None and result.retcode == 10019:
-            reduced_lot_size = max(0.01, round((lot_size / 2), 2))
-            request["volume"] = reduced_lot_size
-            
-            # Nouvel essai avec lot réduit
-            result = mt5.order_send(request)
-            
-            # Traitement du résultat avec lot réduit
-            return self._process_order_result(
-                result, symbol, order_type, reduced_lot_size, 
-                stop_loss, take_profit, comment, True
-            )
+        # Envoi de l'ordre (et nouvel essai en lot réduit si pas assez de marge)
+        success, result = self._send_and_process(request, order_type, news_id)
+
+        # Le ticket de la position est celui de l'ordre au marché
+        if success and self.exposure is not None:
+            self.exposure.on_fill(result.order, symbol, order_type, request["volume"])
             
         return success
     
@@ -266,7 +338,8 @@ class TradingEngine:
         take_profit: float,
         comment: str,
         price: float,
-        current_price: float
+        current_price: float,
+        news_id: str = None
     ) -> bool:
         """
         Place un ordre sur le marché avec gestion des erreurs et tentative de lot réduit.
@@ -278,6 +351,7 @@ class TradingEngine:
             stop_loss: Niveau de stop loss
             take_profit: Niveau de take profit
             comment: Nom de la stratégie
+            news_id: Identifiant de la news à l'origine de l'ordre (journal)
             
         Returns:
             bool: True si l'ordre a réussi, False sinon
@@ -287,184 +361,240 @@ class TradingEngine:
             return False
             
         # Préparation de la requête initiale
-        request = self._prepare_pending_order_request(
+        request = self.prepare_pending_order_request(
             symbol, order_type, lot_size, stop_loss, take_profit, comment, price, current_price
         )
         
         #print(request)
         
-        # Envoi de l'ordre initial
-        result = mt5.order_send(request)
-        
-        # Traitement du résultat
-        success = self._process_order_result(
-            result, symbol, order_type, lot_size, stop_loss, take_profit, comment
-        )
+        # Envoi de l'ordre (et nouvel essai en lot réduit si pas assez de marge)
+        success, _ = self._send_and_process(request, order_type, news_id)
+        return success
+
+
+    def place_pending_batch(self, requests: list, news_id: str = None, max_workers: int = 8) -> list:
+        """
+        Envoie en parallèle des requêtes pending déjà préparées (ex: échelle grid + hedge).
         
-        # Si échec dû à un manque de marge, on tente avec un lot réduit
-        if not success and result is not None and result.retcode == 10019:
-            reduced_lot_size = max(0.01, round((lot_size / 2), 2))
-            request["volume"] = reduced_lot_size
-            
-            # Nouvel essai avec lot réduit
-            result = mt5.order_send(request)
-            
-            # Traitement du résultat avec lot réduit
-            return self._process_order_result(
-                result, symbol, order_type, reduced_lot_size, 
-                stop_loss, take_profit, comment, True
-            )
+        Args:
+            requests: Requêtes formatées par prepare_pending_order_request
+            news_id: Identifiant de la news à l'origine des ordres (journal)
+            max_workers: Nombre maximum d'envois simultanés
             
-        return success
+        Returns:
+            list: Par requête, dans le même ordre : comment, price, success, retcode, latency_ms
+        """
+        if not requests:
+            return []
+
+        def send(request):
+            order_type = "buy" if request["type"] in (mt5.ORDER_TYPE_BUY_LIMIT, mt5.ORDER_TYPE_BUY_STOP) else "sell"
+            start = time.perf_counter()
+            success, result = self._send_and_process(request, order_type, news_id)
+            return {
+                "comment": request["comment"],
+                "price": request["price"],
+                "success": success,
+                "retcode": result.retcode if result is not None else None,
+                "latency_ms": (time.perf_counter() - start) * 1000,
+            }
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(requests))) as executor:
+            legs = list(executor.map(send, requests))
+        total_ms = (time.perf_counter() - start) * 1000
+
+        logging.info(
+            "%s/%s ordres pending placés en %.1f ms",
+            sum(leg["success"] for leg in legs), len(legs), total_ms,
+            extra={"event": "pending_batch", "news_id": news_id, "total_ms": total_ms, "legs": legs},
+        )
+        return legs
     
     
-    def close_position_by_symbol(self, symbol_to_close: str, comment: str = "16h") -> bool:
+    def _prepare_close_request(self, position, tick, comment: str) -> dict:
         """
-        Ferme toutes les positions pour un symbole donné.
+        Prépare la requête de fermeture d'une position au prix du tick donné.
         
         Args:
-            symbol_to_close: Symbole à fermer
+            position: Position MT5 à fermer
+            tick: Tick du symbole de la position
             comment: Commentaire pour l'ordre de fermeture
             
         Returns:
-            bool: True si toutes les positions ont été fermées avec succès, False sinon
+            dict: La requête de fermeture formatée
         """
-        positions = mt5.positions_get(symbol=symbol_to_close)
-        if positions is None:
-            logging.error(f"Aucune position trouvée pour {symbol_to_close} ou erreur de récupération")
-            return False
+        # Détermination du type d'ordre de fermeture
+        close_type = mt5.ORDER_TYPE_SELL if position.type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY
+        price = tick.bid if close_type == mt5.ORDER_TYPE_SELL else tick.ask
+
+        return {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "symbol": position.symbol,
+            "volume": position.volume,
+            "type": close_type,
+            "position": position.ticket,
+            "price": price,
+            "deviation": self.deviation,
+            "magic": self.magic_number,
+            "comment": comment,
+            "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": mt5.ORDER_FILLING_IOC,
+        }
+
+    def _send_close(self, request: dict, max_retries: int):
+        """
+        Envoie une requête de fermeture, en la renvoyant avec un prix frais en cas de requote.
+        
+        Returns:
+            tuple: (dernier résultat MT5, nombre de tentatives, latence en secondes)
+        """
+        start = time.perf_counter()
+        attempts = 0
+        while True:
+            attempts += 1
+            result = self._send_order(request)
+            if result is None or result.retcode not in REQUOTE_RETCODES or attempts > max_retries:
+                return result, attempts, time.perf_counter() - start
+
+            tick = mt5.symbol_info_tick(request["symbol"])
+            if tick is None:
+                return result, attempts, time.perf_counter() - start
+            request["price"] = tick.bid if request["type"] == mt5.ORDER_TYPE_SELL else tick.ask
+            logging.info("Requote (%s) sur la position %s, nouvel essai à %s", result.retcode, request["position"], request["price"])
+
+    def close_positions(self, positions, comment: str, max_workers: int = 8, max_retries: int = 2) -> bool:
+        """
+        Ferme un lot de positions en parallèle : un seul tick par symbole, toutes les
+        requêtes préparées avant le premier envoi, requotes renvoyées avec un prix frais.
+        
+        Args:
+            positions: Positions MT5 à fermer
+            comment: Commentaire pour les ordres de fermeture
+            max_workers: Nombre maximum d'envois simultanés
+            max_retries: Nombre de renvois maximum après une requote
             
-        if len(positions) == 0:
-            logging.warning(f"Aucune position ouverte pour {symbol_to_close}")
+        Returns:
+            bool: True si toutes les positions ont été fermées avec succès, False sinon
+        """
+        if not positions:
             return True
-            
+
+        ticks = {symbol: mt5.symbol_info_tick(symbol) for symbol in {position.symbol for position in positions}}
         all_closed = True
+        requests = []
         for position in positions:
-            symbol = position.symbol
-            volume = position.volume
-            ticket = position.ticket
-            position_type = position.type
-            
-            # Détermination du type d'ordre de fermeture
-            close_type = mt5.ORDER_TYPE_SELL if position_type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY
-            
-            # Récupération du prix actuel
-            tick = mt5.symbol_info_tick(symbol)
+            tick = ticks[position.symbol]
             if tick is None:
-                logging.error(f"Impossible de récupérer le prix pour {symbol}")
+                logging.error("Impossible de récupérer le prix pour %s", position.symbol)
                 all_closed = False
                 continue
-                
-            price = tick.bid if close_type == mt5.ORDER_TYPE_SELL else tick.ask
-            
-            # Préparation de la requête de fermeture
-            close_request = {
-                "action": mt5.TRADE_ACTION_DEAL,
-                "symbol": symbol,
-                "volume": volume,
-                "type": close_type,
-                "position": ticket,
-                "price": price,
-                "deviation": self.deviation,
-                "magic": self.magic_number,
-                "comment": comment,
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC,
-            }
-            
-            # Envoi de l'ordre de fermeture
-            result = mt5.order_send(close_request)
-            
+            requests.append(self._prepare_close_request(position, tick, comment))
+
+        if not requests:
+            return False
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(requests))) as executor:
+            outcomes = list(executor.map(lambda request: self._send_close(request, max_retries), requests))
+        total = time.perf_counter() - start
+
+        closed = 0
+        for request, (result, attempts, latency) in zip(requests, outcomes):
+            ticket = request["position"]
             # Traitement du résultat
             if result is None:
-                logging.error(f"Erreur lors de la fermeture de la position {ticket}. Erreur: {mt5.last_error()}")
+                logging.error("Erreur lors de la fermeture de la position %s. Erreur: %s", ticket, mt5.last_error())
                 all_closed = False
             elif result.retcode != mt5.TRADE_RETCODE_DONE:
-                logging.error(f"Échec de la fermeture de la position {ticket}. Code: {result.retcode}, Comment: {result.comment}")
+                logging.error("Échec de la fermeture de la position %s. Code: %s, Comment: %s", ticket, result.retcode, result.comment)
                 all_closed = False
             else:
-                logging.info(f"Position {ticket} ({symbol}) fermée avec succès.")
-                
+                logging.info("Position %s (%s) fermée avec succès (%s).", ticket, request["symbol"], comment)
+                closed += 1
+                if self.exposure is not None:
+                    self.exposure.on_close(ticket)
+
+        if closed:
+            self.snapshot.invalidate()
+
+        latencies = [outcome[2] * 1000 for outcome in outcomes]
+        logging.info(
+            "%s/%s positions fermées en %.1f ms (latence max %.1f ms)",
+            closed, len(positions), total * 1000, max(latencies),
+            extra={
+                "event": "close_batch", "comment": comment, "closed": closed, "positions": len(positions),
+                "total_ms": total * 1000, "max_latency_ms": max(latencies),
+                "retries": sum(outcome[1] - 1 for outcome in outcomes),
+            },
+        )
         return all_closed
+
+
+    def close_position_by_symbol(self, symbol_to_close: str, comment: str = "16h") -> bool:
+        """
+        Ferme toutes les positions pour un symbole donné.
+        
+        Args:
+            symbol_to_close: Symbole à fermer
+            comment: Commentaire pour l'ordre de fermeture
+            
+        Returns:
+            bool: True si toutes les positions ont été fermées avec succès, False sinon
+        """
+        positions = self.snapshot.get_positions(symbol=symbol_to_close)
+        if not self.snapshot.valid:
+            logging.error("Aucune position trouvée pour %s ou erreur de récupération", symbol_to_close)
+            return False
+            
+        if len(positions) == 0:
+            logging.warning("Aucune position ouverte pour %s", symbol_to_close)
+            return True
+            
+        return self.close_positions(positions, comment)
     
 
-    def close_positions_after_45min(self) -> bool:
+    def close_positions_after_45min(self, max_duration_minutes: float = 45) -> bool:
         """
         Ferme toutes les positions si plus de 45min.
+        
+        Args:
+            max_duration_minutes: Durée maximale d'une position avant fermeture (45 par défaut)
                     
         Returns:
             bool: True si toutes les positions ont été fermées avec succès, False sinon
         """
-        positions = mt5.positions_get()
-        if positions is None:
+        positions = self.snapshot.get_positions()
+        if not self.snapshot.valid:
             return
             
         if len(positions) == 0:
             return
-            
+
+        # Heure actuelle en secondes (timestamp Unix)
+        current_time = get_clock().time()
+        expired = []
         for position in positions:
-            symbol = position.symbol
-            volume = position.volume
-            ticket = position.ticket
-            position_type = position.type
-            position_open_time = position.time
-
-            # Heure actuelle en secondes (timestamp Unix)
-            current_time = time.time()
-            position_open_time =position_open_time - (2 * 3600) #enleve 2h pour obtenir UTC
+            position_open_time = position.time - (2 * 3600) #enleve 2h pour obtenir UTC
     
             # Convertir la durée en minutes
             duration_in_minutes = (current_time - position_open_time) / 60
-            
-            if duration_in_minutes > 45:
-                # Détermination du type d'ordre de fermeture
-                close_type = mt5.ORDER_TYPE_SELL if position_type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY
-                
-                # Récupération du prix actuel
-                tick = mt5.symbol_info_tick(symbol)
-                if tick is None:
-                    logging.error(f"Impossible de récupérer le prix pour {symbol}")
-                    all_closed = False
-                    continue
-                    
-                price = tick.bid if close_type == mt5.ORDER_TYPE_SELL else tick.ask
-                
-                # Préparation de la requête de fermeture
-                close_request = {
-                    "action": mt5.TRADE_ACTION_DEAL,
-                    "symbol": symbol,
-                    "volume": volume,
-                    "type": close_type,
-                    "position": ticket,
-                    "price": price,
-                    "deviation": self.deviation,
-                    "magic": self.magic_number,
-                    "comment": "+45min",
-                    "type_time": mt5.ORDER_TIME_GTC,
-                    "type_filling": mt5.ORDER_FILLING_IOC,
-                }
-                
-                # Envoi de l'ordre de fermeture
-                result = mt5.order_send(close_request)
-                
-                # Traitement du résultat
-                if result is None:
-                    logging.error(f"Erreur lors de la fermeture de la position {ticket}. Erreur: {mt5.last_error()}")
-                elif result.retcode != mt5.TRADE_RETCODE_DONE:
-                    logging.error(f"Échec de la fermeture de la position {ticket}. Code: {result.retcode}, Comment: {result.comment}")
-                else:
-                    logging.info(f"Position {ticket} ({symbol}) fermée avec succès après 45min.")
+            if duration_in_minutes > max_duration_minutes:
+                expired.append(position)
+
+        if not expired:
+            return
+        return self.close_positions(expired, "+45min")
 
     
     def get_open_positions(self):
-        positions = mt5.positions_get()
-        return positions
+        return self.snapshot.get_positions()
     
     
     def get_pip_size(self, symbol):
         info = mt5.symbol_info(symbol)
         if info is None:
-            logging.error(f"Erreur : pas d'info pour {symbol}")
+            logging.error("Erreur : pas d'info pour %s", symbol)
             return 0.0001  # Valeur par défaut
         digits = info.digits
         return 0.01 if digits == 3 or digits == 2 else 0.0001
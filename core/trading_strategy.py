@@ -1,21 +1,24 @@
-import pandas as pd
-import numpy as np
 import MetaTrader5 as mt5
-from datetime import datetime
-from core.trading_engine import TradingEngine
+import numpy as np
+from core.strategy_runtime import BaseStrategy
+from core.market_utils import sl_tp_from_price
 import logging
 
 
 
-class TradingStrategy:
-    def __init__(self, symbol, comment):
-        self.engine = TradingEngine()
-        self.symbol = symbol
-        self.news_data = None
-        self.comment = comment
+class TradingStrategy(BaseStrategy):
+    name = "grid"
+
+    @classmethod
+    def preload_dependencies(cls):
+        import pandas
+
+    def __init__(self, symbol, comment, engine=None, volatility_service=None):
+        super().__init__(symbol, comment, engine, volatility_service)
         self.initial_direction = None
         self.initial_price = None
         self.hedge_active = False
+        self.hedge_placed = False         # Ordre pending de hedge accepté (pas forcément exécuté)
         self.grid_trades_done = []
         self.grid_levels= []  # Pips entre chaque grid
         self.max_drawdown = None          # Pips avant hedge
@@ -24,6 +27,8 @@ class TradingStrategy:
 
     def detect_trend(self, symbol, timeframe=mt5.TIMEFRAME_M1, lookback=3):
         """Détecte la tendance sur les dernières 'lookback' bougies M1."""
+        import pandas as pd
+
         rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, lookback)
         if rates is None or len(rates) < lookback:
             logging.error("Erreur : Données MT5 insuffisantes.")
@@ -41,116 +46,71 @@ class TradingStrategy:
         return None
 
 
-    def get_volatility(self, symbol, timeframe=mt5.TIMEFRAME_M1, lookback=3):
-        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, lookback)
-        if rates is None or len(rates) < lookback:
-            logging.error("Erreur : données de volatilité insuffisantes.")
-            return 0
-        highs = rates['high']
-        lows = rates['low']
-        return float(np.max(highs) - np.min(lows))
-    
-
-    def get_minimum_distance(self, pip_size):
-        symbol_info = mt5.symbol_info(self.symbol)
-        if symbol_info is None:
-            logging.error(f"Erreur : symbol_info non trouvé pour {self.symbol}")
-            return (None, None, None)
-        return symbol_info.stops_level * pip_size
-
-
-    def calculate_sl_tp(self, direction, volatility_multiplier=1, tp_ratio=1.2):
-        """
-        Calcule les prix de SL et TP basés sur la volatilité récente.
-        
-        :param direction: "buy" ou "sell"
-        :param volatility_multiplier: Multiplicateur de la volatilité (ex: 1.5x)
-        :param tp_ratio: Ratio TP/SL (ex: 2 pour un RR 1:2)
-        :return: (sl_price, tp_price)
+    def build_ladder(self, lot_size=0.01, hedge_sl_pips=10, hedge_tp_pips=50, volatility_multiplier=1, tp_ratio=1.2):
         """
-        volatility = self.get_volatility(self.symbol)  # Volatilité en pips
-        pip_size = self.get_pip_size(self.symbol)
+        Calcule les prix, SL/TP et requêtes de tous les ordres pending (niveaux de grid
+        puis hedge), à partir d'un seul tick / pip size / volatilité.
 
-        #min_distance = self.get_minimum_distance(self.symbol, pip_size)
+        Args:
+            volatility_multiplier: Multiplicateur de la volatilité pour le SL des niveaux de grid
+            tp_ratio: Ratio TP/SL des niveaux de grid
 
-        volatility_in_pips = volatility / pip_size
-        sl_pips = volatility_in_pips * volatility_multiplier
-        tp_pips = sl_pips * tp_ratio
-
-        tick = mt5.symbol_info_tick(self.symbol)
+        Returns:
+            list: Requêtes pending prêtes à envoyer (grid_<niveau>..., hedge)
+        """
+        tick = self.get_tick()
         if tick is None:
             logging.error(f"Erreur : pas de tick pour {self.symbol}")
-            return (None, None, None)
-        entry_price = tick.ask if direction == "buy" else tick.bid
-        
-        if direction == "buy":
-            sl_price = entry_price - (sl_pips * pip_size)  # SL en dessous du prix
-            tp_price = entry_price + (tp_pips * pip_size)  # TP au-dessus
-        elif direction == "sell":
-            sl_price = entry_price + (sl_pips * pip_size)  # SL au-dessus du prix
-            tp_price = entry_price - (tp_pips * pip_size)  # TP en dessous
-        
-        return (sl_price, tp_price, entry_price)
-    
-
-    def calculate_sl_tp_from_price(self, direction, entry_price, volatility_multiplier=1, tp_ratio=1.2):
-        """
-        Calcule les SL/TP à partir d’un prix donné, plutôt que du prix marché.
-        """
-        volatility = self.get_volatility(self.symbol)
-        pip_size = self.get_pip_size(self.symbol)
-        volatility_in_pips = volatility / pip_size
-        sl_pips = volatility_in_pips * volatility_multiplier
-        tp_pips = sl_pips * tp_ratio
-    
-
-        if direction == "buy":
-            sl_price = entry_price - (sl_pips * pip_size)
-            tp_price = entry_price + (tp_pips * pip_size)
-        else:
-            sl_price = entry_price + (sl_pips * pip_size)
-            tp_price = entry_price - (tp_pips * pip_size)
-
-        return (sl_price, tp_price)
-
-
-    
-    
-    def get_pip_size(self, symbol):
-        info = mt5.symbol_info(symbol)
-        if info is None:
-            logging.error(f"Erreur : pas d'info pour {symbol}")
-            return 0.0001  # Valeur par défaut
-        digits = info.digits
-        return 0.01 if digits == 3 or digits == 2 else 0.0001
-    
-
-    def place_pending_grid_orders(self):
+            return []
         pip_size = self.get_pip_size(self.symbol)
-        for level in self.grid_levels:
-            grid_price = self.initial_price - (level * pip_size) if self.initial_direction == "buy" else self.initial_price + (level * pip_size)
-            sl, tp = self.calculate_sl_tp_from_price(self.initial_direction, grid_price)
-
-            self.engine.place_pending_order(self.symbol, self.initial_direction, 0.01, sl, tp, f"grid_{level}", grid_price, self.initial_price)
+        volatility = self.get_volatility(self.symbol)
 
-            logging.info(f"[GRID] Pending order placé à {grid_price:.5f} ({level} pips)")
-            self.grid_trades_done.append(level)
+        hedge_direction = "sell" if self.initial_direction == "buy" else "buy"
+
+        # Les niveaux s'éloignent du prix initial contre la position initiale
+        levels = np.array(self.grid_levels + [self.max_drawdown], dtype=float)
+        away = -1.0 if self.initial_direction == "buy" else 1.0
+        prices = self.initial_price + away * levels * pip_size
+
+        # Grid : SL/TP sur la volatilité (même calcul que calculate_sl_tp_from_price)
+        legs = []
+        for level, price in zip(self.grid_levels, prices[:-1]):
+            sl, tp = sl_tp_from_price(self.initial_direction, float(price), volatility, pip_size,
+                                      volatility_multiplier, tp_ratio)
+            legs.append((self.initial_direction, float(price), sl, tp, f"grid_{level}"))
+
+        # Hedge : SL/TP fixes en pips
+        hedge_price = float(prices[-1])
+        hedge_side = 1.0 if hedge_direction == "buy" else -1.0
+        legs.append((hedge_direction, hedge_price, hedge_price - hedge_side * hedge_sl_pips * pip_size,
+                     hedge_price + hedge_side * hedge_tp_pips * pip_size, "hedge"))
+
+        return [
+            self.engine.prepare_pending_order_request(
+                self.symbol, direction, lot_size, sl, tp, comment, price, self.initial_price, server_time=tick.time
+            )
+            for direction, price, sl, tp, comment in legs
+        ]
 
 
-    def place_pending_hedge_order(self):
-        pip_size = self.get_pip_size(self.symbol)
-        direction = "sell" if self.initial_direction == "buy" else "buy"
-        hedge_price = self.initial_price - (self.max_drawdown * pip_size) if self.initial_direction == "buy" else self.initial_price + (self.max_drawdown * pip_size)
-        sl_pips = 10
-        tp_pips = 50
-        sl = hedge_price + sl_pips * pip_size if direction == "sell" else hedge_price - sl_pips * pip_size
-        tp = hedge_price - tp_pips * pip_size if direction == "sell" else hedge_price + tp_pips * pip_size
+    def place_ladder(self):
+        """
+        Envoie toute l'échelle grid + hedge en parallèle.
 
-        self.engine.place_pending_order(self.symbol, direction, 0.01, sl, tp, "hedge", hedge_price, self.initial_price)
-        logging.info(f"[HEDGE] Pending hedge order placé à {hedge_price:.5f}")
+        Returns:
+            list: Résultat par ordre (comment, price, success, retcode, latency_ms)
+        """
+        legs = self.engine.place_pending_batch(self.build_ladder(), news_id=self.news_id)
+        for leg in legs:
+            if leg["success"] and leg["comment"].startswith("grid_"):
+                self.grid_trades_done.append(int(leg["comment"][len("grid_"):]))
+            logging.info(f"[LADDER] {leg['comment']} à {leg['price']:.5f} : "
+                         f"{'OK' if leg['success'] else 'FAIL'} en {leg['latency_ms']:.1f} ms")
+        self.hedge_placed = any(leg["success"] for leg in legs if leg["comment"] == "hedge")
+        return legs
 
 
-    def set_grid_and_hedge_pips_value(self):
+    def set_grid_and_hedge_pips_value(self, grid_multiplier=1.5, drawdown_multiplier=4):
         base_volatility = self.get_volatility(self.symbol)  # volatilité en unités prix
         pip_size = self.get_pip_size(self.symbol)           # taille du pip en unités prix
         
@@ -161,10 +121,7 @@ class TradingStrategy:
             self.max_drawdown = 50
             return
 
-        # Multiplicateurs à ajuster selon ta tolérance
-        grid_multiplier = 1.5
-        drawdown_multiplier = 4
-
+        # Multiplicateurs (grid_multiplier, drawdown_multiplier) à ajuster selon ta tolérance
         # Convertir la volatilité en pips avant de multiplier, pour garder une échelle cohérente
         base_volatility_pips = base_volatility / pip_size
         
@@ -185,7 +142,7 @@ class TradingStrategy:
            logging.info(f"Pas de trend détecté sur {self.symbol}")
            return
         sl, tp, price = self.calculate_sl_tp(trend)
-        initial_trade = self.engine.place_order(self.symbol, trend, 0.01, sl, tp, self.comment)
+        initial_trade = self.engine.place_order(self.symbol, trend, 0.01, sl, tp, self.comment, news_id=self.news_id)
 
         if initial_trade:
             logging.info("OK - Trade initial placé avec succès.")
@@ -194,9 +151,8 @@ class TradingStrategy:
             self.initial_price = price
             self.hedge_active = False
 
-            # Placer les pending orders directement après
-            self.place_pending_grid_orders()
-            self.place_pending_hedge_order()
+            # Placer les pending orders (grid + hedge) directement après, en un seul batch
+            self.place_ladder()
             return True
         else:
             logging.error("FAIL - Erreur lors du placement du trade initial.")
@@ -0,0 +1,130 @@
+import MetaTrader5 as mt5
+import numpy as np
+import logging
+import threading
+from core.market_utils import volatility_from_rates
+from core.clock import get_clock
+
+
+# Durée d'une bougie en secondes par timeframe MT5
+TIMEFRAME_SECONDS = {
+    mt5.TIMEFRAME_M1: 60,
+    mt5.TIMEFRAME_M5: 300,
+    mt5.TIMEFRAME_M15: 900,
+    mt5.TIMEFRAME_M30: 1800,
+    mt5.TIMEFRAME_H1: 3600,
+}
+
+
+class VolatilityService:
+    """
+    Buffers de bougies par (symbole, timeframe) avec range high-low et ATR mis en cache.
+
+    Un buffer n'est rafraîchi qu'une fois par bougie, dès qu'une nouvelle bougie s'ouvre,
+    et seulement avec les bougies apparues depuis le dernier refresh. Tous les calculs de SL/TP d'une même
+    news lisent donc la même volatilité, calculée une seule fois.
+
+    Attributes:
+        window (int): Nombre de bougies gardées par buffer
+        atr_period (int): Période de l'ATR
+    """
+
+    def __init__(self, window=50, atr_period=14):
+        self.window = window
+        self.atr_period = atr_period
+        self._lock = threading.Lock()
+        self._bars = {}
+        self._refreshed_at = {}
+        self._cache = {}
+
+    def _period(self, timeframe):
+        return TIMEFRAME_SECONDS.get(timeframe, 60)
+
+    def _refresh(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        bars = self._bars.get(key)
+        now = get_clock().time()
+        period = self._period(timeframe)
+
+        # Rafraîchi dès qu'une bougie s'ouvre, quel que soit le temps écoulé depuis le dernier refresh
+        if bars is not None and now // period == self._refreshed_at[key] // period:
+            return bars
+
+        if bars is None or not len(bars):
+            count = self.window
+        else:
+            # Bougies apparues depuis le dernier refresh + la dernière, qui était encore en formation
+            count = min(self.window, int(now // period - self._refreshed_at[key] // period) + 1)
+
+        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+        if rates is None or not len(rates):
+            logging.error("Erreur : pas de bougies pour %s (timeframe %s)", symbol, timeframe)
+            return bars
+
+        if bars is not None and len(bars) and count < self.window:
+            # On garde les bougies antérieures à la première bougie reçue, puis on fusionne
+            older = bars[bars['time'] < rates['time'][0]]
+            rates = np.concatenate((older, rates))[-self.window:]
+
+        self._bars[key] = rates
+        self._refreshed_at[key] = now
+        self._cache = {k: v for k, v in self._cache.items() if k[:2] != key}
+        return rates
+
+    def get_bars(self, symbol, timeframe=mt5.TIMEFRAME_M1):
+        """Dernières bougies du buffer (la dernière est celle en formation au moment du refresh)."""
+        with self._lock:
+            return self._refresh(symbol, timeframe)
+
+    def get_range(self, symbol, timeframe=mt5.TIMEFRAME_M1, lookback=3) -> float:
+        """
+        Amplitude plus haut / plus bas sur les 'lookback' dernières bougies (même calcul que get_volatility).
+
+        Returns:
+            float: Volatilité en unités de prix, 0 si données insuffisantes
+        """
+        with self._lock:
+            rates = self._refresh(symbol, timeframe)
+            key = (symbol, timeframe, "range", lookback)
+            if key not in self._cache:
+                if rates is None or len(rates) < lookback:
+                    logging.error("Erreur : données de volatilité insuffisantes.")
+                    return 0
+                self._cache[key] = volatility_from_rates(rates, lookback)
+            return self._cache[key]
+
+    def get_atr(self, symbol, timeframe=mt5.TIMEFRAME_M1, period=None) -> float:
+        """
+        ATR (moyenne simple des true ranges) sur les bougies clôturées du buffer.
+
+        Returns:
+            float: ATR en unités de prix, 0 si données insuffisantes
+        """
+        period = period or self.atr_period
+        with self._lock:
+            rates = self._refresh(symbol, timeframe)
+            key = (symbol, timeframe, "atr", period)
+            if key not in self._cache:
+                closed = rates[:-1] if rates is not None else ()
+                if len(closed) < period + 1:
+                    logging.error("Erreur : pas assez de bougies pour l'ATR %s de %s", period, symbol)
+                    return 0
+                high, low, close = closed['high'], closed['low'], closed['close']
+                true_range = np.maximum(high[1:], close[:-1]) - np.minimum(low[1:], close[:-1])
+                self._cache[key] = float(true_range[-period:].mean())
+            return self._cache[key]
+
+    def export_state(self):
+        """Buffers de bougies pour WarmStartStore."""
+        with self._lock:
+            return {"bars": dict(self._bars), "refreshed_at": dict(self._refreshed_at)}
+
+    def import_state(self, state):
+        with self._lock:
+            self._bars = dict(state["bars"])
+            self._refreshed_at = dict(state["refreshed_at"])
+            self._cache = {}
+
+
+# Service partagé par défaut entre toutes les stratégies du process
+default_volatility_service = VolatilityService()
@@ -0,0 +1,102 @@
+import logging
+import os
+import pickle
+import struct
+import time
+import zlib
+
+
+class WarmStartStore:
+    """
+    Sauvegarde périodique de l'état du bot dans un fichier binaire compact, restauré au démarrage.
+
+    Chaque composant enregistré fournit `export_state()` (objet picklable) et
+    `import_state(state)`. Le fichier contient un en-tête (magic, version, date de
+    sauvegarde) suivi des sections compressées.
+
+    Attributes:
+        path (str): Chemin du fichier d'état
+        max_age_seconds (float): Âge maximum d'un état pour être restauré
+    """
+    MAGIC = b"ZLWS"
+    VERSION = 1
+    _HEADER = struct.Struct("<4sHd")
+
+    def __init__(self, path="data/warm_state.bin", max_age_seconds=12 * 3600):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.providers = {}
+
+    def register(self, name, provider):
+        """Enregistre un composant dont l'état doit survivre aux redémarrages."""
+        self.providers[name] = provider
+
+    def save(self) -> bool:
+        """
+        Écrit l'état de tous les composants (écriture atomique via un fichier temporaire).
+
+        Returns:
+            bool: True si l'état a été écrit
+        """
+        sections = {}
+        for name, provider in self.providers.items():
+            try:
+                sections[name] = provider.export_state()
+            except Exception:
+                logging.exception("Impossible d'exporter l'état de %s", name)
+
+        payload = zlib.compress(pickle.dumps(sections, protocol=pickle.HIGHEST_PROTOCOL), 1)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(self._HEADER.pack(self.MAGIC, self.VERSION, time.time()))
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.error("Erreur lors de la sauvegarde de l'état : %s", e)
+            return False
+        return True
+
+    def restore(self) -> bool:
+        """
+        Recharge l'état sauvegardé dans chaque composant enregistré.
+
+        Returns:
+            bool: True si un état valide et récent a été restauré
+        """
+        if not os.path.exists(self.path):
+            return False
+
+        start = time.perf_counter()
+        try:
+            with open(self.path, "rb") as f:
+                magic, version, saved_at = self._HEADER.unpack(f.read(self._HEADER.size))
+                if magic != self.MAGIC or version != self.VERSION:
+                    logging.warning("Fichier d'état %s incompatible, ignoré", self.path)
+                    return False
+                age = time.time() - saved_at
+                if age > self.max_age_seconds:
+                    logging.info("État sauvegardé trop ancien (%.0f min), démarrage à froid", age / 60)
+                    return False
+                sections = pickle.loads(zlib.decompress(f.read()))
+        except (OSError, struct.error, zlib.error, pickle.UnpicklingError, EOFError) as e:
+            logging.warning("Impossible de lire l'état sauvegardé %s : %s", self.path, e)
+            return False
+
+        for name, provider in self.providers.items():
+            if name not in sections:
+                continue
+            try:
+                provider.import_state(sections[name])
+            except Exception:
+                logging.exception("Impossible de restaurer l'état de %s", name)
+
+        logging.info(
+            "État restauré (%s) en %.1f ms, sauvegardé il y a %.0f s",
+            ", ".join(sorted(sections)), (time.perf_counter() - start) * 1000, age
+        )
+        return True
@@ -1,41 +1,81 @@
+import argparse
+import importlib
 import json
 import os
+import threading
 from datetime import datetime, timedelta, timezone
 import time
 import pytz
-from core.forexfactory_news_fetcher import get_forex_week_filename, get_forex_calendar
-from core.trading_strategy import TradingStrategy
-from core.trading_strategy_multi_timeframe import TradingStrategyMultiTimeframe
-from core.trading_strategy_sandwich import TradingStrategySandwich
+from core.forexfactory_news_fetcher import get_forex_week_filename
 from core.symbol_selector import SymbolSelector
+from core.market_utils import NEWS_CURRENCY_SYMBOLS
 from core.trading_engine import TradingEngine
 from core.mt5_client import MT5Client
+from core.position_snapshot import PositionSnapshot
+from core.strategy_runtime import StrategyRuntime
+from core.trade_journal import TradeJournal
+from core.warm_start import WarmStartStore
+from core.exposure_index import ExposureIndex
+from core.deal_history import DealHistory
+from core.speculative_evaluator import SpeculativeEvaluator
+from core.reaction_table import NewsReactionTable
+from core.volatility_service import default_volatility_service
+from core.clock import get_clock
 import logging
+from core.logging_setup import setup_logging
 
 # Configuration
 DATA_DIR = "weekly_news_json"
 TIMEZONE_UTC = pytz.utc
 
-# Crée le dossier logs s'il n'existe pas
-os.makedirs('logs', exist_ok=True)
-# Configuration des logs
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-# Ajoute un handler pour écrire dans un fichier
-log_filename = f'logs/logfile_zenlion_news_{datetime.now().strftime("%d-%m-%Y_%H-%M")}.txt'
-file_handler = logging.FileHandler(log_filename) 
-file_handler.setLevel(logging.INFO)  # Niveau de log que tu veux enregistrer dans le fichier
+# Stratégies disponibles : (module, classe, moment du déclenchement, commentaire des ordres)
+# Les modules ne sont importés que si la stratégie est activée.
+STRATEGIES = {
+    "sandwich": ("core.trading_strategy_sandwich", "TradingStrategySandwich", "pre_news", "sandwich"),
+    "multi_timeframe": ("core.trading_strategy_multi_timeframe", "TradingStrategyMultiTimeframe", "post_news", "{title}_MTF"),
+    "grid": ("core.trading_strategy", "TradingStrategy", "post_news", "{title}"),
+}
+ENABLED_STRATEGIES = ("multi_timeframe", "sandwich")
 
-# Crée un format pour le fichier de log (tu peux le personnaliser si besoin)
-file_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(file_format)
+# Exposition nette maximale par devise (en lots) pour la sélection des symboles
+MAX_LOTS_PER_CURRENCY = 0.03
 
-# Ajoute ce handler au root logger
-logging.getLogger().addHandler(file_handler)
+# Attente maximale (secondes) du watchdog MT5 avant de renoncer aux déclenchements d'un cycle
+MT5_READY_TIMEOUT = 10
+
+# Ordre des symboles candidats : "priority" (liste fixe) ou "cost" (range récent / spread, le moins cher d'abord)
+SYMBOL_RANKING = "priority"
+
+
+def load_strategies(enabled=ENABLED_STRATEGIES):
+    """
+    Importe uniquement les stratégies activées.
+
+    Returns:
+        list: Tuples (classe, moment du déclenchement, commentaire)
+    """
+    strategies = []
+    for name in enabled:
+        if name not in STRATEGIES:
+            raise ValueError(f"Stratégie inconnue : {name}")
+        module_name, class_name, phase, comment = STRATEGIES[name]
+        strategy_cls = getattr(importlib.import_module(module_name), class_name)
+        strategies.append((strategy_cls, phase, comment))
+    return strategies
+
+
+def preload_strategy_dependencies(*runtimes):
+    """Importe les dépendances des stratégies enregistrées, avant la première news"""
+    start = time.perf_counter()
+    for runtime in runtimes:
+        for strategy_cls, _ in runtime.strategies:
+            strategy_cls.preload_dependencies()
+    logging.info("Dépendances des stratégies chargées en %.2fs", time.perf_counter() - start)
 
 
 def get_last_sunday():
     """Retourne le dimanche dernier en UTC"""
-    now = datetime.now(timezone.utc)
+    now = get_clock().now(timezone.utc)
     return now - timedelta(days=(now.weekday() + 1) % 7)
 
 
@@ -62,7 +102,7 @@ def news_processed(title, filename):
         if news.get('title') == title:
             news['processed'] = {
                 'status': True,
-                'timestamp': datetime.now(timezone.utc).isoformat()
+                'timestamp': get_clock().now(timezone.utc).isoformat()
             }
             updated = True
             break
@@ -75,21 +115,75 @@ def news_processed(title, filename):
     
     
 
+class SchedulerState:
+    """
+    État de la boucle principale : calendrier parsé de la semaine et news déjà déclenchées.
+
+    Sauvegardé par WarmStartStore pour qu'un redémarrage ne recharge pas le calendrier
+    et ne redéclenche pas une news dans la même fenêtre.
+    """
+
+    def __init__(self):
+        self.calendar_filename = None
+        self.calendar_mtime = None
+        self.news_data = None
+        self.triggered = set()
+
+    def load_calendar(self, filename):
+        """Retourne le calendrier, relu seulement si le fichier a changé (nouvelle semaine ou news_processed)"""
+        mtime = os.path.getmtime(filename)
+        if filename != self.calendar_filename:
+            # Nouvelle semaine : les déclenchements de la semaine précédente ne servent plus
+            self.triggered.clear()
+        if filename != self.calendar_filename or mtime != self.calendar_mtime or self.news_data is None:
+            self.news_data = load_news_file(filename)
+            self.calendar_filename = filename
+            self.calendar_mtime = mtime
+        return self.news_data
+
+    def mark_triggered(self, news, phase):
+        """Enregistre le déclenchement ; False si cette news a déjà été déclenchée pour cette phase"""
+        key = (get_news_id(news), phase)
+        if key in self.triggered:
+            return False
+        self.triggered.add(key)
+        return True
+
+    def export_state(self):
+        return {
+            "calendar_filename": self.calendar_filename,
+            "calendar_mtime": self.calendar_mtime,
+            "news_data": self.news_data,
+            "triggered": self.triggered,
+        }
+
+    def import_state(self, state):
+        self.calendar_filename = state["calendar_filename"]
+        self.calendar_mtime = state["calendar_mtime"]
+        self.news_data = state["news_data"]
+        self.triggered = set(state["triggered"])
+
+
 def get_todays_news(news_data):
     """Filtre les news pour aujourd'hui en UTC"""
-    today = datetime.now(timezone.utc).date()
+    today = get_clock().now(timezone.utc).date()
     return [news for news in news_data 
             if news.get('date_utc') and 
             datetime.fromisoformat(news['date_utc']).date() == today]
 
 
-def should_trigger(news, minutes=5):
-    """Vérifie si on est dans la fenêtre de déclenchement"""
-    now = datetime.now(timezone.utc)
+def get_news_id(news):
+    """Identifiant stable d'une news, utilisé pour relier les ordres à leur news"""
+    return f"{news['date_utc']}|{news['country']}|{news['title']}"
+
+
+def should_trigger(news, minutes=5, window=1):
+    """Vérifie si on est dans la fenêtre de déclenchement ('window' minutes à partir de T+minutes)"""
+    now = get_clock().now(timezone.utc)
     news_time = datetime.fromisoformat(news['date_utc']).astimezone(TIMEZONE_UTC)
     elapsed = (now - news_time).total_seconds() / 60
     # print(f"{news['title']} et le temps écoulé : {elapsed}")
-    return minutes <= elapsed < minutes+1
+    return minutes <= elapsed < minutes+window
 
 
 
@@ -110,27 +204,87 @@ def mock_data(todays_news):
     todays_news.append(mocked_news)
     return todays_news
 
-def main():
+def main(enabled_strategies=ENABLED_STRATEGIES, trigger_only=False, until=None, calendar_fetcher=None):
+    """
+    Boucle principale du bot.
+
+    L'heure et les attentes passent par get_clock() : avec une VirtualClock (cf core.simulation),
+    une semaine complète tourne en quelques secondes.
+
+    Args:
+        enabled_strategies: Noms des stratégies à charger (cf STRATEGIES)
+        trigger_only: Si True, pas de téléchargement hebdo du calendrier (get_forex_calendar n'est jamais appelé, requests jamais importé)
+        until: Timestamp de fin de la boucle (None = sans fin)
+        calendar_fetcher: Fonction de téléchargement du calendrier du dimanche (get_forex_calendar par défaut)
+    """
+    clock = get_clock()
+    setup_logging()
     mt5 = MT5Client()
     mt5.initialize_mt5()
-    symbolSelector = SymbolSelector()
-    tradingEngine = TradingEngine()
+    # Un seul snapshot positions/ordres partagé, rafraîchi une fois par cycle
+    snapshot = PositionSnapshot()
+    # Exposition par devise : mise à jour par le moteur à chaque fill/fermeture et par le delta de chaque snapshot
+    exposure = ExposureIndex(default_cap=MAX_LOTS_PER_CURRENCY)
+    snapshot.add_listener(exposure.on_snapshot)
+    # Réactions historiques par (famille de news, devise, paire), construites hors ligne (python -m core.reaction_table)
+    symbolSelector = SymbolSelector(snapshot, exposure, ranking=SYMBOL_RANKING, reactions=NewsReactionTable.load())
+    # Noms broker de toutes les paires tradables résolus une fois ici, plus de recherche au déclenchement
+    pairs = [pair for pairs in symbolSelector.symbol_priority.values() for pair in pairs] + list(NEWS_CURRENCY_SYMBOLS.values())
+    missing = symbolSelector.resolver.prepare(pairs)
+    if missing:
+        logging.warning("Paires indisponibles chez le broker : %s", ", ".join(missing))
+    # Heartbeat du terminal en arrière-plan : une session perdue est reconnectée avant les déclenchements
+    mt5.start_watchdog(symbol=symbolSelector.resolver.resolve("EURUSD") or "EURUSD")
+    # Candidats multi-timeframe réévalués à chaque bougie M1 entre T+0 et T+5
+    symbolSelector.speculative = SpeculativeEvaluator(symbolSelector)
+    tradingEngine = TradingEngine(snapshot, TradeJournal(), exposure, session_lock=mt5.session_lock)
+    # Historique local des deals (P&L réalisé par stratégie), synchronisé de façon incrémentale
+    deal_history = DealHistory()
+
+    # Stratégies déclenchées juste avant la news (T-1) et après la news (T+5) :
+    # chaque runtime construit un seul contexte de marché par news pour toutes ses stratégies
+    pre_news_runtime = StrategyRuntime(tradingEngine)
+    post_news_runtime = StrategyRuntime(tradingEngine)
+    for strategy_cls, phase, comment in load_strategies(enabled_strategies):
+        runtime = pre_news_runtime if phase == "pre_news" else post_news_runtime
+        runtime.register(strategy_cls, comment)
+
+    # Redémarrage à chaud : calendrier, déclenchements et tickets suivis depuis la dernière sauvegarde
+    scheduler = SchedulerState()
+    warm_start = WarmStartStore()
+    warm_start.register("scheduler", scheduler)
+    warm_start.register("positions", snapshot)
+    warm_start.register("bars", default_volatility_service)
+    if warm_start.restore():
+        snapshot.reconcile()
+
+    # Le bot est prêt : les dépendances lourdes des stratégies activées sont chargées en arrière-plan
+    threading.Thread(
+        target=preload_strategy_dependencies, args=(pre_news_runtime, post_news_runtime),
+        name="preload", daemon=True
+    ).start()
     
 
     try:
-        while True:
+        while until is None or clock.time() < until:
             try:
-                # Trade uniquement les jours de semaine
-                now = datetime.now(timezone.utc)
-                if now.weekday() not in [5, 6]:
+                # Trade uniquement les jours de semaine, et seulement si le terminal répond
+                now = clock.now(timezone.utc)
+                terminal_ready = mt5.wait_ready(timeout=MT5_READY_TIMEOUT)
+                if terminal_ready:
+                    snapshot.refresh()
+                else:
+                    logging.error("Terminal MT5 non prêt (watchdog), aucun déclenchement ce cycle")
+                if terminal_ready and now.weekday() not in [5, 6]:
                     # 1. Charger le fichier de la semaine
                     filename = get_forex_week_filename()
                     filename = f"weekly_news_json/{filename}"
                     if not os.path.exists(filename):
                         logging.error(f"Fichier non trouvé: {filename}")
+                        clock.sleep(60)
                         continue
                     
-                    news_data = load_news_file(filename)
+                    news_data = scheduler.load_calendar(filename)
                     
                     # 2. Filtrer les news d'aujourd'hui
                     todays_news = get_todays_news(news_data)
@@ -140,12 +294,20 @@ def main():
                     
                     # 3. Vérifier les news à traiter
                     for news in todays_news:
-                        if should_trigger(news):
-                            logging.info(f"\n=== NEWS TRIGGER ===")
-                            logging.info(f"Title: {news['title']}")
-                            logging.info(f"Time (UTC): {news['date_utc']}")
-                            logging.info(f"Country: {news['country']}")
-                            logging.info(f"Impact: {news.get('impact', 'N/A')}")
+                        # Entre T+0 et T+5 : préparation de la décision multi-timeframe en arrière-plan
+                        if (post_news_runtime.strategies and news['impact'] == 'High'
+                                and should_trigger(news, minutes=0, window=5)
+                                and scheduler.mark_triggered(news, "speculative")):
+                            news_time = datetime.fromisoformat(news['date_utc']).timestamp()
+                            symbolSelector.speculative.start(news['country'], news_time + 6 * 60, news['title'])
+
+                        if should_trigger(news) and scheduler.mark_triggered(news, "post_news"):
+                            logging.info(
+                                "\n=== NEWS TRIGGER ===\nTitle: %s\nTime (UTC): %s\nCountry: %s\nImpact: %s",
+                                news['title'], news['date_utc'], news['country'], news.get('impact', 'N/A'),
+                                extra={"event": "news_trigger", "title": news['title'], "date_utc": news['date_utc'],
+                                       "country": news['country'], "impact": news.get('impact')},
+                            )
                             
                             # Ici vous ajoutez votre logique de trading
                             if news['impact'] == 'High':
@@ -155,45 +317,73 @@ def main():
                                 # symbol, trend = symbolSelector.get_best_symbol(news['country'])
                                 # if symbol and trend:
                                 #     logging.info(f">>> Executing HIGH impact strategy --> {symbol}: {comment}")
-                                #     tradingStrategy = TradingStrategy(symbol, comment)
+                                #     tradingStrategy = TradingStrategy(symbol, comment, tradingEngine)  # ou activer "grid"
                                 #     result = tradingStrategy.execute_strategy(trend)
                                 #     if result:
                                 #         news_processed(news['title'], filename)
                                 
-                                #Stratégie multitimeframe
-                                comment = f"{news['title'][:10]}_MTF"
-                                symbol, trend = symbolSelector.get_best_symbol_multi_timeframe(news['country'])
-                                if symbol and trend:
-                                    logging.info(f">>> Executing HIGH impact strategy --> {symbol}: {comment}")
-                                    tradingStrategy = TradingStrategyMultiTimeframe(symbol, comment)
-                                    result = tradingStrategy.execute_strategy(trend)
-                                    if result:
-                                        news_processed(news['title'], filename)
-
-                        if should_trigger(news, minutes=-1):
+                                #Stratégies post-news (multitimeframe) sur le symbole sélectionné
+                                if post_news_runtime.strategies:
+                                    selection = symbolSelector.get_best_symbol_multi_timeframe(news['country'], news['title'])
+                                    if selection:
+                                        symbol, trend = selection
+                                        logging.info(">>> Executing HIGH impact strategy --> %s: %s_MTF", symbol, news['title'][:10])
+                                        results = post_news_runtime.run_event(symbol, news['title'], trend, get_news_id(news))
+                                        if any(results.values()):
+                                            news_processed(news['title'], filename)
+
+                        if (pre_news_runtime.strategies and should_trigger(news, minutes=-1)
+                                and scheduler.mark_triggered(news, "pre_news")):
                             #launch sandwich strategy
                             symbol = symbolSelector.get_symbol_from_news_currency(news['country'])
                             if symbol:
-                                logging.info(f">>> Executing Sandwich strategy --> {symbol}")
-                                tradingStrategySandwich = TradingStrategySandwich(symbol, "sandwich")
-                                result = tradingStrategySandwich.execute_strategy()
+                                logging.info(">>> Executing Sandwich strategy --> %s", symbol)
+                                results = pre_news_runtime.run_event(symbol, news['title'], news_id=get_news_id(news))
                             else:
-                                logging.warning(f"No symbol found for country: {news['country']}")
+                                logging.warning("No symbol found for country: %s", news['country'],
+                                                extra={"event": "no_symbol", "country": news['country'], "title": news['title']})
 
                 #Récupère le nouveau fichier de news le dimanche soir à 20H30 UTC
-                if now.weekday() == 6 and now.hour == 20 and now.minute == 30:
-                    get_forex_calendar()
+                if not trigger_only and now.weekday() == 6 and now.hour == 20 and now.minute == 30:
+                    if calendar_fetcher is None:
+                        from core.forexfactory_news_fetcher import get_forex_calendar
+                        calendar_fetcher = get_forex_calendar
+                    calendar_fetcher()
                     logging.info(">>> Téléchargement du calendrier Forex hebdo")
-                    time.sleep(90)
+                    clock.sleep(90)
 
                 tradingEngine.close_positions_after_45min()
-                time.sleep(60)
+                if terminal_ready:
+                    deal_history.sync()
+                warm_start.save()
+                clock.sleep(60)
             except Exception as e:
                 logging.exception("Une erreur s'est produite dans la boucle principale.")
-                time.sleep(60)
+                clock.sleep(60)
     except Exception as e:
         logging.error(f"Error: {e}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="ZenLion News Trading Bot")
+    parser.add_argument("--strategies", default=",".join(ENABLED_STRATEGIES),
+                        help=f"Stratégies à activer, séparées par des virgules ({', '.join(STRATEGIES)})")
+    parser.add_argument("--trigger-only", action="store_true",
+                        help="Mode léger : uniquement les déclenchements, sans téléchargement du calendrier")
+    parser.add_argument("--use-feed", action="store_true",
+                        help="Lit ticks et bougies M1 depuis le feed partagé (python -m core.market_feed) s'il tourne")
+    parser.add_argument("--record", metavar="PATH",
+                        help="Enregistre tous les appels MT5 dans PATH (rejouables avec python -m core.mt5_capture)")
+    args = parser.parse_args()
+    if args.use_feed:
+        from core.mt5_backend import install_backend
+        from core.market_feed import FeedBackend
+        install_backend(FeedBackend())
+    if args.record:
+        import atexit
+        from core.mt5_backend import install_backend
+        from core.mt5_capture import RecordingBackend
+        recorder = RecordingBackend(args.record)
+        atexit.register(recorder.close)
+        install_backend(recorder)
+    main(tuple(name.strip() for name in args.strategies.split(",") if name.strip()), args.trigger_only)
 